@@ -3,6 +3,7 @@ from typing import Optional, List
 from bson import ObjectId
 from app.utils.dependencies import get_current_user
 from app.models.transaction import Transaction
+from app.services.bank_dimension import ledger_match, SOURCE_KINDS
 from app.models.income import IncomeEntry
 from app.models.budget import BudgetEntry
 from app.utils.analysis import classify_category
@@ -24,8 +25,7 @@ async def get_insights(
     uid_str = str(user["user_id"])
     uid = PydanticObjectId(uid_str)
     
-    match_stage = {"user_id": uid_str}
-    if bank and bank != "All Banks": match_stage["bank"] = {"$regex": bank, "$options": "i"}
+    match_stage = ledger_match(uid_str, bank, SOURCE_KINDS)
     
     # Date Filtering
     if start_date or end_date:
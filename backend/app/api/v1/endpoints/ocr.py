@@ -1,10 +1,12 @@
 import os
 import time
+import asyncio
 import requests
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from app.utils.dependencies import get_current_user
 from app.parsers.gemini_parser import GeminiParser
 from app.parsers.groq_parser import GroqParser
+from app.services.content_cache import content_cache, content_key
 
 router = APIRouter(prefix="/ocr", tags=["ocr"])
 
@@ -24,7 +26,13 @@ async def scan_receipt(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not read file: {str(e)}")
 
-    # 2. Upload to Vercel Blob from Server (Bypasses CORS and secures token)
+    # 2. Same image + model already scanned → return the cached result (no upload, no AI call)
+    cache_key = content_key("receipt", model, content)
+    cached = await content_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # 3. Upload to Vercel Blob from Server (Bypasses CORS and secures token)
     blob_token = os.getenv("BLOB_READ_WRITE_TOKEN")
     if not blob_token:
         raise HTTPException(status_code=500, detail="Vercel Blob token not configured on server")
@@ -51,15 +59,21 @@ async def scan_receipt(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Storage error: {str(e)}")
 
-    # 3. Parse with selected provider
+    # 4. Parse with selected provider (blocking SDK call → worker thread)
     try:
+        started = time.perf_counter()
         if "llama" in model.lower():
             parser = GroqParser()
-            result = parser.scan_receipt(image_bytes=content, model_name=model)
+            result = await asyncio.to_thread(parser.scan_receipt, image_bytes=content, model_name=model)
         else:
             parser = GeminiParser()
-            result = parser.scan_receipt(image_url=final_image_url, image_bytes=content, model_name=model)
-            
-        return result
+            result = await asyncio.to_thread(parser.scan_receipt, image_url=final_image_url, image_bytes=content, model_name=model)
+        latency_ms = (time.perf_counter() - started) * 1000
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI Parsing failed: {str(e)}")
+
+    # Only cache real extractions, not error / rate-limit placeholders
+    merchant = result.get("merchant")
+    if merchant and "Rate Limit" not in merchant:
+        await content_cache.set(cache_key, result, "receipt", model, latency_ms)
+    return result
@@ -6,6 +6,7 @@ from io import BytesIO
 
 from app.utils.dependencies import get_current_user
 from app.models.transaction import Transaction
+from app.services.bank_dimension import ledger_match, SOURCE_KINDS
 
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
@@ -23,10 +24,7 @@ async def download_summary_report(
 ):
     user_id = str(user["user_id"])
     
-    match_stage = {"user_id": user_id}
-    
-    if bank and bank != "All Banks":
-        match_stage["bank"] = {"$regex": bank, "$options": "i"}
+    match_stage = ledger_match(user_id, bank, SOURCE_KINDS)
 
     if start_date or end_date:
         date_filter = {}
@@ -3,6 +3,7 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 from app.utils.dependencies import get_current_user
 from app.models.transaction import Transaction
+from app.services.bank_dimension import ledger_match, SOURCE_KINDS
 from pydantic import BaseModel
 from bson import ObjectId
 
@@ -23,10 +24,7 @@ async def get_subscriptions(
     user = Depends(get_current_user)
 ):
     user_id = str(user["user_id"])
-    match_stage = {"user_id": user_id, "debit": {"$gt": 0}}
-    
-    if bank and bank != "All Banks":
-        match_stage["bank"] = {"$regex": bank, "$options": "i"}
+    match_stage = {**ledger_match(user_id, bank, SOURCE_KINDS), "debit": {"$gt": 0}}
 
     # Look back 6 months for robust heuristic data
     six_months_ago = datetime.now() - timedelta(days=180)
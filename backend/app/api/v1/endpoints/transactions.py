@@ -1,18 +1,60 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from typing import Optional, List
 from bson import ObjectId
+from bson.errors import InvalidId
+import json
+import base64
+import importlib.util
 from app.utils.dependencies import get_current_user
 from app.models.transaction import Transaction
+from app.services.transaction_query import run_list_query, format_row
+from app.services.search_index import search_filter, search_grams, relevance_stage, SEARCH_FIELDS
+from app.services.bank_dimension import ledger_match, bank_key, source_kind, SOURCE_REALTIME
+from app.services.transaction_export import cursor_batches, export_stream, EXPORT_FORMATS
 from app.db.session import init_db
 from datetime import datetime
-from beanie.operators import RegEx, Or
+from beanie.operators import Or
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+
+def _encode_cursor(date, oid, direction: str) -> str:
+    """Opaque keyset cursor: the (date, _id) of a boundary row + which way to read."""
+    raw = {"d": date.isoformat() if date else None, "i": str(oid), "r": direction}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        date = datetime.fromisoformat(raw["d"]) if raw["d"] else None
+        return date, ObjectId(raw["i"]), raw.get("r", "next")
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _seek_filter(date, oid, direction: int) -> dict:
+    """
+    Rows strictly after (date, _id) when scanning in `direction` (-1 desc / 1 asc).
+    A range on the (user_id, date) index instead of skipping. Null dates sort
+    lowest, and `$lt` never matches null, so they get their own branch.
+    """
+    op = "$lt" if direction < 0 else "$gt"
+    tie = {"date": date, "_id": {op: oid}}
+    if date is None:
+        return tie if direction < 0 else {"$or": [{"date": {"$ne": None}}, tie]}
+    branches = [{"date": {op: date}}, tie]
+    if direction < 0:
+        branches.append({"date": None})
+    return {"$or": branches}
+
+
 @router.get("")
 async def get_transactions(
     page: int = 1, 
     limit: int = 20, 
+    cursor: Optional[str] = Query(None),
+    mode: str = "page",
     search: Optional[str] = None,
     type: str = "all", 
     sort: str = "desc",
@@ -22,50 +64,43 @@ async def get_transactions(
     amount: Optional[float] = Query(None),
     user = Depends(get_current_user)
 ):
+    """
+    Two paging modes over the same (date, _id) order:
+      page    page/limit with skip — for jump-to-page
+      cursor  keyset: pass `mode=cursor` for the first page, then the
+              returned `next_cursor` / `prev_cursor` as `cursor`; every page
+              costs the same, however deep
+    sort: desc | asc | relevance (with a search, page mode: best payee /
+    description matches first, newest first within a tier)
+    """
     skip = (page - 1) * limit
+    keyset = cursor is not None or mode == "cursor"
     
-    # 1. Base Query: Always filter by user and exclude manually added entries
-    # handled by the Daily module or legacy manual entries
-    find_query = Transaction.find(
-        Transaction.user_id == str(user["user_id"]),
-        Transaction.bank != "Manually Added",
-        Transaction.bank != "Cash/Manual",
-        Transaction.bank != "Manual"
-    )
-    
-    # 2. NEW: Bank Filtering Logic
-    if bank and bank != "All Banks":
-        find_query = find_query.find(RegEx(Transaction.bank, bank, "i"))
+    # 1-2. Base Query: the user's statement / realtime rows (manual entries live in
+    # the Daily module), optionally one bank — exact on the canonical bank_key
+    find_query = Transaction.find(ledger_match(str(user["user_id"]), bank))
 
-    # 3. Search Logic
+    # 3. Search Logic — trigram index on description / payee / bank, then the
+    #    fuzzy regex (spaces ignored: "bo-o" matches "bo- okmyshow") on the candidates
     if search:
-        import re
-        # Make search robust against spaces (e.g. "bo-o" will match "bo- okmyshow")
-        # b\s*o\s*\-\s*o
-        fuzzy_pattern = r"\s*".join(re.escape(char) for char in search if not char.isspace())
-        
-        search_or = [
-            RegEx(Transaction.description, fuzzy_pattern, "i"),
-            RegEx(Transaction.payee, fuzzy_pattern, "i"),
-            RegEx(Transaction.bank, fuzzy_pattern, "i")
-        ]
+        search_or = [search_filter(search)]
         
         search_lower = search.strip().lower()
         if search_lower == "debit" or search_lower == "deb" or search_lower == "debit (-)":
-            search_or.append(Transaction.debit > 0)
+            search_or.append({"debit": {"$gt": 0}})
         if search_lower == "credit" or search_lower == "cred" or search_lower == "credit (+)":
-            search_or.append(Transaction.credit > 0)
+            search_or.append({"credit": {"$gt": 0}})
             
         # 3.1 NEW: Amount Searching
         clean_numeric = search.replace(',', '').replace('$', '').replace('₹', '').strip()
         try:
             amount_val = float(clean_numeric)
-            search_or.append(Transaction.debit == amount_val)
-            search_or.append(Transaction.credit == amount_val)
+            search_or.append({"debit": amount_val})
+            search_or.append({"credit": amount_val})
         except ValueError:
             pass
             
-        find_query = find_query.find(Or(*search_or))
+        find_query = find_query.find(search_or[0] if len(search_or) == 1 else {"$or": search_or})
         
     # 4. Transaction Type Filter
     if type == "debit":
@@ -94,49 +129,52 @@ async def get_transactions(
     if amount is not None:
         find_query = find_query.find(Or(Transaction.debit == amount, Transaction.credit == amount))
 
-    # 6. Sorting
-    sort_direction = -1 if sort == "desc" else 1
-    find_query = find_query.sort([("date", sort_direction), ("_id", sort_direction)])
-    
-    # 7. Execution
-    total_count = await find_query.count()
-    
-    # Calculate totals for the filtered results (ignoring pagination)
-    # Using motor directly to avoid Beanie aggregate await issues in some environments
+    # 6. Sorting + execution: the filter is compiled once; rows, total and
+    #    sums come from one $facet aggregation (services/transaction_query.py)
+    sort_direction = 1 if sort == "asc" else -1
+    rank = relevance_stage(search) if sort == "relevance" and search and not keyset else None
     filter_dict = find_query.get_filter_query()
-    pipeline = [
-        {"$match": filter_dict},
-        {
-            "$group": {
-                "_id": None,
-                "total_debit": {"$sum": "$debit"},
-                "total_credit": {"$sum": "$credit"}
-            }
-        }
-    ]
-    
-    aggregation = await Transaction.get_pymongo_collection().aggregate(pipeline).to_list(length=1)
-    agg_result = aggregation[0] if aggregation else {"total_debit": 0, "total_credit": 0}
-    
-    transactions = await find_query.skip(skip).limit(limit).to_list()
-    
-    # 8. Formatting for Frontend
-    data = []
-    for t in transactions:
-        t_dict = t.dict()
-        if t.date:
-            t_dict["date"] = t.date.strftime("%d %b %Y")
-        # Ensure ID is string for frontend
-        if "_id" in t_dict: t_dict["_id"] = str(t_dict["_id"])
-        data.append(t_dict)
-    
+
+    next_cursor = prev_cursor = None
+    read = "next"
+    collection = Transaction.get_pymongo_collection()
+    if keyset:
+        # Seek past the boundary row; "prev" reads backwards from it and flips the rows back
+        seek, scan_direction = None, sort_direction
+        if cursor:
+            seek_date, seek_id, read = _decode_cursor(cursor)
+            scan_direction = -sort_direction if read == "prev" else sort_direction
+            seek = _seek_filter(seek_date, seek_id, scan_direction)
+        result = await run_list_query(collection, filter_dict, sort_direction, limit=limit + 1, keyset=True,
+                                      seek=seek, scan_direction=scan_direction)
+    else:
+        result = await run_list_query(collection, filter_dict, sort_direction, skip=skip, limit=limit, rank=rank)
+    rows = result["rows"]
+    total_count = result["total"]
+
+    if keyset:
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if read == "prev":
+            rows.reverse()
+        if rows:
+            first, last = rows[0], rows[-1]
+            if has_more or read == "prev":
+                next_cursor = _encode_cursor(last.get("date"), last["_id"], "next")
+            if cursor and (has_more or read == "next"):
+                prev_cursor = _encode_cursor(first.get("date"), first["_id"], "prev")
+
+    # 7. Formatting for Frontend (raw documents, no model hydration)
     return {
-        "data": data,
+        "data": [format_row(doc) for doc in rows],
         "total": total_count,
+        "totalEstimated": result["estimated"],
         "totalPages": (total_count + limit - 1) // limit,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
         "summary": {
-            "total_debit": agg_result["total_debit"],
-            "total_credit": agg_result["total_credit"]
+            "total_debit": result["total_debit"],
+            "total_credit": result["total_credit"]
         }
     }
 
@@ -148,37 +186,31 @@ async def export_transactions(
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     amount: Optional[float] = Query(None),
+    format: str = "csv",
+    gzip: bool = False,
     user = Depends(get_current_user)
 ):
     """
-    Exports filtered transactions as a CSV file.
+    Filtered transactions as csv (gzip=true → .csv.gz), xlsx or parquet,
+    read batch by batch from a projected cursor (services/transaction_export.py).
+    csv and parquet stream as they are read; xlsx is sent once the workbook
+    is complete.
     """
-    import csv
-    import io
     from fastapi.responses import StreamingResponse
 
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow on the server. Run: pip install pyarrow")
+
     # Reuse filtering logic (simplified fetch for speed)
-    find_query = Transaction.find(
-        Transaction.user_id == str(user["user_id"]),
-        Transaction.bank != "Manually Added",
-        Transaction.bank != "Cash/Manual",
-        Transaction.bank != "Manual"
-    )
-    
-    if bank and bank != "All Banks":
-        find_query = find_query.find(RegEx(Transaction.bank, bank, "i"))
+    find_query = Transaction.find(ledger_match(str(user["user_id"]), bank))
 
     if search:
-        import re
-        fuzzy_pattern = r"\s*".join(re.escape(char) for char in search if not char.isspace())
-        search_or = [
-            RegEx(Transaction.description, fuzzy_pattern, "i"),
-            RegEx(Transaction.payee, fuzzy_pattern, "i"),
-            RegEx(Transaction.bank, fuzzy_pattern, "i")
-        ]
-        if search.lower() in ["debit", "deb"]: search_or.append(Transaction.debit > 0)
-        if search.lower() in ["credit", "cred"]: search_or.append(Transaction.credit > 0)
-        find_query = find_query.find(Or(*search_or))
+        search_or = [search_filter(search)]
+        if search.lower() in ["debit", "deb"]: search_or.append({"debit": {"$gt": 0}})
+        if search.lower() in ["credit", "cred"]: search_or.append({"credit": {"$gt": 0}})
+        find_query = find_query.find(search_or[0] if len(search_or) == 1 else {"$or": search_or})
         
     if type == "debit": find_query = find_query.find(Transaction.debit > 0)
     elif type == "credit": find_query = find_query.find(Transaction.credit > 0)
@@ -199,34 +231,17 @@ async def export_transactions(
     if amount is not None:
         find_query = find_query.find(Or(Transaction.debit == amount, Transaction.credit == amount))
 
-    # Fetch all matching transactions
-    transactions = await find_query.sort("-date").to_list()
+    # Stream matching transactions, newest first, one cursor batch at a time
+    batches = cursor_batches(Transaction.get_pymongo_collection(), find_query.get_filter_query())
+    gzip = gzip and format == "csv"
+    extension, media_type = EXPORT_FORMATS[format]
+    if gzip:
+        extension, media_type = f"{extension}.gz", "application/gzip"
 
-    # Generate CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(["Date", "Bank", "Description", "Payee", "Category", "Debit", "Credit", "Balance"])
-    
-    for t in transactions:
-        writer.writerow([
-            t.date.strftime("%Y-%m-%d") if t.date else "N/A",
-            t.bank,
-            t.description,
-            t.payee,
-            t.category,
-            f"{t.debit:.2f}" if t.debit else "0.00",
-            f"{t.credit:.2f}" if t.credit else "0.00",
-            f"{t.balance:.2f}"
-        ])
-
-    output.seek(0)
-    
-    filename = f"transactions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    filename = f"transactions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
+        export_stream(batches, format, gzip=gzip),
+        media_type=media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
@@ -243,10 +258,7 @@ async def get_unique_banks(user = Depends(get_current_user)):
     user_id = str(user["user_id"])
     banks = await Transaction.get_pymongo_collection().distinct(
         "bank", 
-        {
-            "user_id": user_id, 
-            "bank": {"$nin": ["Manually Added", "Cash/Manual", "Manual"]}
-        }
+        ledger_match(user_id)
     )
     return sorted([b for b in banks if b])
 
@@ -256,7 +268,7 @@ async def get_banks_summary(user = Depends(get_current_user)):
     
     # Aggregate transaction banks
     pipeline = [
-        {"$match": {"user_id": user_id, "bank": {"$nin": ["Manually Added", "Cash/Manual", "Manual"]}}},
+        {"$match": ledger_match(user_id)},
         {"$sort": {"date": -1, "_id": -1}}, # ensure we get the latest transaction first
         {"$group": {
             "_id": "$bank",
@@ -315,7 +327,7 @@ async def re_extract_payees(user=Depends(get_current_user)):
     # Fetch all transactions with their description (only what we need)
     cursor = collection.find(
         {"user_id": user_id},
-        {"_id": 1, "description": 1, "payee": 1}
+        {"_id": 1, "description": 1, "payee": 1, "bank": 1}
     )
     docs = await cursor.to_list(length=None)
 
@@ -338,7 +350,8 @@ async def re_extract_payees(user=Depends(get_current_user)):
         ops.append(
             UpdateOne(
                 {"_id": doc["_id"]},
-                {"$set": {"payee": new_payee, "category": new_category}}
+                {"$set": {"payee": new_payee, "category": new_category,
+                          "search_grams": search_grams(desc, new_payee, doc.get("bank"))}}
             )
         )
 
@@ -370,6 +383,14 @@ async def update_transaction(id: str, update_data: dict, user = Depends(get_curr
            except Exception:
                pass
 
+        if any(f in update_doc for f in SEARCH_FIELDS):
+            current = {f: getattr(doc, f) for f in SEARCH_FIELDS}
+            merged = {**current, **{f: update_doc[f] for f in SEARCH_FIELDS if f in update_doc}}
+            update_doc["search_grams"] = search_grams(merged["description"], merged["payee"], merged["bank"])
+        if "bank" in update_doc:
+            update_doc["bank_key"] = bank_key(update_doc["bank"])
+            update_doc["source_kind"] = source_kind(update_doc["bank"], realtime=doc.source_kind == SOURCE_REALTIME)
+
         await doc.set(update_doc)
         return {"status": "success", "message": "Transaction updated"}
     except Exception as e:
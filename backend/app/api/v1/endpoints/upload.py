@@ -1,9 +1,21 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks
-import shutil
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from contextlib import aclosing
 import os
+import json
 import uuid
+import asyncio
+import hashlib
+import zipfile
+from datetime import datetime
 from app.utils.dependencies import get_current_user
-from app.services.pipeline import process_statement_pipeline
+from app.utils.unlock_pdf import is_encrypted_pdf
+from app.services.pdf_source import unlock_to_file
+from app.services.job_queue import store_upload, enqueue_statement, create_batch, batch_progress, settle_batch, BATCH_KIND
+from app.services.statement_fingerprint import find_duplicate
+from app.services.progress_bus import job_updates, STREAM_PROJECTION
+from app.parsers.tabular import file_kind as detect_file_kind
+from app.models.job import JobStatus
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
@@ -11,12 +23,15 @@ router = APIRouter(prefix="/upload", tags=["upload"])
 # On local dev, /tmp also works. Falls back to a local dir if /tmp is unavailable.
 TEMP_DIR = "/tmp/bank_uploads" if os.path.exists("/tmp") else "temp_uploads"
 
+# Batch uploads: statements per batch, and the most an archive may expand to
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+BATCH_MAX_MB = int(os.getenv("BATCH_MAX_MB", "500"))
+
 import logging
 logger = logging.getLogger(__name__)
 
 @router.post("/")
 async def upload_pdf(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...), 
     bank: str = Form(...), 
     password: str | None = Form(None), 
@@ -24,6 +39,11 @@ async def upload_pdf(
 ):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file uploaded")
+
+    # PDF statements, or CSV / XLSX / XLS / OFX exports (parsers/tabular.py)
+    file_kind = detect_file_kind(file.filename)
+    if file_kind is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Upload a PDF, CSV, XLS/XLSX or OFX statement.")
     
     logger.info(f"📥 Received file upload: {file.filename} from user {user.get('user_id')}")
 
@@ -35,40 +55,260 @@ async def upload_pdf(
     temp_filename = f"{uuid.uuid4()}.{file_ext}"
     temp_path = os.path.join(TEMP_DIR, temp_filename)
     
-    # Stream write to disk
+    # Stream write to disk, hashing the raw bytes on the way
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        raw_sha256 = await asyncio.to_thread(_save_stream, file.file, temp_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {e}")
     finally:
         file.file.close()
 
-    # Create Job
+    user_id = str(user["user_id"])
+    try:
+        return await _accept_file(temp_path, file.filename, file_kind, bank, password, user_id, raw_sha256)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _save_stream(stream, temp_path: str) -> str:
+    """Copy an upload to disk in 1 MB chunks; returns the sha256 of the raw bytes."""
+    raw_digest = hashlib.sha256()
+    with open(temp_path, "wb") as buffer:
+        for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+            raw_digest.update(chunk)
+            buffer.write(chunk)
+    return raw_digest.hexdigest()
+
+
+async def _accept_file(temp_path: str, filename: str, file_kind: str, bank: str, password: str | None,
+                       user_id: str, raw_sha256: str, parent_job_id: str | None = None) -> dict:
+    """
+    Dedup, unlock, store and enqueue one saved upload; removes `temp_path`.
+    Raises ValueError for a wrong / missing PDF password.
+    """
+    # Same file already imported for this account → finished job, nothing queued
+    duplicate = await find_duplicate(user_id, f"{user_id}_{bank.upper().strip()}", raw_sha256)
+    if duplicate:
+        os.remove(temp_path)
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        await JobStatus(
+            job_id=job_id, status="completed", message="Statement already imported — nothing new",
+            user_id=user_id, bank=bank, filename=filename, file_kind=file_kind, raw_sha256=raw_sha256,
+            parent_job_id=parent_job_id,
+            total_pages=duplicate.page_count, processed_pages=duplicate.page_count,
+            skipped_pages=duplicate.page_count, skipped_rows=len(duplicate.txn_hashes),
+            duplicate_of=duplicate.job_id, created_at=now, updated_at=now, finished_at=now,
+        ).insert()
+        logger.info(f"♻️ {filename} matches job {duplicate.job_id}; not queued")
+        return {"status": "completed", "jobId": job_id, "message": "This statement was already imported."}
+
+    # Unlock here so the queue never stores a password, then hand the file to GridFS
+    unlocked_path = temp_path
+    try:
+        if file_kind == "pdf" and await asyncio.to_thread(is_encrypted_pdf, temp_path):
+            unlocked_path = await asyncio.to_thread(unlock_to_file, temp_path, password)
+        file_id = await store_upload(unlocked_path, filename)
+    finally:
+        for path in {temp_path, unlocked_path}:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Enqueue — a worker (python -m app.worker) picks it up
     job_id = str(uuid.uuid4())
-    from app.services.job_store import create_job, get_job
-    await create_job(job_id)
-    
-    # Trigger Pipeline with Job ID
-    background_tasks.add_task(
-        process_statement_pipeline, 
-        temp_path, 
-        bank, 
-        password, 
-        str(user["user_id"]),
-        job_id
-    )
-    
+    await enqueue_statement(job_id, user_id, bank, file_id, filename, raw_sha256, file_kind, parent_job_id)
+
     return {
-        "status": "processing",
+        "status": "queued",
         "jobId": job_id,
-        "message": "File accepted. Processing started in background."
+        "message": "File accepted. Processing will start shortly."
     }
 
+
+def _expand_zip(zip_path: str, dest_dir: str) -> list[tuple[str, str, str]]:
+    """Extract the statement files of an archive; returns [(temp_path, filename, raw_sha256)]."""
+    out = []
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [m for m in archive.infolist()
+                   if not m.is_dir() and not m.filename.startswith("__MACOSX/")
+                   and not os.path.basename(m.filename).startswith(".")]
+        if len(members) > BATCH_MAX_FILES:
+            raise ValueError(f"Archive has {len(members)} files; at most {BATCH_MAX_FILES} per batch.")
+        if sum(m.file_size for m in members) > BATCH_MAX_MB * 1024 * 1024:
+            raise ValueError(f"Archive expands to more than {BATCH_MAX_MB} MB.")
+        try:
+            for m in members:
+                name = os.path.basename(m.filename)
+                kind = detect_file_kind(name)
+                if kind is None:
+                    continue
+                temp_path = os.path.join(dest_dir, f"{uuid.uuid4()}.{kind}")
+                with archive.open(m) as src:
+                    out.append((temp_path, name, _save_stream(src, temp_path)))
+        except Exception:
+            for temp_path, _, _ in out:
+                os.remove(temp_path)
+            raise
+    return out
+
+
+@router.post("/batch")
+async def upload_batch(
+    files: list[UploadFile] = File(...),
+    bank: str = Form(...),
+    banks: str | None = Form(None),
+    password: str | None = Form(None),
+    user = Depends(get_current_user)
+):
+    """
+    Several statements at once — individual files and/or .zip archives.
+    One parent job, one child job per statement; workers run the children
+    concurrently (at most USER_MAX_CONCURRENT_JOBS per user). `banks` is an
+    optional JSON object {filename: bank} overriding `bank` per file.
+    Progress: GET /upload/status/{batchId}.
+    """
+    user_id = str(user["user_id"])
+    try:
+        bank_by_file = json.loads(banks) if banks else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="banks must be a JSON object of {filename: bank}")
+    os.makedirs(TEMP_DIR, exist_ok=True)
+
+    # 1. Everything to disk (archives expanded), hashing as we go
+    saved: list[tuple[str, str, str]] = []
+    try:
+        for file in files:
+            name = file.filename or "upload"
+            is_zip = name.lower().endswith(".zip")
+            kind = detect_file_kind(name)
+            if not is_zip and kind is None:
+                raise HTTPException(status_code=400, detail=f"Unsupported file type: {name}")
+            temp_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}.{'zip' if is_zip else kind}")
+            raw_sha256 = await asyncio.to_thread(_save_stream, file.file, temp_path)
+            file.file.close()
+            if is_zip:
+                try:
+                    saved.extend(await asyncio.to_thread(_expand_zip, temp_path, TEMP_DIR))
+                except (zipfile.BadZipFile, ValueError) as e:
+                    raise HTTPException(status_code=400, detail=f"{name}: {e}")
+                finally:
+                    os.remove(temp_path)
+            else:
+                saved.append((temp_path, name, raw_sha256))
+        if not saved:
+            raise HTTPException(status_code=400, detail="No statement files in the upload")
+        if len(saved) > BATCH_MAX_FILES:
+            raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_FILES} files per batch")
+    except BaseException:
+        for temp_path, _, _ in saved:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+
+    # 2. One child job per distinct file; the same bytes twice in a batch are queued once
+    batch_id = str(uuid.uuid4())
+    seen: dict[str, str] = {}
+    results = []
+    for temp_path, name, raw_sha256 in saved:
+        if raw_sha256 in seen:
+            os.remove(temp_path)
+            results.append({"filename": name, "status": "skipped",
+                            "message": f"Same file as {seen[raw_sha256]} in this batch"})
+            continue
+        seen[raw_sha256] = name
+        file_bank = bank_by_file.get(name, bank)
+        try:
+            result = await _accept_file(temp_path, name, detect_file_kind(name), file_bank, password,
+                                        user_id, raw_sha256, parent_job_id=batch_id)
+        except ValueError as e:
+            # Wrong password etc. — recorded as a failed child, the rest of the batch goes on
+            job_id = str(uuid.uuid4())
+            now = datetime.utcnow()
+            await JobStatus(job_id=job_id, status="failed", message=str(e), user_id=user_id, bank=file_bank,
+                            filename=name, file_kind=detect_file_kind(name), parent_job_id=batch_id,
+                            created_at=now, updated_at=now, finished_at=now).insert()
+            result = {"status": "failed", "jobId": job_id, "message": str(e)}
+        results.append({"filename": name, "bank": file_bank, **result})
+
+    child_ids = [r["jobId"] for r in results if "jobId" in r]
+    await create_batch(batch_id, user_id, bank, child_ids, f"{len(child_ids)} files")
+    # Children that finished before the parent existed (duplicates, bad passwords, fast workers)
+    await settle_batch(batch_id)
+    logger.info(f"📦 Batch {batch_id}: {len(child_ids)} jobs for user {user_id}")
+    return {"status": "queued", "batchId": batch_id, "jobId": batch_id, "files": results}
+
+
 @router.get("/status/{job_id}")
 async def get_upload_status(job_id: str):
     from app.services.job_store import get_job
     job = await get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job
+    if job.file_kind == BATCH_KIND:
+        # Parent of a batch upload: progress summed over its child jobs
+        return await batch_progress(job.dict())
+    # Queue internals (GridFS id, lease, parser checkpoint) and the per-page decision log stay server-side
+    return job.dict(exclude={"file_id", "worker_id", "lease_expires_at", "checkpoint_state", "page_decisions"})
+
+async def _progress_updates(job_id: str):
+    """job_updates() for a job or a batch parent; None when there is no such job."""
+    doc = await JobStatus.get_pymongo_collection().find_one({"job_id": job_id}, STREAM_PROJECTION)
+    if not doc:
+        return None
+    if doc.get("file_kind") == BATCH_KIND:
+        return job_updates(job_id, await batch_progress(doc), children=doc.get("child_job_ids", []),
+                           aggregate=lambda: batch_progress(doc))
+    return job_updates(job_id, doc)
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+@router.get("/events/{job_id}")
+async def stream_upload_status(job_id: str):
+    """
+    Server-Sent Events: the job's status document on every change (instead of
+    polling /status). Ends with a `done` event once the job completes or fails.
+    """
+    updates = await _progress_updates(job_id)
+    if updates is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async with aclosing(updates):
+            async for doc in updates:
+                if doc is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: progress\ndata: {json.dumps(doc, default=_json_default)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/ws/{job_id}")
+async def upload_status_socket(websocket: WebSocket, job_id: str):
+    """Same updates as /events over a WebSocket: {"type": "progress" | "ping" | "done", "job": ...}."""
+    await websocket.accept()
+    updates = await _progress_updates(job_id)
+    if updates is None:
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    try:
+        async with aclosing(updates):
+            async for doc in updates:
+                message = {"type": "ping"} if doc is None else {"type": "progress", "job": doc}
+                await websocket.send_text(json.dumps(message, default=_json_default))
+        await websocket.send_text(json.dumps({"type": "done"}))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/metrics")
+async def get_ingest_metrics(user = Depends(get_current_user)):
+    """Hit ratios of this process's ingestion caches."""
+    from app.utils.memo import memo_stats
+    from app.services.content_cache import content_cache
+    return {"payee_memo": memo_stats(), "llm_cache": content_cache.stats.as_dict()}
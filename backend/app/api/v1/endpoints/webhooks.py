@@ -4,6 +4,8 @@ from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, Request, Header, HTTPException
 from app.models.transaction import Transaction
+from app.services.search_index import search_grams
+from app.services.bank_dimension import bank_key, source_kind, REALTIME_ACCOUNT_ID
 
 router = APIRouter()
 
@@ -67,7 +69,7 @@ async def handle_upi_webhook(
     try:
         new_txn = Transaction(
             user_id=user_id,
-            account_id="realtime_acc", 
+            account_id=REALTIME_ACCOUNT_ID, 
             hash=txn_hash,
             date=datetime.utcnow(),
             description=f"⚡ {raw_text}",
@@ -76,6 +78,9 @@ async def handle_upi_webhook(
             credit=amount if is_credit else 0.0,
             bank=app_source.upper(),
             category="Real-time Sync",
+            search_grams=search_grams(f"⚡ {raw_text}", payee, app_source),
+            bank_key=bank_key(app_source),
+            source_kind=source_kind(app_source.upper(), realtime=True),
             balance=0.0, # Balance is unknown from notification
             updated_at=datetime.utcnow()
         )
@@ -14,6 +14,9 @@ from app.models.property import PropertyAsset
 from app.models.income import IncomeEntry
 from app.models.subscription import Subscription
 from app.models.emi import EMIEntry
+from app.models.llm_cache import LLMCacheEntry
+from app.models.statement_fingerprint import StatementFingerprint
+from app.models.payee_memo import PayeeMemoEntry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,7 +26,7 @@ async def init_db():
         logger.info("🔌 Connecting to MongoDB...")
         client = AsyncIOMotorClient(os.getenv("MONGO_URI"))
         db = client[os.getenv("DB_NAME")]
-        await init_beanie(database=db, document_models=[Transaction, BudgetEntry, JobStatus, DailyBudgetEntry, Goal, CalendarNeed, WalletTransaction, LendBorrowEntry, MetalAsset, PropertyAsset, IncomeEntry, Subscription, EMIEntry])
+        await init_beanie(database=db, document_models=[Transaction, BudgetEntry, JobStatus, DailyBudgetEntry, Goal, CalendarNeed, WalletTransaction, LendBorrowEntry, MetalAsset, PropertyAsset, IncomeEntry, Subscription, EMIEntry, LLMCacheEntry, StatementFingerprint, PayeeMemoEntry])
         logger.info("✅ MongoDB & Beanie Initialized Successfully")
     except Exception as e:
         logger.critical(f"🔥 DATABASE CONNECTION FAILED: {e}", exc_info=True)
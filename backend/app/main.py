@@ -5,7 +5,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.endpoints import auth, transactions, upload, insights, budget, webhooks, daily_budget, reports, subscriptions, goals, calendar, ocr, wallet, lendborrow, metals, properties, income, my_subscriptions, emi
 from app.db.session import init_db
 from app.services.subscription_scheduler import start_scheduler, stop_scheduler
+from app.services.parse_executor import shutdown_executor
+from app.services.job_queue import StatementWorker
+from app.utils.memo import load_memos
+from app.services.bank_dimension import ensure_backfilled
+import asyncio
 import logging
+import os
 
 # Global Logging Config
 logging.basicConfig(
@@ -21,10 +27,26 @@ load_dotenv()
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    await load_memos()          # 🧠 warm payee/category memo from Mongo
     start_scheduler()           # 🕐 auto subscription reminders every 24 h
+    # 🏦 one-time bank_key / source_kind backfill (no-op once recorded); filters cope meanwhile
+    backfill_task = asyncio.create_task(ensure_backfilled())
+
+    # 👷 In-process ingestion worker, so a single-box deployment processes uploads.
+    # Deployments that run `python -m app.worker` separately set this to 0.
+    worker, worker_task = None, None
+    embedded = int(os.getenv("INGEST_EMBEDDED_WORKERS", "1"))
+    if embedded > 0:
+        worker = StatementWorker(concurrency=embedded)
+        worker_task = asyncio.create_task(worker.run())
     yield
     # Shutdown
     stop_scheduler()
+    backfill_task.cancel()
+    if worker:
+        worker.stop()
+        await worker_task
+    shutdown_executor()         # 🧵 stop PDF parse worker processes
 
 app = FastAPI(title="Bank App API", version="2.0", lifespan=lifespan)
 
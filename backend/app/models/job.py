@@ -1,16 +1,65 @@
+import os
 from beanie import Document
 from datetime import datetime
 from typing import Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+# Finished (completed / failed) jobs are dropped this long after finished_at
+JOB_TTL_DAYS = int(os.getenv("JOB_TTL_DAYS", "7"))
 
 class JobStatus(Document):
     job_id: str
-    status: str  # "processing", "completed", "failed"
+    status: str  # "queued", "processing", "completed", "failed"
     total_pages: int = 0
     processed_pages: int = 0
+    parsed_pages: int = 0   # pages parsed by any shard (can run ahead of processed_pages)
+    shards_total: int = 0   # page-range shards submitted to the parse pool
+    shards_done: int = 0
+    page_routes: dict = {}      # pre-classification counts: skip / words / tables / llm / known / unparsed
+    page_decisions: list = []   # [{"page", "route", "reason"}], last PAGE_DECISIONS_MAX processed pages
+    unparsed_pages: list = []   # page numbers with no text layer and no renderable image
     total_txns: int = 0
     processed_txns: int = 0
+    inserted_txns: int = 0   # new transactions written
+    updated_txns: int = 0    # existing transactions whose fields changed
+    unchanged_txns: int = 0  # already stored exactly as parsed (no write)
     message: str = ""
+    llm_cache: dict = {}  # hits / misses / hit_rate / saved_ms for LLM page fallback
+    skipped_pages: int = 0  # pages already ingested from an earlier upload (not parsed)
+    skipped_rows: int = 0   # transactions on those pages
+    duplicate_of: Optional[str] = None  # job_id of the identical upload this one matched
+    peak_rss_mb: float = 0.0        # ingestion process high-water mark
+    peak_parse_rss_mb: float = 0.0  # parse worker high-water mark
     updated_at: datetime = datetime.utcnow()
 
+    # ── Ingestion queue (services/job_queue.py) ──
+    user_id: Optional[str] = None
+    bank: Optional[str] = None
+    filename: Optional[str] = None
+    file_kind: str = "pdf"                       # pdf / csv / xlsx / xls / ofx (parsers/tabular.py), or "batch"
+    parent_job_id: Optional[str] = None          # batch upload this file belongs to
+    child_job_ids: list = []                     # batch parent: one job per file
+    file_id: Optional[str] = None               # GridFS id of the (unlocked) statement
+    raw_sha256: Optional[str] = None             # hash of the bytes as uploaded (before unlocking)
+    attempts: int = 0
+    releases: int = 0                            # handed back without an error (shutdown / memory split)
+    worker_id: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None  # a "processing" job past this is reclaimable
+    available_at: Optional[datetime] = None      # retry backoff: not claimable before this
+    checkpoint_page: int = 0                     # pages [0, checkpoint_page) are fully written
+    checkpoint_state: Optional[dict] = None      # parser state (header mapping) at the checkpoint
+    checkpoint_row: int = 0                      # tabular imports: raw rows [0, checkpoint_row) are written
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None       # set on completed / failed; TTL index
+
     class Settings:
-        name = "job_statuses"
\ No newline at end of file
+        name = "job_statuses"
+        indexes = [
+            IndexModel([("job_id", ASCENDING)], unique=True),
+            IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=JOB_TTL_DAYS * 86400),
+            IndexModel([("status", ASCENDING), ("available_at", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+            IndexModel([("parent_job_id", ASCENDING)]),
+        ]
@@ -0,0 +1,24 @@
+import os
+from typing import Any
+from datetime import datetime
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+LLM_CACHE_TTL_DAYS = int(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+
+
+class LLMCacheEntry(Document):
+    key: str                           # sha256(kind | model | normalized content)
+    kind: str                          # "statement_page", "receipt"
+    model: str
+    value: Any = None                  # parsed result (txn list / receipt dict)
+    latency_ms: float = 0.0            # cost of the original call, credited on every hit
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "llm_cache"
+        indexes = [
+            IndexModel([("key", ASCENDING)], unique=True),
+            IndexModel([("created_at", ASCENDING)], expireAfterSeconds=LLM_CACHE_TTL_DAYS * 86400),
+        ]
@@ -0,0 +1,22 @@
+import os
+from datetime import datetime
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+PAYEE_MEMO_TTL_DAYS = int(os.getenv("PAYEE_MEMO_TTL_DAYS", "90"))
+
+
+class PayeeMemoEntry(Document):
+    key: str                           # "<kind>|<version>|<digit-masked narration>"
+    kind: str                          # "payee", "grouping", "category"
+    value: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "payee_memo"
+        indexes = [
+            IndexModel([("key", ASCENDING)], unique=True),
+            IndexModel([("created_at", DESCENDING)]),
+            IndexModel([("created_at", ASCENDING)], expireAfterSeconds=PAYEE_MEMO_TTL_DAYS * 86400),
+        ]
@@ -0,0 +1,26 @@
+from beanie import Document
+from datetime import datetime
+from typing import List, Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+class StatementFingerprint(Document):
+    """One row per ingested statement file — lets re-uploads short-circuit."""
+    user_id: str
+    account_id: str
+    job_id: Optional[str] = None
+    raw_sha256: Optional[str] = None       # bytes as uploaded (possibly encrypted)
+    unlocked_sha256: Optional[str] = None  # bytes actually parsed
+    page_count: int = 0
+    page_hashes: List[str] = []            # sha256 of each page's content + resources
+    page_rows: List[int] = []              # transactions written from each page
+    txn_hashes: List[str] = []             # Transaction.hash of every row written
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "statement_fingerprints"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("account_id", ASCENDING), ("raw_sha256", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("account_id", ASCENDING), ("unlocked_sha256", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("account_id", ASCENDING), ("page_hashes", ASCENDING)]),
+        ]
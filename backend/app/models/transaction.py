@@ -1,6 +1,6 @@
 from beanie import Document
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pymongo import IndexModel, ASCENDING, DESCENDING
 
 class Transaction(Document):
@@ -18,6 +18,9 @@ class Transaction(Document):
     bank: str
     type: Optional[str] = None
     updated_at: datetime = datetime.utcnow()
+    search_grams: Optional[List[str]] = None  # trigrams for /transactions search (services/search_index.py)
+    bank_key: Optional[str] = None     # canonical bank for exact filters (services/bank_dimension.py)
+    source_kind: Optional[str] = None  # statement | realtime | manual
 
     class Settings:
         name = "transactions"
@@ -25,4 +28,6 @@ class Transaction(Document):
             IndexModel([("hash", ASCENDING)], unique=True),
             IndexModel([("user_id", ASCENDING), ("date", DESCENDING)]),
             IndexModel([("payee", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("search_grams", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("source_kind", ASCENDING), ("bank_key", ASCENDING), ("date", DESCENDING)]),
         ]
@@ -1,13 +1,23 @@
 from .base import BaseParser
+from .column_decoder import ColumnDecoders
 import re
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+COMMON_DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d %b %Y", "%d/%m/%y"]
+
 class CommonBankParser(BaseParser):
     def __init__(self):
         self.header_mapping = None
+        self.decoders = None  # inferred from the first data rows after a header
+
+    def export_state(self):
+        return self.header_mapping
+
+    def restore_state(self, state) -> None:
+        if state:
+            self.header_mapping = state
 
     def _discover_headers(self, row):
         """
@@ -34,6 +44,7 @@ class CommonBankParser(BaseParser):
 
     def parse_page(self, page):
         txns = []
+        self.last_strategy = None
         
         # Dual Strategy: First try 'lines' (grid), then 'text' (no borders)
         settings_list = [
@@ -46,9 +57,8 @@ class CommonBankParser(BaseParser):
             if not tables: continue
 
             for table in tables:
-                for row in table:
-                    # Clean the row
-                    row = [str(cell).strip() if cell else "" for cell in row]
+                rows = [[str(cell).strip() if cell else "" for cell in row] for row in table]
+                for n, row in enumerate(rows):
                     if len(row) < 4: continue
 
                     # 1. Header Detection
@@ -56,6 +66,7 @@ class CommonBankParser(BaseParser):
                     if discovered:
                         self.header_mapping = discovered
                         logger.info(f"🔍 Discovered Structure: {self.header_mapping}")
+                        self.decoders = None
                         continue
 
                     if not self.header_mapping:
@@ -68,17 +79,14 @@ class CommonBankParser(BaseParser):
                     if not re.search(date_pattern, date_val):
                         continue
 
+                    if self.decoders is None:
+                        self.decoders = ColumnDecoders(COMMON_DATE_FORMATS, signed=False)
+                        self.decoders.infer(rows[n:n + 16], self.header_mapping)
+
                     try:
                         # --- CRITICAL: DATE CONVERSION TO DATETIME OBJECT ---
                         clean_date_str = date_val.strip()
-                        date_obj = None
-                        
-                        # Try common bank formats
-                        for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d %b %Y", "%d/%m/%y"):
-                            try:
-                                date_obj = datetime.strptime(clean_date_str, fmt)
-                                break
-                            except: continue
+                        date_obj = self.decoders.date.decode(clean_date_str)
 
                         if not date_obj:
                             logger.warning(f"⚠️ Skip row: Unrecognized date format '{date_val}'")
@@ -87,9 +95,7 @@ class CommonBankParser(BaseParser):
                         # --- NUMBER CLEANING ---
                         def clean_num(key):
                             if key not in self.header_mapping: return 0.0
-                            val = row[self.header_mapping[key]]
-                            cleaned = "".join(re.findall(r"[\d.]", val.replace(",", "")))
-                            return float(cleaned) if cleaned else 0.0
+                            return self.decoders.amount(key).decode(row[self.header_mapping[key]])
 
                         debit = clean_num("debit")
                         credit = clean_num("credit")
@@ -118,7 +124,9 @@ class CommonBankParser(BaseParser):
                         logger.debug(f"Row skip error: {e}")
                         continue
             
-            if txns: break # If lattice worked, don't use text strategy
+            if txns:
+                self.last_strategy = f"{settings['vertical_strategy']}+{settings['horizontal_strategy']}"
+                break # If lattice worked, don't use text strategy
 
         return txns
 
@@ -1,4 +1,18 @@
+class StatementFileError(ValueError):
+    """The uploaded file itself is unusable (encrypted, no transaction table, unsupported) — retrying won't help."""
+
+
 class BaseParser:
+    # When True, pages that need the LLM fallback are not sent inline; their text
+    # (PNG bytes for a page without a text layer) is left in `deferred_text` for
+    # the caller (see services/llm_stage.py).
+    defer_llm = False
+    deferred_text = None
+    # How the last parse_page() got its rows ("words", "lines+lines", "llm", ...); for stats/benchmarks
+    last_strategy = None
+    # Pre-classification of the last page ({"route", "reason", ...}, see page_classifier.py)
+    last_route = None
+
     def parse_page(self, page) -> list:
         """Parse a single pdfplumber Page object. Return list of raw transaction dicts."""
         raise NotImplementedError
@@ -9,3 +23,15 @@ class BaseParser:
         for page in pdf.pages:
             all_txns.extend(self.parse_page(page))
         return all_txns
+
+    def export_state(self):
+        """Return the cross-page state (e.g. the header mapping) so another parser instance can resume."""
+        return None
+
+    def restore_state(self, state) -> None:
+        """Seed this parser with state previously returned by export_state()."""
+        pass
+
+    def has_header(self) -> bool:
+        """True once the parser knows the table columns, i.e. a later page can be parsed without this one."""
+        return bool(self.export_state())
@@ -0,0 +1,184 @@
+"""
+Column decoders — date and amount cells decoded without exception-driven fallback.
+
+`datetime.strptime` in a loop over ten formats raises (and catches) up to nine
+ValueErrors per date cell. Here every format is compiled once into a regex,
+the format that fits a column is inferred from its first data rows and tried
+first, and the matched fields are validated before building the datetime, so
+nothing ever raises.
+
+Amounts get the same treatment: whether a signed column writes negatives with
+a trailing minus is inferred from the first rows, and the rest of the column
+goes through one precompiled substitution + full-match check instead of
+findall / float() / except. Digit grouping (lakh or western) needs no
+inference, since every separator is stripped, and Dr/Cr markers are left to
+smart_universal, which reads them from the raw cell text.
+
+The decoders give the same answers as the strptime loop / `re.findall`
+cleaners they replace, except that a trailing minus ("1,234.50-") now decodes
+as a negative number instead of 0.0 for signed columns. Separate debit /
+credit columns are stored as magnitudes (smart_universal takes abs()), so
+only a single signed amount column or the balance keeps the sign.
+tests/test_column_decoder.py checks both decoders against the old paths.
+"""
+import re
+from datetime import datetime
+
+# Default format list (same order and meaning as the old strptime loop)
+DATE_FORMATS = [
+    "%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d %b %Y",
+    "%d/%m/%y", "%d-%m-%y", "%d %b %y",
+    "%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y",
+]
+
+# Rows looked at when inferring a column's format / style
+INFER_SAMPLE_ROWS = 8
+
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_MONTH_NUM = {m: i + 1 for i, m in enumerate(_MONTHS)}
+_MONTH_DAYS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# strptime's own patterns for the directives used above
+_DIRECTIVES = {
+    "d": r"(?P<d>3[01]|[12]\d|0[1-9]|[1-9]| [1-9])",
+    "m": r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+    "Y": r"(?P<Y>\d\d\d\d)",
+    "y": r"(?P<y>\d\d)",
+    "b": r"(?P<b>" + "|".join(_MONTHS) + ")",
+}
+
+# "01/04/2024 10:32" → the time part is dropped before matching
+_TIME_SUFFIX = re.compile(r"\s+\d{2}:\d{2}")
+
+
+def compile_date_format(fmt: str) -> re.Pattern:
+    parts, i = [], 0
+    while i < len(fmt):
+        if fmt[i] == "%" and i + 1 < len(fmt):
+            parts.append(_DIRECTIVES[fmt[i + 1]])
+            i += 2
+        elif fmt[i].isspace():
+            parts.append(r"\s+")
+            i += 1
+        else:
+            parts.append(re.escape(fmt[i]))
+            i += 1
+    return re.compile("".join(parts), re.IGNORECASE)
+
+
+def _build_date(match: re.Match) -> datetime | None:
+    g = match.groupdict()
+    if g.get("Y") is not None:
+        year = int(g["Y"])
+    else:
+        # strptime's %y pivot: 69-99 → 19xx, 00-68 → 20xx
+        year = int(g["y"])
+        year += 1900 if year >= 69 else 2000
+    month = _MONTH_NUM[g["b"].lower()] if g.get("b") is not None else int(g["m"])
+    day = int(g["d"])
+    leap = month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if year < 1 or day > _MONTH_DAYS[month - 1] + leap:
+        return None
+    return datetime(year, month, day)
+
+
+class DateDecoder:
+    """Decodes one date column; `infer()` moves the format that fits the column to the front."""
+
+    def __init__(self, formats: list[str] = DATE_FORMATS):
+        self.formats = list(formats)
+        self._patterns = [compile_date_format(f) for f in self.formats]
+        self.inferred: str | None = None
+
+    def infer(self, cells: list[str]) -> str | None:
+        """Pick the format matching most of the sample cells; returns it (or None)."""
+        samples = [_TIME_SUFFIX.split(c.strip(), 1)[0].strip() for c in cells if c and c.strip()]
+        best, best_hits = None, 0
+        for n, pattern in enumerate(self._patterns):
+            hits = sum(1 for s in samples[:INFER_SAMPLE_ROWS] if pattern.fullmatch(s))
+            if hits > best_hits:
+                best, best_hits = n, hits
+        if best is not None and best != 0:
+            self._patterns.insert(0, self._patterns.pop(best))
+            self.formats.insert(0, self.formats.pop(best))
+        if best is not None:
+            self.inferred = self.formats[0]
+        return self.inferred
+
+    def decode(self, cell: str) -> datetime | None:
+        if not cell:
+            return None
+        cell = cell.strip()
+        if ":" in cell:
+            cell = _TIME_SUFFIX.split(cell, 1)[0].strip()
+        for pattern in self._patterns:
+            match = pattern.fullmatch(cell)
+            if match:
+                return _build_date(match)
+        return None
+
+
+_SIGNED_JUNK = re.compile(r"[^\d.\-]+")
+_UNSIGNED_JUNK = re.compile(r"[^\d.]+")
+_NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)")
+_TRAILING_MINUS = re.compile(r"\d\s*-\s*$")
+
+
+class AmountDecoder:
+    """
+    Decodes one amount column to float (0.0 when there is no number).
+
+    signed=False drops minus signs entirely (FederalBankParser / CommonBankParser
+    semantics); signed=True keeps a leading minus and, once inferred, a
+    trailing one.
+    """
+
+    def __init__(self, signed: bool = True):
+        self.signed = signed
+        self._junk = _SIGNED_JUNK if signed else _UNSIGNED_JUNK
+        self.style = {"trailing_minus": False}
+
+    def infer(self, cells: list[str]) -> dict:
+        samples = [c for c in cells if c and c.strip()][:INFER_SAMPLE_ROWS]
+        self.style = {"trailing_minus": self.signed and any(_TRAILING_MINUS.search(c) for c in samples)}
+        return self.style
+
+    def decode(self, cell: str) -> float:
+        if not cell:
+            return 0.0
+        s = self._junk.sub("", cell)
+        if self.style["trailing_minus"] and s.endswith("-") and not s.startswith("-"):
+            s = "-" + s[:-1]
+        if not _NUMBER.fullmatch(s):
+            return 0.0
+        return float(s)
+
+
+class ColumnDecoders:
+    """The date decoder plus one amount decoder per financial column of a table mapping."""
+
+    def __init__(self, date_formats: list[str] = DATE_FORMATS, signed: bool = True):
+        self.date = DateDecoder(date_formats)
+        self._signed = signed
+        self._amounts: dict[str, AmountDecoder] = {}
+
+    def amount(self, key: str) -> AmountDecoder:
+        decoder = self._amounts.get(key)
+        if decoder is None:
+            decoder = self._amounts[key] = AmountDecoder(self._signed)
+        return decoder
+
+    def infer(self, rows: list[list[str]], mapping: dict, amount_keys=("debit", "credit", "amount", "balance")) -> None:
+        """Infer every mapped column's format from the first rows that have a digit in the date column."""
+        date_idx = mapping.get("date")
+        if date_idx is None:
+            return
+        data = [r for r in rows if date_idx < len(r) and r[date_idx] and any(ch.isdigit() for ch in r[date_idx])]
+        data = data[:INFER_SAMPLE_ROWS]
+        if not data:
+            return
+        self.date.infer([r[date_idx] for r in data])
+        for key in amount_keys:
+            idx = mapping.get(key)
+            if idx is not None:
+                self.amount(key).infer([r[idx] for r in data if idx < len(r)])
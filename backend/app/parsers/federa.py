@@ -1,16 +1,33 @@
 from .base import BaseParser
+from .column_decoder import ColumnDecoders
+from .page_classifier import classify_page
 import re
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+FEDERAL_DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d %b %Y"]
+
 class FederalBankParser(BaseParser):
     def __init__(self):
         self.header_indices = None
+        self.decoders = None  # inferred from the first data rows after a header
+
+    def export_state(self):
+        return self.header_indices
+
+    def restore_state(self, state) -> None:
+        if state:
+            self.header_indices = state
 
     def parse_page(self, page):
         txns = []
+
+        # No date tokens (cover / summary / disclaimer) or a scanned image: nothing for the grid parser
+        self.last_route = classify_page(page)
+        if self.last_route["route"] in ("skip", "llm"):
+            self.last_strategy = None
+            return []
         
         # 'lines' is the correct strategy to detect the table grid (lattice)
         # 'snap_y_tolerance' helps group multi-line descriptions into one row
@@ -22,6 +39,7 @@ class FederalBankParser(BaseParser):
         }
         
         # Extract all tables found on the page
+        self.last_strategy = "lines+lines"
         tables = page.extract_tables(settings)
         
         if not tables:
@@ -29,15 +47,17 @@ class FederalBankParser(BaseParser):
             # Fallback for pages where lines might be missing or faint
             settings["vertical_strategy"] = "text"
             settings["horizontal_strategy"] = "text"
+            self.last_strategy = "text+text"
             tables = page.extract_tables(settings)
 
         if not tables:
+            self.last_strategy = None
             return []
 
         for table in tables:
-            for row in table:
-                # 1. Basic Cleaning
-                row = [str(cell).strip() if cell else "" for cell in row]
+            rows = [[str(cell).strip() if cell else "" for cell in row] for row in table]
+            for n, row in enumerate(rows):
+                # 1. Basic Cleaning (done above for the whole table)
                 
                 # Skip tiny rows or header junk
                 if len(row) < 4:
@@ -76,6 +96,7 @@ class FederalBankParser(BaseParser):
                             "balance": bal_idx
                         }
                         logger.info(f"✅ Headers identified: {self.header_indices}")
+                        self.decoders = None
                         continue 
                     except StopIteration:
                         pass # Not a header row, or missing required columns
@@ -90,22 +111,24 @@ class FederalBankParser(BaseParser):
                 if not re.search(r"\d", date_cell): # Quick check if it has numbers
                     continue
 
+                if self.decoders is None:
+                    # Unsigned like the old cleaner: Federal never prints negative amounts
+                    self.decoders = ColumnDecoders(FEDERAL_DATE_FORMATS, signed=False)
+                    self.decoders.infer(rows[n:n + 16], self.header_indices)
+
                 try:
                     # Clean the particulars
                     particulars = row[self.header_indices["particulars"]].replace("\n", " ")
                     
                     # Clean numeric values
-                    def clean_num(idx):
+                    def clean_num(key):
+                        idx = self.header_indices[key]
                         if idx is None or idx >= len(row): return 0.0
-                        val = row[idx]
-                        if not val or val.lower() in ["nil", "0", "0.00", ""]: 
-                            return 0.0
-                        cleaned = "".join(re.findall(r"[\d.]", val.replace(",", "")))
-                        return float(cleaned) if cleaned else 0.0
+                        return self.decoders.amount(key).decode(row[idx])
 
-                    debit = clean_num(self.header_indices["debit"])
-                    credit = clean_num(self.header_indices["credit"])
-                    balance = clean_num(self.header_indices["balance"])
+                    debit = clean_num("debit")
+                    credit = clean_num("credit")
+                    balance = clean_num("balance")
 
                     # If both zero, check if it is a "Amount" column with Dr/Cr suffix (rare but possible)
                     # For now, assume Federal Bank always separates Dr/Cr
@@ -115,13 +138,8 @@ class FederalBankParser(BaseParser):
                         continue
                     
                     # Parse Date
-                    date_obj = None
                     clean_date = date_cell.strip()
-                    for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d %b %Y"):
-                        try:
-                            date_obj = datetime.strptime(clean_date, fmt)
-                            break
-                        except: continue
+                    date_obj = self.decoders.date.decode(clean_date)
 
                     txns.append({
                         "bank": "FEDERAL",
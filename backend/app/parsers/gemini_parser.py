@@ -2,7 +2,8 @@
 GeminiParser
 ============
 Uses Google Gemini Flash 2.0 Lite to parse raw page text from a bank statement
-and returns structured transaction data as a list of dicts.
+(or, for a scanned page without a text layer, the page image) and returns
+structured transaction data as a list of dicts.
 
 Only called when pdfplumber strategies yield zero transactions.
 """
@@ -10,6 +11,7 @@ Only called when pdfplumber strategies yield zero transactions.
 import os
 import re
 import json
+import time
 import logging
 from datetime import datetime
 from typing import Optional, Any
@@ -48,6 +50,13 @@ Page text:
 {page_text}
 ---"""
 
+# Stands in for the page text when the page image is sent instead
+PAGE_IMAGE_NOTE = "(This page has no text layer. Its scanned image is attached — read the transactions from it.)"
+
+MULTI_PAGE_RULE = """
+The text above contains several pages, each starting with a "=== PAGE n ===" marker.
+Add a "page" key (the integer n of the page the row appears on) to every transaction."""
+
 RECEIPT_PROMPT = """You are an expert receipt OCR agent. Extract data from the provided receipt image.
 Return a valid JSON object with the following keys:
 - "merchant": string (The name of the store or brand)
@@ -115,63 +124,134 @@ class GeminiParser:
         # Limit text length to stay within token limits
         page_text_trimmed = page_text[:8000]
 
+        # Same page text seen before (re-upload / overlapping statement) → no API call
+        from app.services.content_cache import content_cache, content_key
+        cache_key = content_key("statement_page", GEMINI_MODEL, page_text_trimmed)
+        cached = content_cache.get_local(cache_key)
+        if cached is not None:
+            logger.info("🤖 Gemini page served from cache.")
+            return [{**t, "bank": bank.upper()} for t in cached[0]]
+
         prompt = PROMPT_TEMPLATE.format(bank=bank, page_text=page_text_trimmed)
 
         try:
             client = self._get_client()
+            started = time.perf_counter()
             response = client.models.generate_content(
                 model=GEMINI_MODEL,
                 contents=prompt,
             )
+            txns = self._rows_to_txns(response.text.strip(), bank)
+            # An empty reply may be a one-off (bad JSON, truncated output) — only rows are remembered
+            if txns:
+                content_cache.set_local(cache_key, txns, (time.perf_counter() - started) * 1000)
+            logger.info(f"🤖 Gemini extracted {len(txns)} valid transactions from page.")
+            return txns
 
-            raw_text = response.text.strip()
-            logger.debug(f"🤖 Gemini raw response (first 500 chars): {raw_text[:500]}")
-
-            # Extract JSON array from the response (handle possible markdown code fences)
-            json_match = re.search(r"\[.*\]", raw_text, re.DOTALL)
-            if not json_match:
-                logger.warning("⚠️ Gemini response did not contain a JSON array.")
-                return []
-
-            raw_json = json_match.group(0)
-            rows = json.loads(raw_json)
-
-            if not isinstance(rows, list):
-                logger.warning("⚠️ Gemini returned non-list JSON.")
-                return []
-
-            txns = []
-            for row in rows:
-                if not isinstance(row, dict):
-                    continue
-
-                date_obj = _parse_date(str(row.get("date", "")))
-                if not date_obj:
-                    continue
+        except Exception as e:
+            logger.error(f"❌ GeminiParser error: {e}", exc_info=True)
+            return []
 
-                debit  = _safe_float(row.get("debit", 0))
-                credit = _safe_float(row.get("credit", 0))
+    async def parse_pages_text_async(self, page_texts: list[str], bank: str = "UNKNOWN") -> list:
+        """
+        Send several pages in ONE prompt via the async client.
+        Unlike parse_page_text, API errors (e.g. 429) propagate so the caller can back off.
+        """
+        joined = "\n".join(
+            f"=== PAGE {i + 1} ===\n{text[:8000]}" for i, text in enumerate(page_texts) if text and text.strip()
+        )
+        if not joined:
+            return []
 
-                if debit == 0 and credit == 0:
-                    continue
+        prompt = PROMPT_TEMPLATE.format(bank=bank, page_text=joined)
+        if len(page_texts) > 1:
+            prompt += MULTI_PAGE_RULE
+        client = self._get_client()
+        response = await client.aio.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=prompt,
+        )
+        txns = self._rows_to_txns(response.text.strip(), bank)
+        logger.info(f"🤖 Gemini extracted {len(txns)} valid transactions from {len(page_texts)} pages.")
+        return txns
+
+    def _image_request(self, image: bytes, bank: str) -> dict:
+        prompt = PROMPT_TEMPLATE.format(bank=bank, page_text=PAGE_IMAGE_NOTE)
+        return {"model": GEMINI_MODEL, "contents": [prompt, {"inline_data": {"mime_type": "image/png", "data": image}}]}
+
+    def parse_page_image(self, image: bytes, bank: str = "UNKNOWN") -> list:
+        """Scanned page: send its PNG instead of text. Returns [] on any error, like parse_page_text."""
+        from app.services.content_cache import content_cache, content_key
+        cache_key = content_key("statement_page_image", GEMINI_MODEL, image)
+        cached = content_cache.get_local(cache_key)
+        if cached is not None:
+            logger.info("🤖 Gemini page image served from cache.")
+            return [{**t, "bank": bank.upper()} for t in cached[0]]
+        try:
+            started = time.perf_counter()
+            response = self._get_client().models.generate_content(**self._image_request(image, bank))
+            txns = self._rows_to_txns(response.text.strip(), bank)
+            if txns:
+                content_cache.set_local(cache_key, txns, (time.perf_counter() - started) * 1000)
+            logger.info(f"🤖 Gemini extracted {len(txns)} valid transactions from page image.")
+            return txns
+        except Exception as e:
+            logger.error(f"❌ GeminiParser image error: {e}", exc_info=True)
+            return []
 
-                txns.append({
-                    "bank": bank.upper(),
-                    "date": date_obj,
-                    "description": str(row.get("description", "")).replace("\n", " ").strip(),
-                    "debit": debit,
-                    "credit": credit,
-                    "balance": _safe_float(row.get("balance", 0)),
-                    "type": "DEBIT" if debit > 0 else "CREDIT",
-                })
+    async def parse_page_image_async(self, image: bytes, bank: str = "UNKNOWN") -> list:
+        """Async parse_page_image without the cache; API errors propagate (see parse_pages_text_async)."""
+        response = await self._get_client().aio.models.generate_content(**self._image_request(image, bank))
+        txns = self._rows_to_txns(response.text.strip(), bank)
+        logger.info(f"🤖 Gemini extracted {len(txns)} valid transactions from page image.")
+        return txns
+
+    def _rows_to_txns(self, raw_text: str, bank: str) -> list:
+        """Decode Gemini's JSON array reply into transaction dicts."""
+        logger.debug(f"🤖 Gemini raw response (first 500 chars): {raw_text[:500]}")
+
+        # Extract JSON array from the response (handle possible markdown code fences)
+        json_match = re.search(r"\[.*\]", raw_text, re.DOTALL)
+        if not json_match:
+            logger.warning("⚠️ Gemini response did not contain a JSON array.")
+            return []
 
-            logger.info(f"🤖 Gemini extracted {len(txns)} valid transactions from page.")
-            return txns
+        raw_json = json_match.group(0)
+        rows = json.loads(raw_json)
 
-        except Exception as e:
-            logger.error(f"❌ GeminiParser error: {e}", exc_info=True)
+        if not isinstance(rows, list):
+            logger.warning("⚠️ Gemini returned non-list JSON.")
             return []
 
+        txns = []
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+
+            date_obj = _parse_date(str(row.get("date", "")))
+            if not date_obj:
+                continue
+
+            debit  = _safe_float(row.get("debit", 0))
+            credit = _safe_float(row.get("credit", 0))
+
+            if debit == 0 and credit == 0:
+                continue
+
+            txn = {
+                "bank": bank.upper(),
+                "date": date_obj,
+                "description": str(row.get("description", "")).replace("\n", " ").strip(),
+                "debit": debit,
+                "credit": credit,
+                "balance": _safe_float(row.get("balance", 0)),
+                "type": "DEBIT" if debit > 0 else "CREDIT",
+            }
+            if isinstance(row.get("page"), int):
+                txn["page"] = row["page"]  # multi-page prompts only
+            txns.append(txn)
+        return txns
+
     def scan_receipt(
         self, 
         image_url: Optional[str] = None, 
@@ -0,0 +1,80 @@
+"""
+Page pre-classification
+=======================
+Decides, from cheap page features only, what a page deserves before any
+`extract_words` / `extract_tables` work is done:
+
+  skip    no date tokens at all (cover, summary, legal/disclaimer, blank
+          pages) — a transaction row always has a date
+  words   dated page and the parser already knows the word columns → fast path
+  tables  dated page → pdfplumber table strategies; `ruled` says whether the
+          page has any ruling lines, so line-based strategies are not tried
+          on borderless pages
+  llm     (almost) no text but mostly covered by images — a scanned page;
+          straight to the LLM/OCR fallback
+
+Features: char count, image coverage, ruling-line density (lines + rects per
+1000pt of page height) and date / amount tokens in the raw char stream (no
+layout analysis).
+"""
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fewer chars than this with images covering ≥ SCANNED_IMAGE_COVERAGE of the page → scanned
+SCANNED_MAX_CHARS = 20
+SCANNED_IMAGE_COVERAGE = 0.5
+
+_MONTHS = "jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec"
+# Run on the raw char stream: spaces may or may not be chars, so "05 May 2025" can read as "05May2025".
+# The year is optional ("05/05", "05 May") — some statements print it only in the header. A
+# yearless numeric date needs "-" or "/" so amounts like "10.50" are not counted.
+_DATE_TOKEN = re.compile(
+    rf"\d{{1,2}}[-/.]\d{{1,2}}[-/.]\d{{2,4}}|\d{{4}}-\d{{2}}-\d{{2}}|\d{{1,2}}[-/]\d{{1,2}}"
+    rf"|\d{{1,2}}[-/\s]?(?:{_MONTHS})[a-z]*(?:[-/,\s]*\d{{2,4}})?",
+    re.IGNORECASE,
+)
+_AMOUNT_TOKEN = re.compile(r"\d\.\d{2}(?!\d)")
+
+
+def page_features(page) -> dict | None:
+    """Cheap features of a pdfplumber page; None when they can't be computed (e.g. mock pages)."""
+    try:
+        width, height = page.width, page.height
+        if not isinstance(width, (int, float)) or not isinstance(height, (int, float)) or not width or not height:
+            return None
+        chars = page.chars
+        text = "".join(c.get("text", "") for c in chars)
+        image_area = sum(
+            max(0.0, min(img["x1"], width) - max(img["x0"], 0)) * max(0.0, min(img["bottom"], height) - max(img["top"], 0))
+            for img in page.images
+        )
+        return {
+            "chars": len(chars),
+            "image_coverage": round(image_area / (width * height), 3),
+            "ruling_density": round((len(page.lines) + len(page.rects)) * 1000 / height, 1),
+            "date_tokens": len(_DATE_TOKEN.findall(text)),
+            "amount_tokens": len(_AMOUNT_TOKEN.findall(text)),
+        }
+    except Exception as e:
+        logger.debug(f"Page features failed: {e}")
+        return None
+
+
+def classify_page(page, has_columns: bool = False) -> dict:
+    """Returns {"route", "reason", "ruled", "features"} for one page."""
+    f = page_features(page)
+    if f is None:
+        return {"route": "tables", "reason": "features unavailable", "ruled": True, "features": None}
+
+    ruled = f["ruling_density"] > 0
+    if f["chars"] < SCANNED_MAX_CHARS and f["image_coverage"] >= SCANNED_IMAGE_COVERAGE:
+        return {"route": "llm", "reason": "scanned image page", "ruled": ruled, "features": f}
+    if f["date_tokens"] == 0:
+        reason = "blank page" if f["chars"] == 0 else "no date tokens"
+        return {"route": "skip", "reason": reason, "ruled": ruled, "features": f}
+    if has_columns:
+        return {"route": "words", "reason": "dated page, columns known", "ruled": ruled, "features": f}
+    return {"route": "tables", "reason": "dated page" + ("" if ruled else ", no ruling lines"),
+            "ruled": ruled, "features": f}
@@ -3,22 +3,46 @@ SmartUniversalParser
 ====================
 A robust, bank-agnostic parser built on top of pdfplumber.
 
+Pre-classification (page_classifier.py) first routes each page from cheap
+features: pages without any date token are skipped, scanned pages go straight
+to the LLM fallback, and borderless pages only try the text strategy.
+
+Fast path (per page):
+  0. word coordinates — once the header row has been seen, words are binned
+     into columns by x-range (no table detection). Used only when every dated
+     row on the page validates; otherwise the table strategies below run.
+
 Strategy order (per page):
   1. lines  + lines  (bordered / grid tables)
   2. text   + lines  (semi-bordered)
   3. text   + text   (borderless / text-only)
   4. explicit_text   (raw text column heuristic for very unusual layouts)
 
-If ALL pdfplumber strategies yield 0 transactions → delegates to GeminiParser.
+The strategy that worked for a bank layout is remembered in the StrategyCache
+and tried first on later pages / uploads with the same layout fingerprint.
+
+If ALL pdfplumber strategies yield 0 transactions → delegates to GeminiParser
+(or, with defer_llm set, leaves the page text in `deferred_text` for the
+pipeline's async LLM stage). A page without a text layer (scanned) is
+rendered to a PNG at LLM_PAGE_IMAGE_DPI and the image goes to the LLM
+instead; if it can't be rendered either, the page's route is "unparsed".
 """
 
 from .base import BaseParser
+from .strategy_cache import strategy_cache, layout_fingerprint
+from .word_columns import extract_lines, merge_cells, column_bounds, bin_line
+from .column_decoder import DATE_FORMATS, DateDecoder, AmountDecoder, ColumnDecoders, INFER_SAMPLE_ROWS
+from .page_classifier import classify_page
+import io
+import os
 import re
 import logging
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Resolution scanned pages are rendered at for the LLM fallback
+LLM_PAGE_IMAGE_DPI = int(os.getenv("LLM_PAGE_IMAGE_DPI", "150"))
+
 # ---------------------------------------------------------------------------
 # Column keyword maps
 # ---------------------------------------------------------------------------
@@ -32,40 +56,30 @@ AMOUNT_KEYWORDS      = ["amount", "txn amount", "transaction amount"]    # singl
 CHQREF_KEYWORDS      = ["chq", "ref", "cheque", "reference", "ref no", "chq/ref"]
 
 # ---------------------------------------------------------------------------
-# Date formats tried in order
+# Cell decoders (DATE_FORMATS lives in column_decoder). Parsers infer one
+# ColumnDecoders per header mapping; these module-level ones serve callers
+# without a table context.
 # ---------------------------------------------------------------------------
-DATE_FORMATS = [
-    "%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d %b %Y",
-    "%d/%m/%y", "%d-%m-%y", "%d %b %y",
-    "%Y-%m-%d", "%d.%m.%Y", "%d.%m.%y",
-]
+_DATE_DECODER = DateDecoder()
+_AMOUNT_DECODER = AmountDecoder()
 
 def _clean_num(val: str) -> float:
     """Convert a cell string like '-1,23,456.78 Dr' → float."""
-    if not val:
-        return 0.0
-    # Remove commas and whitespace
-    cleaned = val.replace(",", "").strip()
-    # Extract digit, dot, and minus sign sequences
-    nums = "".join(re.findall(r"[-\d.]", cleaned))
-    try:
-        return float(nums) if nums else 0.0
-    except ValueError:
-        return 0.0
+    return _AMOUNT_DECODER.decode(val)
 
 def _parse_date(cell: str):
-    """Try all known date formats, return datetime or None."""
-    if not cell:
+    """Decode a date cell in any known format, return datetime or None."""
+    return _DATE_DECODER.decode(cell)
+
+def _page_png(page) -> bytes | None:
+    """The page rendered as PNG (for pages with no text layer); None if it can't be rendered."""
+    try:
+        out = io.BytesIO()
+        page.to_image(resolution=LLM_PAGE_IMAGE_DPI).original.save(out, format="PNG")
+        return out.getvalue()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not render page image: {e}")
         return None
-    cell = cell.strip()
-    # Some banks have date + time, drop the time part
-    cell = re.split(r"\s+\d{2}:\d{2}", cell)[0].strip()
-    for fmt in DATE_FORMATS:
-        try:
-            return datetime.strptime(cell, fmt)
-        except:
-            continue
-    return None
 
 def _has_any(cell_lower: str, keywords: list) -> bool:
     return any(kw in cell_lower for kw in keywords)
@@ -111,14 +125,16 @@ def _discover_headers(row: list) -> dict | None:
         return mapping
     return None
 
-def _extract_txn_from_row(row: list, mapping: dict, bank: str) -> dict | None:
+def _extract_txn_from_row(row: list, mapping: dict, bank: str, decoders: ColumnDecoders | None = None) -> dict | None:
     """Given a data row and a column mapping, extract a transaction dict."""
+    parse_date = decoders.date.decode if decoders else _parse_date
+    clean_num = (lambda key, cell: decoders.amount(key).decode(cell)) if decoders else (lambda key, cell: _clean_num(cell))
     try:
         date_cell = row[mapping["date"]].strip()
         if not re.search(r"\d", date_cell):
             return None  # No digits → not a data row
 
-        date_obj = _parse_date(date_cell)
+        date_obj = parse_date(date_cell)
         if not date_obj:
             return None
 
@@ -126,13 +142,14 @@ def _extract_txn_from_row(row: list, mapping: dict, bank: str) -> dict | None:
 
         # --- Financial values ---
         if "debit" in mapping and "credit" in mapping:
-            # Standard separate-column layout
-            debit  = _clean_num(row[mapping["debit"]])
-            credit = _clean_num(row[mapping["credit"]])
+            # Standard separate-column layout — the column gives the direction, so a sign
+            # ("1,234.00-" in the debit column) never turns a debit into a credit
+            debit  = abs(clean_num("debit", row[mapping["debit"]]))
+            credit = abs(clean_num("credit", row[mapping["credit"]]))
         elif "amount" in mapping:
             # Single-amount column → detect Dr/Cr from the cell text, sign, or separate type column
             raw_amt = str(row[mapping["amount"]])
-            amt = _clean_num(raw_amt)
+            amt = clean_num("amount", raw_amt)
             raw_lower = raw_amt.lower()
             
             # Check for Dr/Cr in the amount cell itself
@@ -172,7 +189,7 @@ def _extract_txn_from_row(row: list, mapping: dict, bank: str) -> dict | None:
         else:
             return None
 
-        balance = _clean_num(row[mapping["balance"]]) if "balance" in mapping else 0.0
+        balance = clean_num("balance", row[mapping["balance"]]) if "balance" in mapping else 0.0
 
         if debit == 0 and credit == 0:
             return None
@@ -205,21 +222,129 @@ class SmartUniversalParser(BaseParser):
     def __init__(self, bank: str = "UNKNOWN"):
         self.bank = bank.upper()
         self.header_mapping = None  # persists across pages
+        # Fast path: column x-ranges and header mapping learned from the word layer.
+        # Kept apart from header_mapping — word cells and table columns don't share indices.
+        self.word_mapping = None
+        self.columns = None
+        # x0 of the header right of the narration: overflowing narration words stop there
+        self.desc_edge = None
+        # Column decoders inferred per header mapping (table and word layouts separately)
+        self._decoders: dict[tuple, ColumnDecoders] = {}
+
+    def _decoders_for(self, kind: str, mapping: dict, rows) -> ColumnDecoders:
+        """Decoders for this mapping, inferred from `rows` the first time the mapping is seen."""
+        key = (kind, tuple(sorted(mapping.items())))
+        decoders = self._decoders.get(key)
+        if decoders is None:
+            decoders = self._decoders[key] = ColumnDecoders()
+            decoders.infer(list(rows), mapping)
+            logger.debug(f"[{self.bank}] {kind} columns: date={decoders.date.inferred}")
+        return decoders
+
+    def export_state(self):
+        return {"header_mapping": self.header_mapping, "word_mapping": self.word_mapping, "columns": self.columns,
+                "desc_edge": self.desc_edge}
+
+    def restore_state(self, state) -> None:
+        if state:
+            self.header_mapping = state.get("header_mapping") or self.header_mapping
+            self.word_mapping = state.get("word_mapping") or self.word_mapping
+            self.columns = state.get("columns") or self.columns
+            self.desc_edge = state.get("desc_edge", self.desc_edge)
+
+    def has_header(self) -> bool:
+        return bool(self.header_mapping or self.columns)
+
+    def _try_word_columns(self, page) -> list | None:
+        """
+        Fast path: bin words into the columns learned from the header row.
+        Returns None when the page doesn't validate so the table strategies run instead.
+        """
+        try:
+            lines = extract_lines(page)
+        except Exception as e:
+            logger.debug(f"Word layer error: {e}")
+            return None
+
+        txns = []
+        last_bottom = None
+        for n, line in enumerate(lines):
+            cells = merge_cells(line)
+            if len(cells) >= 3:
+                discovered = _discover_headers([c["text"] for c in cells])
+                if discovered:
+                    self.word_mapping = discovered
+                    self.columns = column_bounds(cells)
+                    desc = discovered["desc"]
+                    self.desc_edge = cells[desc + 1]["x0"] if desc + 1 < len(cells) else None
+                    logger.info(f"🔍 [{self.bank}] Word columns learned: {discovered}")
+                    continue
 
-    def _try_strategies(self, page) -> list:
-        """Try all table strategies, return transactions from the first one that works."""
-        for settings in self.TABLE_STRATEGIES:
+            if not self.columns:
+                continue
+
+            mapping = self.word_mapping
+            row = bin_line(line, self.columns, mapping["desc"], self.desc_edge)
+            decoders = self._decoders_for(
+                "word", mapping,
+                (bin_line(l, self.columns, mapping["desc"], self.desc_edge) for l in lines[n:n + INFER_SAMPLE_ROWS * 2]))
+            if decoders.date.decode(row[mapping["date"]]):
+                txn = _extract_txn_from_row(row, mapping, self.bank, decoders)
+                if txn:
+                    txns.append(txn)
+                    last_bottom = max(w["bottom"] for w in line)
+                    continue
+                # A dated row with an amount that didn't decode → layout doesn't fit, fall back
+                finance = [row[mapping[k]] for k in ("debit", "credit", "amount") if k in mapping]
+                if any(re.search(r"\d", cell) for cell in finance):
+                    return None
+                continue
+
+            # Wrapped narration: only the description column has text, right below the last row
+            desc = row[mapping["desc"]]
+            line_height = line[0]["bottom"] - line[0]["top"]
+            only_desc = all(not cell for i, cell in enumerate(row) if i != mapping["desc"])
+            if txns and desc and only_desc and line[0]["top"] - last_bottom <= line_height:
+                txns[-1]["description"] = f"{txns[-1]['description']} {desc}"
+                last_bottom = max(w["bottom"] for w in line)
+
+        if not txns:
+            return None
+        logger.info(f"⚡ [{self.bank}] Word-column fast path → {len(txns)} txns")
+        return txns
+
+    def _strategy_order(self, cached: dict | None, ruled: bool = True) -> list:
+        order = list(range(len(self.TABLE_STRATEGIES)))
+        if not ruled:
+            # "lines" strategies can't find a table on a page with no ruling lines
+            order = [i for i in order if "lines" not in (self.TABLE_STRATEGIES[i]["vertical_strategy"],
+                                                         self.TABLE_STRATEGIES[i]["horizontal_strategy"])]
+        winner = (cached or {}).get("strategy")
+        if isinstance(winner, int) and winner in order:
+            order.remove(winner)
+            order.insert(0, winner)
+        return order
+
+    def _try_strategies(self, page, ruled: bool = True) -> list:
+        """Try table strategies (cached winner first), return transactions from the first one that works."""
+        fingerprint = layout_fingerprint(page)
+        cached = strategy_cache.lookup(self.bank, fingerprint)
+        order = self._strategy_order(cached, ruled)
+
+        for idx in order:
+            settings = self.TABLE_STRATEGIES[idx]
             try:
                 tables = page.extract_tables(settings)
                 if not tables:
                     continue
 
                 txns = []
-                local_mapping = self.header_mapping  # carry from previous pages
+                # carry from previous pages, else the mapping learned for this layout
+                local_mapping = self.header_mapping or (cached or {}).get("header_mapping")
 
                 for table in tables:
-                    for row in table:
-                        row = [str(c).strip() if c else "" for c in row]
+                    rows = [[str(c).strip() if c else "" for c in row] for row in table]
+                    for n, row in enumerate(rows):
                         if len(row) < 3:
                             continue
 
@@ -234,22 +359,56 @@ class SmartUniversalParser(BaseParser):
                         if not local_mapping:
                             continue
 
-                        txn = _extract_txn_from_row(row, local_mapping, self.bank)
+                        decoders = self._decoders_for("table", local_mapping, rows[n:n + INFER_SAMPLE_ROWS * 2])
+                        txn = _extract_txn_from_row(row, local_mapping, self.bank, decoders)
                         if txn:
                             txns.append(txn)
 
                 if txns:
-                    logger.info(f"✅ [{self.bank}] Strategy {settings['vertical_strategy']}+{settings['horizontal_strategy']} → {len(txns)} txns")
+                    if not self.header_mapping:
+                        self.header_mapping = local_mapping
+                    # A hit only if the cached winner itself worked (ruled=False may have dropped it from order)
+                    hit = bool(cached) and idx == cached.get("strategy")
+                    self.last_strategy = f"{settings['vertical_strategy']}+{settings['horizontal_strategy']}"
+                    strategy_cache.record(self.bank, fingerprint, idx, local_mapping, hit=hit)
+                    logger.info(f"✅ [{self.bank}] Strategy {settings['vertical_strategy']}+{settings['horizontal_strategy']} → {len(txns)} txns"
+                                f"{' (cached)' if hit else ''}")
                     return txns
 
             except Exception as e:
                 logger.debug(f"Strategy error: {e}")
                 continue
 
+        strategy_cache.record(self.bank, fingerprint, None, None, hit=False)
         return []
 
     def parse_page(self, page) -> list:
-        txns = self._try_strategies(page)
+        self.last_strategy = None
+        self.last_route = classify_page(page, has_columns=bool(self.columns))
+        route = self.last_route["route"]
+        if route == "skip":
+            logger.info(f"⏭️ [{self.bank}] Page {getattr(page, 'page_number', '?')} skipped: {self.last_route['reason']}")
+            return []
+
+        txns = []
+        if route != "llm":
+            txns = self._try_word_columns(page)
+            if txns is not None:
+                self.last_strategy = "words"
+            else:
+                txns = self._try_strategies(page, ruled=self.last_route["ruled"])
+
+        if not txns and self.defer_llm:
+            # Pipeline mode: hand the page text (or, for a scanned page, its image) to the async LLM stage
+            logger.warning(f"⚠️ [{self.bank}] pdfplumber found 0 txns. Queuing page for LLM fallback...")
+            text = page.extract_text() or ""
+            self.deferred_text = text if text.strip() else _page_png(page)
+            if self.deferred_text is None:
+                self.last_route = {**self.last_route, "route": "unparsed",
+                                   "reason": "no text layer and the page image could not be rendered"}
+                return []
+            self.last_strategy = "llm"
+            return []
 
         if not txns:
             # ---------------------------------------------------------------
@@ -260,12 +419,17 @@ class SmartUniversalParser(BaseParser):
                 from app.parsers.gemini_parser import GeminiParser
                 page_text = page.extract_text() or ""
                 if page_text.strip():
-                    gemini = GeminiParser()
-                    txns = gemini.parse_page_text(page_text, self.bank)
-                    if txns:
-                        logger.info(f"🤖 [{self.bank}] Gemini fallback → {len(txns)} txns")
+                    txns = GeminiParser().parse_page_text(page_text, self.bank)
+                elif (image := _page_png(page)) is not None:
+                    logger.info(f"🖼️ [{self.bank}] Page has no text layer; sending its image to Gemini")
+                    txns = GeminiParser().parse_page_image(image, self.bank)
                 else:
-                    logger.warning(f"⚠️ [{self.bank}] Page has no extractable text (possibly scanned image).")
+                    logger.warning(f"⚠️ [{self.bank}] Page has no text layer and could not be rendered; not parsed.")
+                    self.last_route = {**self.last_route, "route": "unparsed",
+                                       "reason": "no text layer and the page image could not be rendered"}
+                if txns:
+                    self.last_strategy = "llm"
+                    logger.info(f"🤖 [{self.bank}] Gemini fallback → {len(txns)} txns")
             except Exception as e:
                 logger.error(f"❌ Gemini fallback failed: {e}")
 
@@ -0,0 +1,144 @@
+"""
+StrategyCache
+=============
+Remembers which pdfplumber table strategy worked for a given bank layout, so
+later pages (and later uploads) try the winner first instead of walking all
+four `extract_tables` configurations.
+
+Entries are keyed by bank + layout fingerprint:
+  - page size (rounded points)
+  - ruling-line count bucket (lines + rects, log2)
+  - header tokens found near the top of the page
+
+Each entry stores the winning strategy index and the header mapping that was
+in force, and is persisted to a small JSON file (STRATEGY_CACHE_PATH, relative
+paths taken from the `app` package directory, not the working directory) so
+parse workers and restarts warm-start from it. Writes go to a unique temp file
+renamed over the cache with os.replace, so concurrent parse processes never
+leave a half-written file; only a new or changed winner is written, merged
+into a fresh read of the file so other processes' winners are kept.
+"""
+
+import os
+import json
+import math
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRATEGY_CACHE_PATH = os.path.join(_PACKAGE_DIR, os.getenv("STRATEGY_CACHE_PATH", "strategy_cache.json"))
+
+# Single words that show up in statement header rows (see smart_universal keyword maps)
+HEADER_TOKENS = {
+    "date", "txn", "value", "posting", "particulars", "narration", "description",
+    "details", "remarks", "withdrawal", "withdrawals", "debit", "deposit", "deposits",
+    "credit", "balance", "amount", "chq", "cheque", "ref", "reference", "dr", "cr",
+}
+
+# Fraction of the page height scanned for header tokens
+_HEADER_REGION = 0.35
+
+
+def layout_fingerprint(page) -> str | None:
+    """Cheap layout signature for a pdfplumber page. None if the page can't be fingerprinted."""
+    try:
+        width, height = page.width, page.height
+        if not isinstance(width, (int, float)) or not isinstance(height, (int, float)):
+            return None
+
+        rulings = len(page.lines) + len(page.rects)
+        bucket = int(math.log2(rulings)) + 1 if rulings else 0
+
+        top = page.within_bbox((0, 0, width, height * _HEADER_REGION))
+        words = (top.extract_text() or "").lower().replace("/", " ").replace(".", " ").split()
+        tokens = ",".join(sorted({w for w in words if w in HEADER_TOKENS}))
+
+        return f"{round(width)}x{round(height)}|r{bucket}|{tokens}"
+    except Exception as e:
+        logger.debug(f"Fingerprint failed: {e}")
+        return None
+
+
+class StrategyCache:
+    def __init__(self, path: str = STRATEGY_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(bank: str, fingerprint: str) -> str:
+        return f"{bank}::{fingerprint}"
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def lookup(self, bank: str, fingerprint: str | None) -> dict | None:
+        """Return {"strategy": idx, "header_mapping": {...}} for a known layout."""
+        if not fingerprint:
+            return None
+        with self._lock:
+            entry = self._load().get(self._key(bank, fingerprint))
+        return entry
+
+    def record(self, bank: str, fingerprint: str | None, strategy: int | None, header_mapping: dict | None, hit: bool) -> None:
+        """Count a hit/miss and, on a miss that found a winner, remember it."""
+        if not fingerprint:
+            return
+        with self._lock:
+            if hit:
+                self.hits += 1
+                return
+            self.misses += 1
+            if strategy is None:
+                return
+            key = self._key(bank, fingerprint)
+            entry = {"strategy": strategy, "header_mapping": header_mapping}
+            if self._load().get(key) == entry:
+                return
+            self._save({key: entry})
+
+    def _save(self, changed: dict) -> None:
+        # Only this process's changed keys go over whatever other workers wrote
+        # (the in-memory copy of their keys may be stale), then replace atomically
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                merged = json.load(f)
+        except (FileNotFoundError, ValueError):
+            merged = {}
+        merged.update(changed)
+        self._entries = merged
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".strategy_cache.", suffix=".tmp",
+                                            dir=os.path.dirname(self.path) or None)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not persist strategy cache: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self._entries or {}),
+        }
+
+
+# Process-wide instance shared by every SmartUniversalParser
+strategy_cache = StrategyCache()
@@ -0,0 +1,276 @@
+"""
+Tabular statement importers — CSV / TSV, XLSX / XLS and OFX / QFX exports.
+
+Net-banking portals export the same rows their PDF statements show, so these
+files skip layout analysis entirely. Rows are streamed from the file one at a
+time, the header row is found with SmartUniversalParser's keyword maps
+(`_discover_headers`), and data rows go through the same
+`_extract_txn_from_row` / ColumnDecoders as a PDF table. The pipeline then
+runs them through normalize + make_hash like any parsed page, so a CSV and a
+PDF of the same period produce the same transaction hashes.
+
+OFX carries no running balance per row; it is rebuilt from LEDGERBAL with a
+second pass over the file, so OFX rows hash like their PDF counterparts when
+the narration matches too.
+
+Spreadsheets need openpyxl (.xlsx) / xlrd (.xls); both are imported lazily.
+"""
+import re
+import csv
+import logging
+from datetime import datetime
+from itertools import islice, chain
+
+from .base import StatementFileError
+from .smart_universal import _discover_headers, _extract_txn_from_row
+from .column_decoder import ColumnDecoders, INFER_SAMPLE_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Upload extension → importer kind ("pdf" stays on the page pipeline)
+FILE_KINDS = {
+    "pdf": "pdf",
+    "csv": "csv", "tsv": "csv", "txt": "csv",
+    "xlsx": "xlsx", "xlsm": "xlsx",
+    "xls": "xls",
+    "ofx": "ofx", "qfx": "ofx",
+}
+# Bytes read to sniff a CSV's delimiter / encoding
+SNIFF_BYTES = 64 * 1024
+# A header row further down than this is not a statement export
+MAX_HEADER_SCAN_ROWS = 200
+
+
+def file_kind(filename: str) -> str | None:
+    """Importer kind for an upload's filename, None when unsupported."""
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return FILE_KINDS.get(ext)
+
+
+# ── Row sources ───────────────────────────────────────────────────────────────
+
+def _cell(value) -> str:
+    """Spreadsheet cell → the string a PDF cell would hold."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value).strip()
+
+
+def iter_csv_rows(path: str):
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        sample.decode("utf-8-sig")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        # A cut multi-byte char at the end of the sample is still UTF-8
+        encoding = "utf-8-sig" if _utf8_prefix(sample) else "cp1252"
+    text = sample.decode(encoding, errors="replace")
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    with open(path, newline="", encoding=encoding, errors="replace") as f:
+        for row in csv.reader(f, dialect):
+            yield [c.strip() for c in row]
+
+
+def _utf8_prefix(sample: bytes) -> bool:
+    try:
+        sample[:-3].decode("utf-8-sig")
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def iter_xlsx_rows(path: str):
+    from openpyxl import load_workbook
+
+    # read_only streams the sheet XML instead of building every cell object
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield [_cell(v) for v in row]
+    finally:
+        wb.close()
+
+
+def iter_xls_rows(path: str):
+    with open(path, "rb") as f:
+        head = f.read(512).lstrip().lower()
+    if head.startswith(b"<"):
+        # Several portals serve an HTML table with an .xls name
+        yield from _iter_html_rows(path)
+        return
+
+    import xlrd
+
+    book = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for r in range(sheet.nrows):
+            row = []
+            for c in sheet.row(r):
+                if c.ctype == xlrd.XL_CELL_DATE:
+                    row.append(_cell(xlrd.xldate.xldate_as_datetime(c.value, book.datemode)))
+                else:
+                    row.append(_cell(c.value))
+            yield row
+    finally:
+        book.release_resources()
+
+
+_HTML_ROW = re.compile(r"<tr[^>]*>(.*?)</tr>", re.IGNORECASE | re.DOTALL)
+_HTML_CELL = re.compile(r"<t[dh][^>]*>(.*?)</t[dh]>", re.IGNORECASE | re.DOTALL)
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def _iter_html_rows(path: str):
+    import html
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        buffer = ""
+        for chunk in iter(lambda: f.read(SNIFF_BYTES), ""):
+            buffer += chunk
+            end = 0
+            for match in _HTML_ROW.finditer(buffer):
+                yield [html.unescape(_HTML_TAG.sub("", c)).strip() for c in _HTML_CELL.findall(match.group(1))]
+                end = match.end()
+            buffer = buffer[end:]
+
+
+ROW_SOURCES = {"csv": iter_csv_rows, "xlsx": iter_xlsx_rows, "xls": iter_xls_rows}
+
+
+# ── Grid exports (CSV / XLSX / XLS) ───────────────────────────────────────────
+
+def iter_grid_transactions(rows, bank: str):
+    """Raw transaction dicts (PDF parser shape) from a stream of rows."""
+    rows = iter(rows)
+    mapping = None
+    for n, row in enumerate(rows):
+        if n >= MAX_HEADER_SCAN_ROWS:
+            break
+        mapping = _discover_headers(row)
+        if mapping:
+            break
+    if not mapping:
+        raise StatementFileError("No transaction header row (date / description / amount columns) found in the file.")
+    logger.info(f"🧾 [{bank}] Export header mapping: {mapping}")
+
+    # Column formats are inferred from the first data rows, as for a PDF table
+    head = list(islice(rows, INFER_SAMPLE_ROWS * 2))
+    decoders = ColumnDecoders()
+    decoders.infer(head, mapping)
+    width = max(mapping.values()) + 1
+    for row in chain(head, rows):
+        if len(row) < width:
+            continue
+        txn = _extract_txn_from_row(row, mapping, bank, decoders)
+        if txn:
+            yield txn
+
+
+# ── OFX / QFX ─────────────────────────────────────────────────────────────────
+
+_OFX_TXN = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.IGNORECASE | re.DOTALL)
+_OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+_OFX_LEDGER = re.compile(r"<LEDGERBAL>.*?<BALAMT>\s*([-+]?[\d.,]+)", re.IGNORECASE | re.DOTALL)
+
+
+def _iter_ofx_blocks(path: str):
+    """Field dicts of every <STMTTRN> block, read in chunks (SGML and XML OFX alike)."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        buffer = ""
+        for chunk in iter(lambda: f.read(SNIFF_BYTES), ""):
+            buffer += chunk
+            end = 0
+            for match in _OFX_TXN.finditer(buffer):
+                # The last block may be cut by the chunk boundary — wait for more
+                if match.end() == len(buffer):
+                    break
+                yield {k.upper(): v.strip() for k, v in _OFX_FIELD.findall(match.group(1))}
+                end = match.end()
+            buffer = buffer[end:]
+        for match in _OFX_TXN.finditer(buffer + "</BANKTRANLIST>"):
+            yield {k.upper(): v.strip() for k, v in _OFX_FIELD.findall(match.group(1))}
+
+
+def _ofx_amount(value: str) -> float:
+    try:
+        return float(value.replace(",", ""))
+    except ValueError:
+        return 0.0
+
+
+def _ofx_ledger_balance(path: str) -> float | None:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        tail = ""
+        for chunk in iter(lambda: f.read(SNIFF_BYTES), ""):
+            tail = (tail + chunk)[-2 * SNIFF_BYTES:]
+    match = _OFX_LEDGER.search(tail)
+    return _ofx_amount(match.group(1)) if match else None
+
+
+def _ofx_posted_key(block: dict) -> str:
+    # DTPOSTED is YYYYMMDD[HHMMSS[.XXX]][[TZ]] — digits compare in time order
+    return re.sub(r"\D", "", block.get("DTPOSTED", "").split("[", 1)[0])[:17]
+
+
+def _ofx_running_balances(path: str, ledger: float) -> list[float]:
+    """
+    Balance after each STMTTRN (file order), rebuilt back from LEDGERBAL in
+    DTPOSTED order — banks list transactions oldest first or newest first,
+    so file order alone says nothing. Same-time entries are taken in file
+    order, reversed when the file runs newest first. Only (posted, amount)
+    pairs are held, not the blocks.
+    """
+    entries = [(_ofx_posted_key(b), _ofx_amount(b.get("TRNAMT", ""))) for b in _iter_ofx_blocks(path)]
+    balance = ledger - sum(amount for _, amount in entries)
+    balances = [0.0] * len(entries)
+    newest_first = len(entries) > 1 and entries[0][0] > entries[-1][0]
+    for n in sorted(range(len(entries)), key=lambda n: (entries[n][0], -n if newest_first else n)):
+        balance = round(balance + entries[n][1], 2)
+        balances[n] = balance
+    return balances
+
+
+def iter_ofx_transactions(path: str, bank: str):
+    """Raw transaction dicts from an OFX/QFX file; running balance rebuilt from LEDGERBAL."""
+    ledger = _ofx_ledger_balance(path)
+    balances = _ofx_running_balances(path, ledger) if ledger is not None else None
+
+    for n, block in enumerate(_iter_ofx_blocks(path)):
+        amount = _ofx_amount(block.get("TRNAMT", ""))
+        posted = block.get("DTPOSTED", "")[:8]
+        balance = balances[n] if balances is not None else None
+        if not amount or len(posted) < 8:
+            continue
+        try:
+            date = datetime.strptime(posted, "%Y%m%d")
+        except ValueError:
+            continue
+        desc = max(block.get("NAME", ""), block.get("MEMO", ""), key=len)
+        yield {
+            "bank": bank.upper(),
+            "date": date,
+            "description": desc,
+            "debit": -amount if amount < 0 else 0.0,
+            "credit": amount if amount > 0 else 0.0,
+            "balance": balance or 0.0,
+            "type": "DEBIT" if amount < 0 else "CREDIT",
+        }
+
+
+def iter_transactions(path: str, kind: str, bank: str):
+    """Stream raw transactions from a tabular export of `kind` (see FILE_KINDS)."""
+    if kind == "ofx":
+        return iter_ofx_transactions(path, bank)
+    source = ROW_SOURCES.get(kind)
+    if source is None:
+        raise StatementFileError(f"Unsupported statement file type: {kind}")
+    return iter_grid_transactions(source(path), bank)
@@ -0,0 +1,81 @@
+"""
+Word-coordinate helpers for the fast-path parser.
+
+Most statements are plain column layouts: once the header row is known, every
+data word can be put in a column by its x position alone, which is far cheaper
+than `page.extract_tables`. These helpers only deal with geometry — turning a
+page's words into lines, cells and column bins. Header discovery and row →
+transaction extraction stay in smart_universal.
+"""
+import re
+
+# Words whose `top` differs by less than this (points) are on the same line
+LINE_TOLERANCE = 3
+# Gap (in average character widths) that still joins two words into one cell
+CELL_GAP_CHARS = 1.5
+# Open edge of the first / last column (finite so parser state stays JSON/BSON-safe)
+_FAR = 1e9
+# A bare number (amount / balance cell) — never treated as narration overflow
+_NUMERIC_WORD = re.compile(r"[-+]?[\d,]*\.?\d+")
+
+
+def extract_lines(page) -> list[list[dict]]:
+    """Group the page's words into lines (top → bottom), each sorted left → right."""
+    words = sorted(page.extract_words(keep_blank_chars=False, use_text_flow=False),
+                   key=lambda w: (round(w["top"]), w["x0"]))
+    lines, current, current_top = [], [], None
+    for w in words:
+        if current_top is not None and abs(w["top"] - current_top) > LINE_TOLERANCE:
+            lines.append(sorted(current, key=lambda x: x["x0"]))
+            current = []
+        if not current:
+            current_top = w["top"]
+        current.append(w)
+    if current:
+        lines.append(sorted(current, key=lambda x: x["x0"]))
+    return lines
+
+
+def merge_cells(line: list[dict]) -> list[dict]:
+    """Join adjacent words separated by less than a couple of characters into cells."""
+    cells = []
+    for w in line:
+        char_w = (w["x1"] - w["x0"]) / max(len(w["text"]), 1)
+        if cells and w["x0"] - cells[-1]["x1"] <= char_w * CELL_GAP_CHARS:
+            cells[-1]["text"] += " " + w["text"]
+            cells[-1]["x1"] = w["x1"]
+        else:
+            cells.append({"text": w["text"], "x0": w["x0"], "x1": w["x1"]})
+    return cells
+
+
+def column_bounds(header_cells: list[dict]) -> list[tuple[float, float]]:
+    """Column x-ranges from header cells: each boundary sits halfway between neighbouring headers."""
+    bounds = []
+    for i, cell in enumerate(header_cells):
+        left = (header_cells[i - 1]["x1"] + cell["x0"]) / 2 if i > 0 else -_FAR
+        right = (cell["x1"] + header_cells[i + 1]["x0"]) / 2 if i + 1 < len(header_cells) else _FAR
+        bounds.append((left, right))
+    return bounds
+
+
+def bin_line(line: list[dict], bounds: list[tuple[float, float]],
+             text_col: int | None = None, text_edge: float | None = None) -> list[str]:
+    """
+    Place each word of a line in the column whose x-range contains its centre.
+
+    A long left-aligned narration runs past the midpoint to the next header;
+    with `text_col` / `text_edge` (x0 of the header after the narration),
+    non-numeric words that start before that edge stay in the narration.
+    """
+    row = [[] for _ in bounds]
+    for w in line:
+        centre = (w["x0"] + w["x1"]) / 2
+        for i, (left, right) in enumerate(bounds):
+            if left <= centre < right:
+                if (text_edge is not None and i > text_col and w["x0"] < text_edge
+                        and not _NUMERIC_WORD.fullmatch(w["text"])):
+                    i = text_col
+                row[i].append(w["text"])
+                break
+    return [" ".join(parts) for parts in row]
@@ -0,0 +1,135 @@
+"""
+Canonical bank / source dimension for transaction filters.
+
+Bank filters used to be `{"bank": {"$regex": bank, "$options": "i"}}` and
+manual entries were dropped with `$ne` / `$nin` on three legacy bank names,
+so no filter could be bounded by an index. Every transaction now carries:
+
+  bank_key     the bank name reduced to uppercase letters and digits
+               ("HDFC", "Hdfc Bank" → "HDFCBANK"), matched exactly
+  source_kind  statement  PDF / CSV / XLSX / OFX ingestion (pipeline)
+               realtime   SMS / notification webhook
+               manual     legacy manual rows ("Manually Added", "Cash/Manual", "Manual")
+
+and `ledger_match()` builds the base $match every list / export / analytics
+endpoint starts from, over the (user_id, source_kind, bank_key, date) index.
+Both fields are set at ingest. Existing rows are backfilled once by
+`ensure_backfilled()` in the API's startup (recorded in the `migrations`
+collection, so later starts skip it); until it has finished, ledger_match()
+also admits rows without the fields, so nothing disappears meanwhile. By hand:
+
+    python -m app.services.bank_dimension
+"""
+import re
+import asyncio
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SOURCE_STATEMENT = "statement"
+SOURCE_REALTIME = "realtime"
+SOURCE_MANUAL = "manual"
+SOURCE_KINDS = (SOURCE_STATEMENT, SOURCE_REALTIME, SOURCE_MANUAL)
+# What the transaction list, export and bank pickers show
+LEDGER_SOURCES = (SOURCE_STATEMENT, SOURCE_REALTIME)
+
+MANUAL_BANKS = ("Manually Added", "Cash/Manual", "Manual")
+REALTIME_ACCOUNT_ID = "realtime_acc"
+
+MIGRATIONS_COLLECTION = "migrations"
+MIGRATION_ID = "transactions.bank_dimension"
+# True until this process has seen the backfill complete
+_backfill_pending = True
+
+_NON_KEY = re.compile(r"[^A-Z0-9]+")
+
+
+def bank_key(bank: str | None) -> str:
+    return _NON_KEY.sub("", (bank or "").upper())
+
+
+def source_kind(bank: str | None, realtime: bool = False) -> str:
+    if bank in MANUAL_BANKS:
+        return SOURCE_MANUAL
+    return SOURCE_REALTIME if realtime else SOURCE_STATEMENT
+
+
+def ledger_match(user_id: str, bank: str | None = None, kinds: tuple[str, ...] = LEDGER_SOURCES) -> dict:
+    """
+    Equality prefix of the (user_id, source_kind, bank_key, date) index;
+    callers add their date range / amount / search clauses to it.
+    "All Banks" (or no bank) leaves bank_key open.
+    """
+    if not _backfill_pending:
+        match = {"user_id": user_id, "source_kind": {"$in": list(kinds)}}
+        if bank and bank != "All Banks":
+            match["bank_key"] = bank_key(bank)
+        return match
+
+    # Not backfilled yet: rows without source_kind are classified by their bank name
+    legacy = {"source_kind": None}
+    if SOURCE_MANUAL not in kinds:
+        legacy["bank"] = {"$nin": list(MANUAL_BANKS)}
+    match = {"user_id": user_id, "$and": [{"$or": [{"source_kind": {"$in": list(kinds)}}, legacy]}]}
+    if bank and bank != "All Banks":
+        match["$and"].append({"$or": [
+            {"bank_key": bank_key(bank)},
+            {"bank_key": None, "bank": {"$regex": f"^{re.escape(bank)}$", "$options": "i"}},
+        ]})
+    return match
+
+
+async def backfill() -> int:
+    """Set source_kind and bank_key where missing; returns the number of field updates."""
+    from app.models.transaction import Transaction
+
+    collection = Transaction.get_pymongo_collection()
+    updated = 0
+    # source_kind — three server-side updates, most specific first
+    for flt, kind in (
+        ({"bank": {"$in": list(MANUAL_BANKS)}}, SOURCE_MANUAL),
+        ({"account_id": REALTIME_ACCOUNT_ID}, SOURCE_REALTIME),
+        ({}, SOURCE_STATEMENT),
+    ):
+        result = await collection.update_many({"source_kind": None, **flt}, {"$set": {"source_kind": kind}})
+        updated += result.modified_count
+        logger.info(f"🏷️ source_kind={kind} set on {result.modified_count} transactions")
+    # bank_key — one update per distinct bank name (a handful per user)
+    for bank in await collection.distinct("bank", {"bank_key": None}):
+        result = await collection.update_many({"bank": bank, "bank_key": None}, {"$set": {"bank_key": bank_key(bank)}})
+        updated += result.modified_count
+        logger.info(f"🏦 bank_key={bank_key(bank)} set on {result.modified_count} transactions ({bank!r})")
+    return updated
+
+
+async def ensure_backfilled() -> None:
+    """Startup hook: run backfill() unless a previous start already completed it."""
+    global _backfill_pending
+    from app.models.transaction import Transaction
+
+    migrations = Transaction.get_pymongo_collection().database[MIGRATIONS_COLLECTION]
+    try:
+        if await migrations.find_one({"_id": MIGRATION_ID}) is None:
+            updated = await backfill()
+            await migrations.update_one({"_id": MIGRATION_ID},
+                                        {"$set": {"done_at": datetime.utcnow(), "updated": updated}}, upsert=True)
+            logger.info(f"✅ bank_key / source_kind backfilled ({updated} field updates)")
+        _backfill_pending = False
+    except Exception as e:
+        # Filters keep admitting un-backfilled rows; the next start retries
+        logger.error(f"❌ bank_key / source_kind backfill failed: {e}", exc_info=True)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    async def _main():
+        from app.db.session import init_db
+        await init_db()
+        logger.info(f"✅ {await backfill()} transaction fields backfilled")
+
+    asyncio.run(_main())
@@ -0,0 +1,122 @@
+"""
+Content-addressed cache for LLM page extraction and receipt OCR.
+
+Key = sha256(kind | model | content), where content is the whitespace-
+normalized page text or the raw image bytes. Two tiers:
+
+  - in-memory LRU (LLM_CACHE_MAX_ENTRIES), usable from sync code too
+  - Mongo `llm_cache` collection with a TTL index (LLM_CACHE_TTL_DAYS)
+
+Every entry remembers how long the original call took, so hits can report
+the latency they saved.
+"""
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+
+
+def content_key(kind: str, model: str, content: str | bytes) -> str:
+    if isinstance(content, str):
+        content = " ".join(content.split()).encode("utf-8")
+    digest = hashlib.sha256()
+    digest.update(f"{kind}|{model}|".encode("utf-8"))
+    digest.update(content)
+    return digest.hexdigest()
+
+
+class CacheStats:
+    """Hit/miss/saved-latency counters; one per job, plus the process-wide total."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def as_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "saved_ms": round(self.saved_ms, 1),
+        }
+
+
+class ContentCache:
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lru: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    # ── memory tier (sync) ────────────────────────────────────────────────────
+
+    def get_local(self, key: str):
+        """Return (value, latency_ms) from the LRU or None."""
+        with self._lock:
+            item = self._lru.get(key)
+            if item is not None:
+                self._lru.move_to_end(key)
+            return item
+
+    def set_local(self, key: str, value, latency_ms: float = 0.0) -> None:
+        with self._lock:
+            self._lru[key] = (value, latency_ms)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    # ── both tiers (async) ────────────────────────────────────────────────────
+
+    async def get(self, key: str, job_stats: CacheStats | None = None):
+        """Look up memory then Mongo. Returns the cached value or None and counts hit/miss."""
+        item = self.get_local(key)
+        if item is None:
+            item = await self._get_persistent(key)
+            if item is not None:
+                self.set_local(key, *item)
+
+        for stats in (self.stats, job_stats):
+            if stats is None:
+                continue
+            if item is None:
+                stats.misses += 1
+            else:
+                stats.hits += 1
+                stats.saved_ms += item[1]
+        return None if item is None else item[0]
+
+    async def set(self, key: str, value, kind: str, model: str, latency_ms: float = 0.0) -> None:
+        self.set_local(key, value, latency_ms)
+        try:
+            from app.models.llm_cache import LLMCacheEntry
+            await LLMCacheEntry.get_pymongo_collection().update_one(
+                {"key": key},
+                {"$set": {"key": key, "kind": kind, "model": model, "value": value,
+                          "latency_ms": latency_ms, "created_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache write failed: {e}")
+
+    async def _get_persistent(self, key: str):
+        try:
+            from app.models.llm_cache import LLMCacheEntry
+            doc = await LLMCacheEntry.get_pymongo_collection().find_one({"key": key}, {"value": 1, "latency_ms": 1})
+        except Exception as e:
+            logger.warning(f"⚠️ LLM cache read failed: {e}")
+            return None
+        if not doc:
+            return None
+        return doc.get("value"), doc.get("latency_ms", 0.0)
+
+
+# Process-wide cache shared by the LLM stage, GeminiParser and the OCR endpoint
+content_cache = ContentCache()
@@ -0,0 +1,399 @@
+"""
+Durable statement-ingestion queue on top of `job_statuses`.
+
+The API only enqueues: the (unlocked) PDF goes to GridFS and a JobStatus row
+is created with status "queued". Workers (`python -m app.worker`, or the
+API's INGEST_EMBEDDED_WORKERS in-process ones — default 1, set 0 when
+separate workers run) then:
+
+  - claim a job atomically with find_one_and_update and take a lease
+  - heartbeat the lease while parsing; a job whose lease expires (worker
+    crashed / was killed) becomes claimable again
+  - resume from the job's checkpoint_page / checkpoint_state
+  - on error, requeue with exponential backoff until JOB_MAX_ATTEMPTS; a file
+    no retry can fix (corrupt / encrypted / unsupported) fails right away
+  - a job handed back without an error (shutdown, memory split) is not
+    charged an attempt but counts a release; past JOB_MAX_RELEASES it fails
+  - never run more than USER_MAX_CONCURRENT_JOBS jobs of one user at once,
+    so a 24-file batch upload can't starve everybody else
+
+Batch uploads create a parent job (file_kind "batch", never claimed) whose
+children are ordinary jobs with parent_job_id set; batch_progress()
+aggregates them. Workers settle the parent when a child finishes, so a batch
+nobody polls still completes and expires.
+
+Configuration (env):
+  JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_MAX_RELEASES, JOB_RETRY_BASE_SECONDS,
+  JOB_POLL_SECONDS, INGEST_CONCURRENCY (jobs per worker process),
+  USER_MAX_CONCURRENT_JOBS (0 = no per-user cap)
+"""
+import os
+import socket
+import asyncio
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from app.models.job import JobStatus
+from app.parsers.base import StatementFileError
+from app.services.memory import MemoryCeilingExceeded
+from app.services.progress_bus import progress_bus, STREAM_PROJECTION, TERMINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_MAX_RELEASES = int(os.getenv("JOB_MAX_RELEASES", "25"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "15"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "2"))
+USER_MAX_CONCURRENT_JOBS = int(os.getenv("USER_MAX_CONCURRENT_JOBS", "4"))
+
+UPLOAD_BUCKET = "statement_uploads"
+BATCH_KIND = "batch"
+
+
+def _bucket() -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(JobStatus.get_pymongo_collection().database, bucket_name=UPLOAD_BUCKET)
+
+
+def _col():
+    return JobStatus.get_pymongo_collection()
+
+
+# ── API side ──────────────────────────────────────────────────────────────────
+
+async def store_upload(file_path: str, filename: str) -> str:
+    """Stream a local file into GridFS; returns the file id as a string."""
+    with open(file_path, "rb") as f:
+        file_id = await _bucket().upload_from_stream(filename, f)
+    return str(file_id)
+
+
+async def enqueue_statement(job_id: str, user_id: str, bank: str, file_id: str, filename: str,
+                            raw_sha256: str | None = None, file_kind: str = "pdf",
+                            parent_job_id: str | None = None) -> None:
+    now = datetime.utcnow()
+    job = JobStatus(
+        job_id=job_id,
+        status="queued",
+        message="Queued for processing...",
+        user_id=user_id,
+        bank=bank,
+        filename=filename,
+        file_kind=file_kind,
+        parent_job_id=parent_job_id,
+        file_id=file_id,
+        raw_sha256=raw_sha256,
+        available_at=now,
+        created_at=now,
+        updated_at=now,
+    )
+    await job.insert()
+
+
+async def create_batch(batch_id: str, user_id: str, bank: str, child_job_ids: list[str], filename: str) -> None:
+    """Parent job of a batch upload; its status is derived from the children (batch_progress)."""
+    now = datetime.utcnow()
+    await JobStatus(
+        job_id=batch_id,
+        status="processing",
+        message=f"{len(child_job_ids)} files queued",
+        user_id=user_id,
+        bank=bank,
+        filename=filename,
+        file_kind=BATCH_KIND,
+        child_job_ids=child_job_ids,
+        created_at=now,
+        updated_at=now,
+    ).insert()
+
+
+_BATCH_SUMS = ("total_pages", "processed_pages", "skipped_pages", "processed_txns",
+               "inserted_txns", "updated_txns", "unchanged_txns")
+
+
+async def batch_progress(batch: dict) -> dict:
+    """Aggregated progress of a batch parent job (one $group over its children)."""
+    group = {"_id": None, "files": {"$sum": 1}}
+    for field in _BATCH_SUMS:
+        group[field] = {"$sum": f"${field}"}
+    for status in ("queued", "processing", "completed", "failed"):
+        group[status] = {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}
+    rows = await _col().aggregate([{"$match": {"parent_job_id": batch["job_id"]}}, {"$group": group}]).to_list(1)
+    totals = rows[0] if rows else {"files": 0}
+    totals.pop("_id", None)
+
+    children = await _col().find(
+        {"parent_job_id": batch["job_id"]},
+        {"_id": 0, "job_id": 1, "filename": 1, "bank": 1, "status": 1, "message": 1,
+         "total_pages": 1, "processed_pages": 1, "processed_txns": 1, "duplicate_of": 1},
+    ).sort("created_at", 1).to_list(None)
+
+    # The parent is finished once no child can run any more
+    running = totals.get("queued", 0) + totals.get("processing", 0)
+    status = "processing" if running else ("failed" if totals.get("failed") == totals["files"] else "completed")
+    message = f"{totals.get('completed', 0)}/{totals['files']} files done"
+    if totals.get("failed"):
+        message += f", {totals['failed']} failed"
+    if status != batch.get("status"):
+        now = datetime.utcnow()
+        fields = {"status": status, "message": message, "updated_at": now}
+        if status in TERMINAL_STATUSES:
+            fields["finished_at"] = now
+        await _col().update_one({"job_id": batch["job_id"]}, {"$set": fields})
+    return {"job_id": batch["job_id"], "status": status, "message": message, **totals, "children": children}
+
+
+async def settle_batch(parent_job_id: str | None) -> None:
+    """Re-derive a batch parent's status after one of its children finished (sets finished_at → TTL)."""
+    if not parent_job_id:
+        return
+    try:
+        batch = await _col().find_one({"job_id": parent_job_id, "file_kind": BATCH_KIND})
+        if batch and batch.get("status") not in TERMINAL_STATUSES:
+            await batch_progress(batch)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not settle batch {parent_job_id}: {e}")
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+
+async def _users_at_cap(now: datetime) -> list[str]:
+    """Users already running USER_MAX_CONCURRENT_JOBS jobs (live leases)."""
+    if USER_MAX_CONCURRENT_JOBS <= 0:
+        return []
+    rows = await _col().aggregate([
+        {"$match": {"status": "processing", "lease_expires_at": {"$gte": now}}},
+        {"$group": {"_id": "$user_id", "running": {"$sum": 1}}},
+        {"$match": {"running": {"$gte": USER_MAX_CONCURRENT_JOBS}}},
+    ]).to_list(None)
+    return [row["_id"] for row in rows]
+
+
+async def claim_next(worker_id: str) -> dict | None:
+    """
+    Atomically claim the oldest runnable job: queued and due, or processing with
+    an expired lease — skipping users at their concurrency cap. The cap is
+    checked just before the claim, so two workers racing can briefly exceed it
+    by one job each.
+    """
+    now = datetime.utcnow()
+
+    # Jobs that crashed on their last allowed attempt are not retried; failing
+    # them one by one also deletes their uploads from GridFS
+    async for dead in _col().find(
+        {"status": "processing", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+        {"_id": 0, "job_id": 1, "file_id": 1, "parent_job_id": 1},
+    ):
+        await _fail(dead, "Processing was interrupted too many times.")
+
+    return await _col().find_one_and_update(
+        {
+            "$or": [
+                {"status": "queued", "available_at": {"$lte": now}},
+                {"status": "processing", "lease_expires_at": {"$lt": now}},
+            ],
+            "attempts": {"$lt": JOB_MAX_ATTEMPTS},
+            "file_kind": {"$ne": BATCH_KIND},
+            "user_id": {"$nin": await _users_at_cap(now)},
+        },
+        {
+            "$set": {
+                "status": "processing",
+                "worker_id": worker_id,
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def extend_lease(job_id: str, worker_id: str) -> bool:
+    """Heartbeat. False if the job is no longer ours (lease lost / job finished)."""
+    result = await _col().update_one(
+        {"job_id": job_id, "worker_id": worker_id, "status": "processing"},
+        {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+    )
+    return result.matched_count == 1
+
+
+async def _update_and_publish(job_id: str, fields: dict) -> None:
+    doc = await _col().find_one_and_update({"job_id": job_id}, {"$set": fields},
+                                           projection=STREAM_PROJECTION, return_document=ReturnDocument.AFTER)
+    if doc:
+        await progress_bus.publish(doc)
+
+
+def is_permanent(error: Exception) -> bool:
+    """
+    The file itself is unusable (corrupt, encrypted, no transaction table) — a
+    retry would fail the same way. Other errors, a plain ValueError from a
+    parser bug included, go through the retry path.
+    """
+    import pikepdf
+    from pdfminer.pdfexceptions import PDFException
+    from pdfplumber.utils.exceptions import PdfminerException, MalformedPDFException
+
+    return isinstance(error, (StatementFileError, pikepdf.PdfError, pikepdf.PasswordError, PDFException,
+                              PdfminerException, MalformedPDFException))
+
+
+async def _fail(job: dict, message: str, error: str | None = None) -> None:
+    now = datetime.utcnow()
+    await _update_and_publish(job["job_id"], {
+        "status": "failed", "message": message, "last_error": error or message,
+        "worker_id": None, "updated_at": now, "finished_at": now,
+    })
+    await discard_upload(job)
+    await settle_batch(job.get("parent_job_id"))
+
+
+async def requeue_or_fail(job: dict, error: Exception) -> None:
+    now = datetime.utcnow()
+    if job.get("attempts", 0) >= JOB_MAX_ATTEMPTS or is_permanent(error):
+        await _fail(job, str(error))
+        logger.warning(f"❌ Job {job['job_id']} failed (attempt {job.get('attempts')}/{JOB_MAX_ATTEMPTS}): {error}")
+        return
+    delay = JOB_RETRY_BASE_SECONDS * 2 ** (job.get("attempts", 1) - 1)
+    await _update_and_publish(job["job_id"], {
+        "status": "queued",
+        "available_at": now + timedelta(seconds=delay),
+        "message": f"Retrying in {delay}s...",
+        "last_error": str(error),
+        "worker_id": None,
+        "updated_at": now,
+    })
+    logger.warning(f"🔁 Job {job['job_id']} requeued (attempt {job.get('attempts')}/{JOB_MAX_ATTEMPTS}): {error}")
+
+
+async def release(job: dict, delay_seconds: float = 0, message: str | None = None) -> None:
+    """
+    Hand a job back without charging an attempt (graceful shutdown / memory
+    split). Each hand-back counts in `releases`; the JOB_MAX_RELEASES-th fails
+    the job instead, so one that always hits the memory ceiling is not
+    claimed forever.
+    """
+    if job.get("releases", 0) + 1 >= JOB_MAX_RELEASES:
+        await _fail(job, "Processing was paused too many times.", error=message)
+        logger.warning(f"❌ Job {job['job_id']} failed after {JOB_MAX_RELEASES} releases")
+        return
+    fields = {"status": "queued", "available_at": datetime.utcnow() + timedelta(seconds=delay_seconds),
+              "worker_id": None}
+    if message:
+        fields["message"] = message
+    await _col().update_one(
+        {"job_id": job["job_id"], "status": "processing"},
+        {"$set": fields, "$inc": {"attempts": -1, "releases": 1}},
+    )
+
+
+async def discard_upload(job: dict) -> None:
+    if not job.get("file_id"):
+        return
+    try:
+        await _bucket().delete(ObjectId(job["file_id"]))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not delete upload {job['file_id']}: {e}")
+
+
+class StatementWorker:
+    """Claims jobs and runs process_statement_pipeline for up to `concurrency` of them at once."""
+
+    def __init__(self, concurrency: int = INGEST_CONCURRENCY, temp_dir: str | None = None):
+        self.concurrency = max(1, concurrency)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.temp_dir = temp_dir or tempfile.gettempdir()
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    async def run(self) -> None:
+        logger.info(f"👷 Worker {self.worker_id} started (concurrency={self.concurrency})")
+        while not self._stopping.is_set():
+            job = None
+            if len(self._tasks) < self.concurrency:
+                try:
+                    job = await claim_next(self.worker_id)
+                except Exception as e:
+                    logger.error(f"❌ Claim failed: {e}")
+            if job:
+                task = asyncio.create_task(self._process(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                continue
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+        # Shutdown: hand in-flight jobs back to the queue
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info(f"👷 Worker {self.worker_id} stopped")
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def _heartbeat(self, job_id: str, owner: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            if not await extend_lease(job_id, self.worker_id):
+                logger.warning(f"⚠️ Lost lease on job {job_id}; stopping it here")
+                owner.cancel()
+                return
+
+    async def _process(self, job: dict) -> None:
+        from app.services.pipeline import process_statement_pipeline, process_tabular_pipeline
+
+        job_id = job["job_id"]
+        kind = job.get("file_kind") or "pdf"
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, asyncio.current_task()))
+        fd, local_path = tempfile.mkstemp(suffix=f".{kind}", dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                await _bucket().download_to_stream(ObjectId(job["file_id"]), f)
+
+            if kind != "pdf":
+                logger.info(f"👷 Job {job_id} claimed ({kind}, attempt {job.get('attempts')}, "
+                            f"from row {job.get('checkpoint_row', 0) + 1})")
+                await process_tabular_pipeline(
+                    local_path, job["bank"], kind, job["user_id"], job_id,
+                    start_row=job.get("checkpoint_row", 0),
+                    raw_sha256=job.get("raw_sha256"),
+                    raise_errors=True,
+                )
+            else:
+                logger.info(f"👷 Job {job_id} claimed (attempt {job.get('attempts')}, "
+                            f"from page {job.get('checkpoint_page', 0) + 1})")
+                await process_statement_pipeline(
+                    local_path, job["bank"], None, job["user_id"], job_id,
+                    start_page=job.get("checkpoint_page", 0),
+                    start_state=job.get("checkpoint_state"),
+                    raw_sha256=job.get("raw_sha256"),
+                    raise_errors=True,
+                )
+            await discard_upload(job)
+            await settle_batch(job.get("parent_job_id"))
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                await release(job)
+            raise
+        except MemoryCeilingExceeded as e:
+            # Split: the rest of the statement continues from the checkpoint, here or elsewhere
+            logger.warning(f"🐘 Job {job_id} split off at its checkpoint: {e}")
+            await release(job, delay_seconds=JOB_POLL_SECONDS, message="Paused to free memory; resuming...")
+        except Exception as e:
+            await requeue_or_fail(job, e)
+        finally:
+            heartbeat.cancel()
+            if os.path.exists(local_path):
+                os.remove(local_path)
@@ -1,6 +1,13 @@
+import os
+import time
+from pymongo import ReturnDocument
 from app.models.job import JobStatus
+from app.services.progress_bus import progress_bus, STREAM_PROJECTION, TERMINAL_STATUSES
 from datetime import datetime
 
+# Minimum gap between progress flushes to Mongo (status changes always flush)
+JOB_PROGRESS_FLUSH_MS = int(os.getenv("JOB_PROGRESS_FLUSH_MS", "500"))
+
 async def create_job(job_id: str):
     job = JobStatus(
         job_id=job_id,
@@ -10,13 +17,82 @@ async def create_job(job_id: str):
     await job.insert()
 
 async def update_job(job_id: str, **kwargs):
-    job = await JobStatus.find_one(JobStatus.job_id == job_id)
-    if job:
-        # Update the fields dynamically
-        for key, value in kwargs.items():
-            setattr(job, key, value)
-        job.updated_at = datetime.utcnow()
-        await job.save()
+    # Single atomic $set — no read-modify-write round trip
+    kwargs["updated_at"] = datetime.utcnow()
+    await JobStatus.get_pymongo_collection().update_one({"job_id": job_id}, {"$set": kwargs})
+
+async def increment_job(job_id: str, **counters):
+    await JobStatus.get_pymongo_collection().update_one(
+        {"job_id": job_id},
+        {"$inc": counters, "$set": {"updated_at": datetime.utcnow()}},
+    )
 
 async def get_job(job_id: str):
-    return await JobStatus.find_one(JobStatus.job_id == job_id)
\ No newline at end of file
+    return await JobStatus.find_one(JobStatus.job_id == job_id)
+
+
+class ProgressReporter:
+    """
+    Keeps a job's progress in memory and coalesces it into one `$set`/`$inc`/`$push`
+    update at most every `flush_ms`, or immediately when `status` changes.
+    The updated document is published on the progress bus (SSE / WebSocket).
+    A reporter without a job_id is a no-op, so callers need no `if job_id:`.
+    """
+
+    def __init__(self, job_id: str | None, flush_ms: int = JOB_PROGRESS_FLUSH_MS):
+        self.job_id = job_id
+        self.flush_ms = flush_ms
+        self.status = None
+        self._set: dict = {}
+        self._inc: dict = {}
+        self._push: dict = {}
+        self._keep: dict = {}
+        self._last_flush = 0.0
+
+    async def set(self, **fields):
+        """Record field values; flushes right away if the status changes."""
+        if not self.job_id:
+            return
+        status_changed = "status" in fields and fields["status"] != self.status
+        if "status" in fields:
+            self.status = fields["status"]
+            if status_changed and self.status in TERMINAL_STATUSES:
+                fields["finished_at"] = datetime.utcnow()  # TTL clock
+        self._set.update(fields)
+        await self._maybe_flush(force=status_changed)
+
+    async def inc(self, **counters):
+        if not self.job_id:
+            return
+        for key, value in counters.items():
+            self._inc[key] = self._inc.get(key, 0) + value
+        await self._maybe_flush()
+
+    async def push(self, field: str, item, keep: int | None = None):
+        """Append `item` to the list field `field`; with `keep`, only its last `keep` items are stored."""
+        if not self.job_id:
+            return
+        self._push.setdefault(field, []).append(item)
+        if keep is not None:
+            self._keep[field] = keep
+        await self._maybe_flush()
+
+    async def _maybe_flush(self, force: bool = False):
+        if force or (time.monotonic() - self._last_flush) * 1000 >= self.flush_ms:
+            await self.flush()
+
+    async def flush(self):
+        if not self.job_id or (not self._set and not self._inc and not self._push):
+            return
+        update = {"$set": {**self._set, "updated_at": datetime.utcnow()}}
+        if self._inc:
+            update["$inc"] = self._inc
+        if self._push:
+            update["$push"] = {field: {"$each": items, **({"$slice": -self._keep[field]} if field in self._keep else {})}
+                               for field, items in self._push.items()}
+        self._set, self._inc, self._push = {}, {}, {}
+        self._last_flush = time.monotonic()
+        doc = await JobStatus.get_pymongo_collection().find_one_and_update(
+            {"job_id": self.job_id}, update, projection=STREAM_PROJECTION, return_document=ReturnDocument.AFTER)
+        if doc:
+            await progress_bus.publish(doc)
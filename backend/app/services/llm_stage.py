@@ -0,0 +1,259 @@
+"""
+Async LLM fallback stage.
+
+Pages where pdfplumber finds no rows used to call Gemini inline, one page at
+a time and blocking. Instead the pipeline queues their text here:
+
+  - queued pages are packed into one prompt up to LLM_BATCH_TOKENS
+  - batches run concurrently (LLM_CONCURRENCY) as asyncio tasks
+  - every request first takes tokens from ONE process-wide token bucket shared
+    by all jobs (LLM_RPM requests/min, LLM_TPM tokens/min)
+  - 429 / RESOURCE_EXHAUSTED responses are retried with exponential backoff
+  - page results are cached by content (services/content_cache.py), so a
+    re-uploaded or overlapping page never reaches the API twice
+  - a scanned page (no text layer) arrives as a PNG and is sent on its own,
+    image attached, under the same limits
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+
+from app.services.content_cache import content_cache, content_key, CacheStats
+
+logger = logging.getLogger(__name__)
+
+LLM_BATCH_TOKENS = int(os.getenv("LLM_BATCH_TOKENS", "6000"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_RPM = int(os.getenv("LLM_RPM", "15"))
+LLM_TPM = int(os.getenv("LLM_TPM", "1000000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2.0"))
+# Token budget charged for one page image (Gemini bills a few hundred tokens per image tile)
+LLM_IMAGE_TOKENS = int(os.getenv("LLM_IMAGE_TOKENS", "1000"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token) — good enough for budgeting."""
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    msg = str(e)
+    return "429" in msg or "RESOURCE_EXHAUSTED" in msg or "rate_limit" in msg.lower()
+
+
+class TokenBucket:
+    """Two refilling buckets (requests + tokens per minute) behind one lock."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int) -> None:
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait_req = (1 - self._requests) * 60 / self.rpm if self._requests < 1 else 0
+                wait_tok = (tokens - self._tokens) * 60 / self.tpm if self._tokens < tokens else 0
+                await asyncio.sleep(max(wait_req, wait_tok, 0.05))
+
+
+_bucket: TokenBucket | None = None
+_semaphore: asyncio.Semaphore | None = None
+
+
+def _limits() -> tuple[TokenBucket, asyncio.Semaphore]:
+    # Created lazily so they bind to the running event loop
+    global _bucket, _semaphore
+    if _bucket is None:
+        _bucket = TokenBucket(LLM_RPM, LLM_TPM)
+        _semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+    return _bucket, _semaphore
+
+
+class LLMFallbackStage:
+    """Per-job queue of pages that need the LLM; results are collected as batches finish."""
+
+    def __init__(self, bank: str):
+        self.bank = bank
+        self._pending: list[tuple[int, str]] = []
+        self._pending_tokens = 0
+        self._tasks: list[asyncio.Task] = []
+        self._ready: list[tuple[list[int], list]] = []
+        self._inflight: dict[asyncio.Task, list[int]] = {}
+        self.pages_sent = 0
+        self.requests = 0
+        self.retries = 0
+        self.cache_stats = CacheStats()
+
+    @staticmethod
+    def _page_key(page_text: str) -> str:
+        from app.parsers.gemini_parser import GEMINI_MODEL
+        return content_key("statement_page", GEMINI_MODEL, page_text[:8000])
+
+    @staticmethod
+    def _image_key(image: bytes) -> str:
+        from app.parsers.gemini_parser import GEMINI_MODEL
+        return content_key("statement_page_image", GEMINI_MODEL, image)
+
+    async def submit(self, page_index: int, page_text: str | bytes) -> None:
+        """Queue a page's text, or the PNG of a page without a text layer."""
+        if isinstance(page_text, bytes):
+            await self._submit_image(page_index, page_text)
+            return
+        if not page_text or not page_text.strip():
+            logger.warning(f"⚠️ [{self.bank}] Page {page_index + 1} has no extractable text.")
+            return
+        cached = await content_cache.get(self._page_key(page_text), self.cache_stats)
+        if cached is not None:
+            logger.info(f"🤖 [{self.bank}] Page {page_index + 1} LLM result served from cache")
+            self._ready.append(([page_index], [{**t, "bank": self.bank} for t in cached]))
+            return
+        tokens = estimate_tokens(page_text)
+        if self._pending and self._pending_tokens + tokens > LLM_BATCH_TOKENS:
+            self._flush()
+        self._pending.append((page_index, page_text))
+        self._pending_tokens += tokens
+
+    async def _submit_image(self, page_index: int, image: bytes) -> None:
+        cached = await content_cache.get(self._image_key(image), self.cache_stats)
+        if cached is not None:
+            logger.info(f"🤖 [{self.bank}] Page {page_index + 1} LLM image result served from cache")
+            self._ready.append(([page_index], [{**t, "bank": self.bank} for t in cached]))
+            return
+        task = asyncio.create_task(self._run_image(page_index, image))
+        self._inflight[task] = [page_index]
+        self._tasks.append(task)
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        task = asyncio.create_task(self._run(batch))
+        self._inflight[task] = [i for i, _ in batch]
+        self._tasks.append(task)
+
+    def lowest_pending_page(self) -> int | None:
+        """Lowest page index whose LLM result has not been handed back yet (for checkpoints)."""
+        pages = [i for i, _ in self._pending]
+        pages += [i for task_pages in self._inflight.values() for i in task_pages]
+        pages += [i for ready_pages, _ in self._ready for i in ready_pages]
+        return min(pages) if pages else None
+
+    async def _request(self, pages: list[int], tokens: int, call) -> tuple[list | None, float]:
+        """
+        Await `call()` under the shared rate limits, retrying rate-limit errors
+        with backoff. Returns (txns, latency_ms); txns is None when it failed.
+        """
+        bucket, semaphore = _limits()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await bucket.acquire(tokens)
+            async with semaphore:
+                try:
+                    self.requests += 1
+                    started = time.perf_counter()
+                    txns = await call()
+                    self.pages_sent += len(pages)
+                    return txns, (time.perf_counter() - started) * 1000
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == LLM_MAX_RETRIES:
+                        logger.error(f"❌ LLM fallback failed for pages {[p + 1 for p in pages]}: {e}")
+                        return None, 0.0
+                    self.retries += 1
+            delay = LLM_BACKOFF_BASE ** attempt + random.uniform(0, 1)
+            logger.warning(f"⏳ [{self.bank}] LLM rate limited, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return None, 0.0
+
+    async def _run(self, batch: list[tuple[int, str]]) -> tuple[list[int], list]:
+        from app.parsers.gemini_parser import GeminiParser
+
+        pages = [i for i, _ in batch]
+        texts = [t for _, t in batch]
+        tokens = sum(estimate_tokens(t) for t in texts)
+        txns, latency_ms = await self._request(
+            pages, tokens, lambda: GeminiParser().parse_pages_text_async(texts, self.bank))
+        if txns is None:
+            return pages, []
+        txns = await self._cache_by_page(batch, txns, latency_ms)
+        logger.info(f"🤖 [{self.bank}] LLM fallback pages {[p + 1 for p in pages]} → {len(txns)} txns")
+        return pages, txns
+
+    async def _run_image(self, page_index: int, image: bytes) -> tuple[list[int], list]:
+        from app.parsers.gemini_parser import GeminiParser, GEMINI_MODEL
+
+        txns, latency_ms = await self._request(
+            [page_index], LLM_IMAGE_TOKENS, lambda: GeminiParser().parse_page_image_async(image, self.bank))
+        if not txns:  # failed, or empty — an empty reply is not cached either
+            return [page_index], []
+        await content_cache.set(self._image_key(image), txns, "statement_page_image", GEMINI_MODEL, latency_ms)
+        logger.info(f"🤖 [{self.bank}] LLM fallback page {page_index + 1} (image) → {len(txns)} txns")
+        return [page_index], txns
+
+    async def _cache_by_page(self, batch: list[tuple[int, str]], txns: list, latency_ms: float) -> list:
+        """
+        Split a batch reply back into pages and cache each one. Only done when
+        every row carries a valid page label (or the batch is a single page).
+        Pages that came back without rows are not cached: an empty reply may
+        be a one-off failure, and a cached [] would be served as a hit.
+        """
+        from app.parsers.gemini_parser import GEMINI_MODEL
+
+        if len(batch) == 1:
+            by_page = {1: txns}
+        else:
+            by_page = {n: [] for n in range(1, len(batch) + 1)}
+            if not txns or any(t.get("page") not in by_page for t in txns):
+                return [{k: v for k, v in t.items() if k != "page"} for t in txns]
+            for t in txns:
+                by_page[t["page"]].append(t)
+
+        per_page_ms = latency_ms / len(batch)
+        for n, (_, text) in enumerate(batch, start=1):
+            rows = [{k: v for k, v in t.items() if k != "page"} for t in by_page[n]]
+            if not rows:
+                continue
+            await content_cache.set(self._page_key(text), rows, "statement_page", GEMINI_MODEL, per_page_ms)
+        return [{k: v for k, v in t.items() if k != "page"} for t in txns]
+
+    def pop_completed(self) -> list[tuple[list[int], list]]:
+        """Results of batches that already finished (non-blocking)."""
+        done = [t for t in self._tasks if t.done()]
+        self._tasks = [t for t in self._tasks if not t.done()]
+        for t in done:
+            self._inflight.pop(t, None)
+        ready, self._ready = self._ready, []
+        return ready + [t.result() for t in done]
+
+    async def drain(self) -> list[tuple[list[int], list]]:
+        """Send whatever is still queued and wait for every batch."""
+        self._flush()
+        tasks, self._tasks = self._tasks, []
+        ready, self._ready = self._ready, []
+        results = list(await asyncio.gather(*tasks))
+        self._inflight.clear()
+        return ready + results
+
+    def cancel(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        self._tasks = []
+        self._inflight.clear()
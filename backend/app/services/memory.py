@@ -0,0 +1,61 @@
+"""
+Process memory helpers for bounded-memory ingestion.
+
+Configuration (env):
+  INGEST_MEMORY_LIMIT_MB       RSS ceiling per process (0 → no ceiling).
+                               A parse worker over it ends its page range early;
+                               the pipeline pauses at the next checkpoint and,
+                               if memory does not come back down, hands the job
+                               back to the queue to continue from the checkpoint.
+  INGEST_MEMORY_PAUSE_SECONDS  how long the pipeline waits for memory to drop
+"""
+import os
+import gc
+import sys
+import asyncio
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+INGEST_MEMORY_LIMIT_MB = int(os.getenv("INGEST_MEMORY_LIMIT_MB", "0"))
+INGEST_MEMORY_PAUSE_SECONDS = float(os.getenv("INGEST_MEMORY_PAUSE_SECONDS", "30"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class MemoryCeilingExceeded(Exception):
+    """Raised by the pipeline to split a job at its last checkpoint."""
+
+
+def rss_mb() -> float:
+    """
+    Current resident set size in MB (peak RSS where /proc is unavailable).
+    0.0 where neither exists (Windows): the memory ceiling then never trips.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0.0
+        scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def over_limit(limit_mb: int = INGEST_MEMORY_LIMIT_MB) -> bool:
+    return limit_mb > 0 and rss_mb() > limit_mb
+
+
+async def wait_below(limit_mb: int = INGEST_MEMORY_LIMIT_MB,
+                     timeout: float = INGEST_MEMORY_PAUSE_SECONDS) -> bool:
+    """Collect garbage and wait (other jobs in this process may finish) until RSS < limit."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        gc.collect()
+        if not over_limit(limit_mb):
+            return True
+        if asyncio.get_running_loop().time() >= deadline:
+            return False
+        await asyncio.sleep(0.5)
@@ -0,0 +1,248 @@
+"""
+Parsing executor — runs pdfplumber page parsing off the event loop.
+
+pdfplumber's extract_tables is pure-Python CPU work (up to four strategies per
+page), so running it inline blocks every other request on the uvicorn worker.
+Pages are parsed in a process pool in contiguous ranges (shards) running
+concurrently; each range gets the path of the unlocked PDF, opens its own
+pdfplumber document and returns per-page results plus the parser state
+(header mapping) it ended with. See iter_parsed_pages for how ranges that
+start mid-table get their columns and how results are merged in order.
+
+Memory stays bounded: each page's pdfplumber caches are released right after
+it is parsed, each range opens (and closes) its own document, worker
+processes are recycled after PARSE_MAX_TASKS_PER_CHILD ranges, and a worker
+over INGEST_MEMORY_LIMIT_MB ends its range early (the next range picks up
+from the following page in a fresh call).
+
+Configuration (env):
+  PARSE_WORKERS              process pool size (0 → parse in a thread, no pool)
+  PARSE_PAGES_PER_TASK       pages handed to one worker call
+  PARSE_MAX_TASKS_PER_CHILD  ranges a worker process parses before it is replaced (0 → never)
+  PARSE_STATE_TOLERANCE_PT   column-bound drift (PDF points) under which two parser
+                             states count as the same seed
+"""
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 2)))
+PARSE_PAGES_PER_TASK = max(1, int(os.getenv("PARSE_PAGES_PER_TASK", "8")))
+PARSE_MAX_TASKS_PER_CHILD = int(os.getenv("PARSE_MAX_TASKS_PER_CHILD", "32"))
+PARSE_STATE_TOLERANCE_PT = float(os.getenv("PARSE_STATE_TOLERANCE_PT", "1.0"))
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor | None:
+    """Lazily create the shared process pool. Returns None when pooling is disabled."""
+    global _executor
+    if PARSE_WORKERS <= 0:
+        return None
+    if _executor is None:
+        # spawn, not fork: the parent holds Motor/asyncio threads that must not be copied
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=PARSE_MAX_TASKS_PER_CHILD or None,
+        )
+        logger.info(f"🧵 Parse pool started with {PARSE_WORKERS} workers")
+    return _executor
+
+
+def shutdown_executor(wait: bool = False) -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+        logger.info("🧵 Parse pool stopped")
+
+
+def _parse_pages(pdf, bank: str, start: int, end: int, state=None, skip=frozenset()) -> tuple[list, object]:
+    from app.parsers.factory import get_parser
+    from app.parsers.strategy_cache import strategy_cache
+    from app.services.memory import rss_mb, INGEST_MEMORY_LIMIT_MB
+
+    parser = get_parser(bank)
+    parser.restore_state(state)
+    parser.defer_llm = True
+
+    results = []
+    for i in range(start, min(end, len(pdf.pages))):
+        parser.deferred_text = None
+        # Already-ingested pages are skipped once the columns are known; a page
+        # that would teach the parser its header is still parsed.
+        if i in skip and parser.has_header():
+            results.append((i, None, None, rss_mb(), {"route": "known", "reason": "already imported"}))
+            continue
+        page = pdf.pages[i]
+        parser.last_route = None
+        txns = parser.parse_page(page)
+        # Drop the page's cached chars / layout objects; the PDF would keep them alive until close
+        page.close()
+        rss = rss_mb()
+        route = parser.last_route or {"route": "tables", "reason": "not pre-classified"}
+        results.append((i, txns, parser.deferred_text, rss, {"route": route["route"], "reason": route["reason"]}))
+        if INGEST_MEMORY_LIMIT_MB and rss > INGEST_MEMORY_LIMIT_MB and i + 1 < end:
+            logger.warning(f"🐘 [{bank}] RSS {rss:.0f} MB over ceiling after page {i + 1}; ending range early")
+            break
+    logger.info(f"📊 [{bank}] pages {start + 1}-{end} strategy cache: {strategy_cache.stats()}")
+    return results, parser.export_state()
+
+
+def parse_page_range(pdf_path: str, bank: str, start: int, end: int, state=None,
+                     skip=frozenset()) -> tuple[list, object]:
+    """
+    Worker entry point. Parses pages [start, end) and returns
+    ([(page_index, txns, llm_text, rss_mb, route), ...], parser_state). llm_text is
+    the page text (or PNG bytes of a scanned page) when the page needs the LLM
+    fallback, else None; txns is
+    None for a page in `skip` that was not parsed. The range may end before
+    `end` when the worker is over the memory ceiling. route is the page
+    pre-classification ({"route", "reason"}).
+    """
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return _parse_pages(pdf, bank, start, end, state, skip)
+
+
+def same_state(a, b, tol: float = PARSE_STATE_TOLERANCE_PT) -> bool:
+    """
+    Parser states equal for seeding purposes: the same mappings and column
+    count, with float coordinates (column bounds, narration edge) within
+    `tol` points — a header re-learned on a later page lands a fraction of a
+    point away. Lists and tuples compare alike (a checkpoint from Mongo holds lists).
+    """
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_state(a[k], b[k], tol) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same_state(x, y, tol) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        numbers = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (a, b))
+        return numbers and abs(a - b) <= tol
+    return a == b
+
+
+class ShardStats:
+    """Progress across the ranges of one statement, updated as shards finish (in any order)."""
+
+    def __init__(self):
+        self.shards_total = 0
+        self.shards_done = 0
+        self.parsed_pages = 0
+        self.reparsed = 0  # shards re-run because their speculative seed state was wrong
+
+    def _done(self, future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.shards_done += 1
+        self.parsed_pages += len(future.result()[0])
+
+
+async def iter_parsed_pages(source, bank: str, start_page: int = 0, start_state=None, skip_pages=frozenset(),
+                            stats: ShardStats | None = None):
+    """
+    Async generator yielding (page_index, txns, llm_text, state, worker_rss_mb, route) in page order
+    for an opened StatementSource. `state` is the parser state at the end of a
+    range (set on the last page of each range, None otherwise) — what a
+    resumed job needs to continue from the following page. Pages in
+    `skip_pages` are yielded with txns=None when they were not parsed.
+
+    Sharding: the first range runs alone and its end state (the header
+    mapping) seeds every later range, which then run concurrently — up to
+    PARSE_WORKERS at a time — so ranges that start mid-table still know
+    their columns. Results are merged strictly in page order; a range whose
+    seed turns out to differ from the real end state of the range before it
+    (the layout changed) is re-parsed with the right state, so the output is
+    always identical to a serial parse (column bounds aside, within
+    PARSE_STATE_TOLERANCE_PT). Without a pool the source's already open
+    document is parsed in a thread, one range at a time: a thread cannot be
+    cancelled, so a discarded range is waited for before that document is
+    touched again.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    total_pages = source.page_count
+    window = max(1, PARSE_WORKERS) if executor is not None else 1
+    stats = stats or ShardStats()
+
+    def submit(start: int, end: int, state):
+        skip = frozenset(i for i in skip_pages if start <= i < end)
+        if executor is None:
+            future = asyncio.ensure_future(asyncio.to_thread(_parse_pages, source.pdf, bank, start, end, state, skip))
+        else:
+            future = loop.run_in_executor(executor, parse_page_range, source.path, bank, start, end, state, skip)
+        future.add_done_callback(stats._done)
+        return future
+
+    async def discard(future) -> None:
+        """Drop a speculative range; in no-pool mode wait for its thread to let go of source.pdf."""
+        if executor is not None:
+            future.cancel()
+        else:
+            await asyncio.gather(future, return_exceptions=True)
+
+    async def run_exact(start: int, end: int, state) -> list[tuple]:
+        """Parse [start, end) with `state`, following up ranges that end early; returns [(results, state)]."""
+        chunks = []
+        while start < end:
+            stats.shards_total += 1
+            results, state = await submit(start, end, state)
+            if not results:
+                break
+            chunks.append((results, state))
+            start = results[-1][0] + 1
+        return chunks
+
+    if start_page >= total_pages:
+        return
+
+    planned = [(s, min(s + PARSE_PAGES_PER_TASK, total_pages))
+               for s in range(start_page, total_pages, PARSE_PAGES_PER_TASK)]
+    inflight: list[tuple] = []  # (start, end, seed, future), in page order
+    try:
+        # 1. Header propagation: the first range establishes the state the others are seeded with
+        first_start, first_end = planned.pop(0)
+        chunks = await run_exact(first_start, first_end, start_state)
+        prev_state = chunks[-1][1] if chunks else start_state
+        seed = prev_state
+
+        while True:
+            # 2. Keep up to `window` speculative ranges in flight
+            while planned and len(inflight) < window:
+                s, e = planned.pop(0)
+                stats.shards_total += 1
+                inflight.append((s, e, seed, submit(s, e, seed)))
+
+            for results, state in chunks:
+                for n, (page_index, txns, llm_text, rss, route) in enumerate(results):
+                    yield page_index, txns, llm_text, state if n == len(results) - 1 else None, rss, route
+                prev_state = state
+            # later shards are seeded with the latest known state
+            seed = prev_state
+
+            if not inflight:
+                break
+
+            # 3. Ordered merge: accept the next range only if its seed matches reality
+            s, e, range_seed, future = inflight.pop(0)
+            if not same_state(range_seed, prev_state):
+                await discard(future)
+                stats.reparsed += 1
+                logger.info(f"🔀 [{bank}] pages {s + 1}-{e}: header state changed before this shard; re-parsing")
+                chunks = await run_exact(s, e, prev_state)
+                continue
+            results, state = await future
+            chunks = [(results, state)] if results else []
+            last = results[-1][0] + 1 if results else s
+            if last < e:
+                # the shard ended early (memory ceiling) — finish it from its own end state
+                chunks += await run_exact(last, e, state if results else prev_state)
+    finally:
+        for _, _, _, future in inflight:
+            await discard(future)
@@ -0,0 +1,88 @@
+"""
+StatementSource — single-open ingestion path for an uploaded statement PDF.
+
+The old path read the whole file into RAM, fully opened it with pdfplumber
+just to detect encryption, opened it again to count pages and a third time
+to parse. StatementSource instead:
+
+  1. checks the trailer for /Encrypt (no document parse),
+  2. decrypts with pikepdf at most once, to a temp file next to the upload,
+  3. opens ONE pdfplumber document used for page count and in-process parsing.
+
+`path` always points at an unlocked file on disk, so parse pool workers can
+open it themselves instead of receiving a pickled copy of the bytes.
+"""
+import os
+import logging
+import tempfile
+
+import pdfplumber
+import pikepdf
+
+from app.parsers.base import StatementFileError
+from app.utils.unlock_pdf import is_encrypted_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def unlock_to_file(file_path: str, password: str | None) -> str:
+    """Decrypt `file_path` with pikepdf into a new temp file next to it; returns its path."""
+    try:
+        with pikepdf.open(file_path, password=password or "") as src:
+            fd, out_path = tempfile.mkstemp(suffix=".pdf", dir=os.path.dirname(file_path) or None)
+            os.close(fd)
+            src.save(out_path)
+    except pikepdf.PasswordError:
+        if not password:
+            raise StatementFileError("PDF is password protected")
+        raise StatementFileError("Invalid PDF password")
+    return out_path
+
+
+class StatementSource:
+    def __init__(self, file_path: str, password: str | None = None):
+        self.file_path = file_path
+        self.password = password
+        self.path = file_path          # unlocked file actually parsed
+        self.pdf = None                # the single pdfplumber document
+        self.page_count = 0
+        self.encrypted = False
+        self._decrypted_path: str | None = None
+
+    def open(self) -> "StatementSource":
+        self.encrypted = is_encrypted_pdf(self.file_path)
+        if self.encrypted:
+            self._decrypt()
+
+        try:
+            self.pdf = pdfplumber.open(self.path)
+        except Exception:
+            if self.encrypted:
+                raise
+            # Trailer scan missed an /Encrypt (e.g. buried in an xref stream) → decrypt and retry
+            self.encrypted = True
+            self._decrypt()
+            self.pdf = pdfplumber.open(self.path)
+
+        self.page_count = len(self.pdf.pages)
+        logger.info(f"📂 Opened {self.file_path}: {self.page_count} pages (encrypted={self.encrypted})")
+        return self
+
+    def _decrypt(self) -> None:
+        self._decrypted_path = unlock_to_file(self.file_path, self.password)
+        self.path = self._decrypted_path
+        logger.info("🔓 PDF unlocked successfully")
+
+    def close(self) -> None:
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
+        if self._decrypted_path and os.path.exists(self._decrypted_path):
+            os.remove(self._decrypted_path)
+            self._decrypted_path = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
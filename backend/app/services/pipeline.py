@@ -1,142 +1,376 @@
 import os
-import io
 import shutil
-import pdfplumber
+import asyncio
 from datetime import datetime
 from bson import ObjectId
+from itertools import islice
 from app.parsers.factory import get_parser
-from app.utils.unlock_pdf import unlock_pdf
+from app.parsers.tabular import iter_transactions
+from app.services.parse_executor import iter_parsed_pages, ShardStats
+from app.services.pdf_source import StatementSource
+from app.services.llm_stage import LLMFallbackStage
+from app.services.memory import rss_mb, over_limit, wait_below, MemoryCeilingExceeded
+from app.services.statement_fingerprint import (
+    file_sha256, page_hashes, find_duplicate, known_page_hashes, record_fingerprint,
+)
 from app.utils.normalize import normalize
 from app.utils.hash import make_hash
+from app.utils.memo import memo_stats, save_memos
 from app.models.transaction import Transaction
-from pymongo import UpdateOne
+from app.services.write_planner import write_transactions
+from app.services.search_index import search_grams
+from app.services.bank_dimension import bank_key, source_kind
 
 import logging
-from app.services.job_store import update_job, get_job
+from app.services.job_store import ProgressReporter
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def process_statement_pipeline(file_path: str, bank: str, password: str | None, user_id: str, job_id: str = None):
+# Rows normalized and written per round-trip by the tabular (CSV / XLSX / OFX) import
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "2000"))
+# Per-page routing decisions kept on the job document (the most recent ones)
+PAGE_DECISIONS_MAX = int(os.getenv("PAGE_DECISIONS_MAX", "200"))
+
+
+def _transaction_doc(clean: dict, user_oid: str, account_id: str, txn_hash: str, bank_upper: str) -> dict:
+    """Stored transaction fields for one normalized row."""
+    return {
+        "user_id": user_oid,
+        "account_id": account_id,
+        "hash": txn_hash,
+        "txn_date": clean.get("txn_date"),
+        "date": clean.get("date"),
+        "description": clean.get("description"),
+        "payee": clean.get("payee"),
+        "category": clean.get("category"),
+        "debit": clean.get("debit"),
+        "credit": clean.get("credit"),
+        "balance": clean.get("balance"),
+        "bank": bank_upper,
+        "type": clean.get("type"),
+        "search_grams": search_grams(clean.get("description"), clean.get("payee"), bank_upper),
+        "bank_key": bank_key(bank_upper),
+        "source_kind": source_kind(bank_upper),
+    }
+
+
+async def process_statement_pipeline(file_path: str, bank: str, password: str | None, user_id: str, job_id: str = None,
+                                     start_page: int = 0, start_state=None, raw_sha256: str | None = None,
+                                     raise_errors: bool = False):
     """
     Robust pipeline to process bank statement PDF files.
-    1. Unlocks PDF (if password provided)
+    1. Opens the PDF once via StatementSource (decrypting only if the trailer says so)
+       and fingerprints it: a file already ingested for this account completes
+       at once, and pages seen in an earlier upload are neither parsed nor written
     2. Streams pages one by one to avoid RAM spikes
-    3. Uses SmartUniversalParser (pdfplumber + Gemini fallback) for all banks
-    4. Normalizes and bulk upserts transactions
-    5. Cleans up temp file
+    3. Parses page ranges concurrently in the parse process pool
+       (SmartUniversalParser / FederalBankParser) so the event loop stays free;
+       results are merged back in page order, so in-statement dedup and the
+       running balance see rows exactly as a serial parse would
+    4. Normalizes transactions and writes only new / changed ones (write_planner); pages with no table rows go
+       through the batched async LLM fallback stage
+    5. Checkpoints the last fully written page (+ parser state) on the job so
+       a crashed job resumes from `start_page` / `start_state` instead of page 1.
+       Peak RSS (pipeline and parse workers) is recorded on the job; over
+       INGEST_MEMORY_LIMIT_MB the pipeline pauses at a checkpoint and, for
+       queue jobs, raises MemoryCeilingExceeded so the job continues later
+    6. Cleans up temp file
+
+    With raise_errors (queue workers) a failure is re-raised instead of being
+    recorded as "failed", so the queue can decide to retry.
     """
     bank_upper = bank.upper().strip()
     logger.info(f"🚀 PIPELINE STARTED: file={file_path} bank={bank_upper} user={user_id}")
-    
-    try:
-        # 1. Read & Unlock PDF
-        with open(file_path, "rb") as f:
-            file_bytes = f.read()
+    source = None
+    llm_stage = None
+    # Job progress is buffered in memory and flushed with $set/$inc (no read-back)
+    progress = ProgressReporter(job_id)
+    completed = False
+    done_message = "Done"
 
-        logger.info(f"📂 File read from disk. Size: {len(file_bytes)} bytes")
+    try:
+        # 1. Open & unlock PDF (single open, shared by progress and parsing)
+        source = StatementSource(file_path, password).open()
+        total_pages = source.page_count
+        logger.info(f"📂 File opened from disk. Size: {os.path.getsize(file_path)} bytes, pages: {total_pages}")
 
-        unlocked_bytes = unlock_pdf(file_bytes, password)
-        logger.info("🔓 PDF unlocked successfully")
+        await progress.set(status="processing", total_pages=total_pages, message="Parsing pages...")
 
-        # 2. Count pages for progress reporting
-        total_pages = 0
-        with pdfplumber.open(io.BytesIO(unlocked_bytes)) as pdf_temp:
-            total_pages = len(pdf_temp.pages)
+        user_oid = str(user_id)
+        account_id = f"{user_id}_{bank_upper}"
 
-        if job_id:
-            await update_job(job_id, status="processing", total_pages=total_pages, message="Parsing pages...")
+        # 2. Fingerprint — identical file → done; known pages → skipped
+        unlocked_sha256 = await asyncio.to_thread(file_sha256, source.path)
+        if not raw_sha256:
+            raw_sha256 = unlocked_sha256 if source.path == file_path else await asyncio.to_thread(file_sha256, file_path)
+        duplicate = await find_duplicate(user_oid, account_id, raw_sha256, unlocked_sha256)
+        if duplicate and not start_page:
+            logger.info(f"♻️ Identical statement already imported (job {duplicate.job_id}); skipping")
+            await progress.set(processed_pages=total_pages, skipped_pages=total_pages,
+                               skipped_rows=len(duplicate.txn_hashes), duplicate_of=duplicate.job_id)
+            done_message = "Statement already imported — nothing new"
+            completed = True
+            return
 
-        # 3. Get bank-appropriate parser
-        parser = get_parser(bank_upper)
-        logger.info(f"🧩 Parser selected: {type(parser).__name__} for bank: {bank_upper}")
+        try:
+            hashes = await asyncio.to_thread(page_hashes, source.pdf)
+        except Exception as e:
+            logger.warning(f"⚠️ Page fingerprinting failed, parsing every page: {e}")
+            hashes = []
+        known_rows = await known_page_hashes(user_oid, account_id, hashes) if hashes else {}
+        skip_pages = frozenset(i for i, h in enumerate(hashes) if h in known_rows and i >= start_page)
+        if skip_pages:
+            logger.info(f"♻️ {len(skip_pages)}/{total_pages} pages already imported; skipping them")
+        page_rows = [0] * total_pages
 
-        valid_batch = []
-        user_oid = str(user_id)
-        account_id = f"{user_id}_{bank_upper}"
+        # 3. Parser is built inside the parse workers; log the choice here
+        logger.info(f"🧩 Parser selected: {type(get_parser(bank_upper)).__name__} for bank: {bank_upper}")
         
         # Track hashes processed in this session to avoid internal duplicates
         processed_hashes = set()
 
-        # 4. Stream pages
-        with pdfplumber.open(io.BytesIO(unlocked_bytes)) as pdf:
-            for i, page in enumerate(pdf.pages):
-                if job_id:
-                    await update_job(job_id, processed_pages=i + 1,
-                                     message=f"Processing page {i + 1}/{total_pages}")
-
-                # Parse the page (SmartUniversalParser handles Gemini fallback internally)
-                page_data = parser.parse_page(page)
-
-                # 5. Normalize & batch
-                for txn in page_data:
-                    # Ensure the bank name is always the user-supplied value
-                    txn["bank"] = bank_upper
-                    clean = normalize(txn)
-                    if not clean:
-                        continue
-
-                    txn_hash = make_hash(account_id, clean)
-                    
-                    # Prevent processing the same transaction twice in the same upload
-                    # (Common in multi-page statements where rows overlap)
-                    if txn_hash in processed_hashes:
-                        continue
-                    processed_hashes.add(txn_hash)
-
-                    valid_batch.append(
-                        UpdateOne(
-                            {"hash": txn_hash, "user_id": user_oid},
-                            {
-                                "$setOnInsert": {
-                                    "user_id": user_oid,
-                                    "account_id": account_id,
-                                    "hash": txn_hash,
-                                    "txn_date": clean.get("txn_date"),
-                                    "date": clean.get("date"),
-                                },
-                                "$set": {
-                                    "description": clean.get("description"),
-                                    "payee": clean.get("payee"),
-                                    "category": clean.get("category"),
-                                    "debit": clean.get("debit"),
-                                    "credit": clean.get("credit"),
-                                    "balance": clean.get("balance"),
-                                    "bank": bank_upper,
-                                    "type": clean.get("type"),
-                                    "updated_at": datetime.utcnow(),
-                                },
-                            },
-                            upsert=True,
-                        )
-                    )
+        async def write_rows(raw_txns: list) -> int:
+            """Normalize, dedupe and write one page's worth of raw rows (new + changed only)."""
+            valid_batch = []
+            for txn in raw_txns:
+                # Ensure the bank name is always the user-supplied value
+                txn["bank"] = bank_upper
+                clean = normalize(txn)
+                if not clean:
+                    continue
+
+                txn_hash = make_hash(account_id, clean)
+                
+                # Prevent processing the same transaction twice in the same upload
+                # (Common in multi-page statements where rows overlap)
+                if txn_hash in processed_hashes:
+                    continue
+                processed_hashes.add(txn_hash)
 
+                valid_batch.append(_transaction_doc(clean, user_oid, account_id, txn_hash, bank_upper))
+
+            # Flush batch after each page to keep memory usage flat
+            if valid_batch:
+                result = await write_transactions(Transaction.get_pymongo_collection(), user_oid, valid_batch)
+                logger.info(f"💾 {len(valid_batch)} rows → inserted {result.inserted}, "
+                            f"updated {result.updated}, unchanged {result.unchanged}")
+
+                await progress.inc(processed_txns=len(valid_batch), inserted_txns=result.inserted,
+                                   updated_txns=result.updated, unchanged_txns=result.unchanged)
+
+            return len(valid_batch)
+
+        # Pages with no table rows are queued for the batched async LLM fallback
+        llm_stage = LLMFallbackStage(bank_upper)
+
+        # 4. Stream parsed pages back from the parse pool (in page order)
+        if start_page:
+            logger.info(f"⏩ Resuming from checkpoint at page {start_page + 1}/{total_pages}")
+        peak_rss = peak_parse_rss = 0.0
+        unparsed_pages = 0
+        shards = ShardStats()
+        async for i, page_data, llm_text, parser_state, worker_rss, route in iter_parsed_pages(
+                source, bank_upper, start_page, start_state, skip_pages, stats=shards):
+            # processed_pages = merged & written in order; parsed_pages = parsed by any shard so far
+            await progress.set(processed_pages=i + 1, message=f"Processing page {i + 1}/{total_pages}",
+                               parsed_pages=min(total_pages, start_page + shards.parsed_pages),
+                               shards_total=shards.shards_total, shards_done=shards.shards_done)
+
+            # Pre-classification decision for this page (skip / words / tables / llm / known)
+            await progress.inc(**{f"page_routes.{route['route']}": 1})
+            await progress.push("page_decisions", {"page": i + 1, **route}, keep=PAGE_DECISIONS_MAX)
+            if route["route"] == "unparsed":
+                # No text and no renderable image: tell the user instead of dropping it silently
+                unparsed_pages += 1
+                await progress.push("unparsed_pages", i + 1, keep=PAGE_DECISIONS_MAX)
+
+            # Memory high-water marks (this process / the parse worker that handled the page)
+            current_rss = rss_mb()
+            if current_rss > peak_rss or worker_rss > peak_parse_rss:
+                peak_rss, peak_parse_rss = max(peak_rss, current_rss), max(peak_parse_rss, worker_rss)
+                await progress.set(peak_rss_mb=round(peak_rss, 1), peak_parse_rss_mb=round(peak_parse_rss, 1))
+
+            if page_data is None:
+                # Same page content as an earlier upload — its rows are already stored
+                page_rows[i] = known_rows[hashes[i]]
+                await progress.inc(skipped_pages=1, skipped_rows=page_rows[i])
+                logger.info(f"⏭️ Page {i+1}/{total_pages} already imported ({page_rows[i]} rows)")
+            else:
+                if llm_text is not None:
+                    await llm_stage.submit(i, llm_text)
+
+                # 5. Normalize & write
+                written = await write_rows(page_data)
+                page_rows[i] += written
                 logger.info(
                     f"📄 Page {i+1}/{total_pages} parsed → "
-                    f"{len(page_data)} raw items | batch size: {len(valid_batch)}"
+                    f"{len(page_data)} raw items | written: {written}"
                 )
 
-                # 6. Flush batch after each page to keep memory usage flat
-                if valid_batch:
-                    logger.info(f"💾 Inserting batch of {len(valid_batch)} transactions...")
-                    await Transaction.get_pymongo_collection().bulk_write(valid_batch, ordered=False)
+            # 6. Write any LLM batches that finished meanwhile
+            for pages, llm_txns in llm_stage.pop_completed():
+                written = await write_rows(llm_txns)
+                if len(pages) == 1:
+                    page_rows[pages[0]] += written
+
+            # 7. Checkpoint at range boundaries once every earlier page is written
+            if parser_state is not None:
+                lowest_pending = llm_stage.lowest_pending_page()
+                if lowest_pending is None or lowest_pending > i:
+                    await progress.set(checkpoint_page=i + 1, checkpoint_state=parser_state)
+
+                    # 7b. Memory ceiling: pause here; queue jobs split off the rest if it stays high
+                    if over_limit() and i + 1 < total_pages:
+                        logger.warning(f"🐘 RSS {rss_mb():.0f} MB over ceiling at page {i + 1}; pausing")
+                        await progress.set(message="Paused: waiting for memory...")
+                        if not await wait_below() and raise_errors:
+                            await progress.flush()
+                            raise MemoryCeilingExceeded(f"memory ceiling reached at page {i + 1}")
+
+        # 6b. Wait for the remaining LLM batches
+        for pages, llm_txns in await llm_stage.drain():
+            written = await write_rows(llm_txns)
+            if len(pages) == 1:
+                page_rows[pages[0]] += written
+        if llm_stage.requests or llm_stage.cache_stats.hits:
+            cache_report = llm_stage.cache_stats.as_dict()
+            logger.info(f"🤖 LLM fallback: {llm_stage.pages_sent} pages in {llm_stage.requests} requests "
+                        f"({llm_stage.retries} rate-limit retries) | cache: {cache_report}")
+            await progress.set(llm_cache=cache_report)
 
-                    if job_id:
-                        job = await get_job(job_id)
-                        current_count = (job.processed_txns if job else 0) + len(valid_batch)
-                        await update_job(job_id, processed_txns=current_count)
+        # Remember this file (only when every page went through this run,
+        # otherwise the per-page row counts are incomplete)
+        if not start_page:
+            await record_fingerprint(
+                user_id=user_oid, account_id=account_id, job_id=job_id,
+                raw_sha256=raw_sha256, unlocked_sha256=unlocked_sha256,
+                page_count=total_pages, page_rows=page_rows if hashes else [],
+                # Pages that yielded nothing (cover/summary pages, or a failed LLM
+                # fallback) are not remembered, so a re-upload retries them
+                page_hashes=[h if page_rows[n] else "" for n, h in enumerate(hashes)],
+                txn_hashes=sorted(processed_hashes),
+            )
 
-                    valid_batch = []
+        if unparsed_pages:
+            done_message = f"Done — {unparsed_pages} page(s) could not be read (see unparsed_pages)"
+        completed = True
 
     except Exception as e:
         logger.error(f"❌ PIPELINE ERROR: {str(e)}", exc_info=True)
-        if job_id:
-            await update_job(job_id, status="failed", message=str(e))
+        if raise_errors:
+            raise
+        await progress.set(status="failed", message=str(e))
+    finally:
+        # 8. Persist newly learned payees, close the document and cleanup temp files
+        saved = await save_memos()
+        logger.info(f"🧠 Payee memo: {memo_stats()} | {saved} new entries saved")
+        if llm_stage is not None:
+            llm_stage.cancel()
+        if source is not None:
+            source.close()
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            logger.info(f"🧹 Cleaned up temp file: {file_path}")
+        if completed:
+            await progress.set(status="completed", message=done_message)
+        await progress.flush()
+
+
+
+async def process_tabular_pipeline(file_path: str, bank: str, kind: str, user_id: str, job_id: str = None,
+                                   start_row: int = 0, raw_sha256: str | None = None,
+                                   raise_errors: bool = False):
+    """
+    Pipeline for CSV / XLSX / XLS / OFX exports (app/parsers/tabular.py).
+
+    Rows are streamed from the file and handled IMPORT_BATCH_ROWS at a time:
+    decode + normalize + hash run in a thread (the event loop stays free),
+    then the batch goes through write_planner like a PDF page. Hashes are the
+    same make_hash(account_id, normalize(row)) as the PDF path, so a PDF and
+    an export of the same period collapse to the same transactions.
+    checkpoint_row (raw rows fully written) lets a retried job resume.
+    """
+    bank_upper = bank.upper().strip()
+    logger.info(f"🚀 TABULAR IMPORT STARTED: file={file_path} kind={kind} bank={bank_upper} user={user_id}")
+    progress = ProgressReporter(job_id)
+    completed = False
+    done_message = "Done"
+
+    try:
+        await progress.set(status="processing", message="Importing rows...")
+        user_oid = str(user_id)
+        account_id = f"{user_id}_{bank_upper}"
+
+        if not raw_sha256:
+            raw_sha256 = await asyncio.to_thread(file_sha256, file_path)
+        duplicate = await find_duplicate(user_oid, account_id, raw_sha256)
+        if duplicate and not start_row:
+            logger.info(f"♻️ Identical export already imported (job {duplicate.job_id}); skipping")
+            await progress.set(skipped_rows=len(duplicate.txn_hashes), duplicate_of=duplicate.job_id)
+            done_message = "Statement already imported — nothing new"
+            completed = True
+            return
+
+        rows = iter_transactions(file_path, kind, bank_upper)
+        if start_row:
+            logger.info(f"⏩ Resuming from checkpoint at row {start_row + 1}")
+            await asyncio.to_thread(lambda: next(islice(rows, start_row, start_row), None))
+        processed_hashes = set()
+
+        def next_batch() -> tuple[int, list]:
+            """Decode, normalize and hash the next batch (runs in a thread)."""
+            raw_txns = list(islice(rows, IMPORT_BATCH_ROWS))
+            docs = []
+            for txn in raw_txns:
+                txn["bank"] = bank_upper
+                clean = normalize(txn)
+                if not clean:
+                    continue
+                txn_hash = make_hash(account_id, clean)
+                if txn_hash in processed_hashes:
+                    continue
+                processed_hashes.add(txn_hash)
+                docs.append(_transaction_doc(clean, user_oid, account_id, txn_hash, bank_upper))
+            return len(raw_txns), docs
+
+        collection = Transaction.get_pymongo_collection()
+        consumed = start_row
+        peak_rss = 0.0
+        while True:
+            count, docs = await asyncio.to_thread(next_batch)
+            if not count:
+                break
+            consumed += count
+            if docs:
+                result = await write_transactions(collection, user_oid, docs)
+                await progress.inc(processed_txns=len(docs), inserted_txns=result.inserted,
+                                   updated_txns=result.updated, unchanged_txns=result.unchanged)
+            peak_rss = max(peak_rss, rss_mb())
+            await progress.set(total_txns=consumed, checkpoint_row=consumed, peak_rss_mb=round(peak_rss, 1),
+                               message=f"Imported {consumed} rows")
+            logger.info(f"💾 Rows {consumed - count + 1}-{consumed} → {len(docs)} written")
+
+        if not start_row:
+            await record_fingerprint(
+                user_id=user_oid, account_id=account_id, job_id=job_id,
+                raw_sha256=raw_sha256, unlocked_sha256=raw_sha256, page_count=0,
+                txn_hashes=sorted(processed_hashes),
+            )
+        completed = True
+
+    except Exception as e:
+        logger.error(f"❌ TABULAR IMPORT ERROR: {str(e)}", exc_info=True)
+        if raise_errors:
+            raise
+        await progress.set(status="failed", message=str(e))
     finally:
-        # 7. Cleanup temp file
+        saved = await save_memos()
+        logger.info(f"🧠 Payee memo: {memo_stats()} | {saved} new entries saved")
         if os.path.exists(file_path):
             os.remove(file_path)
             logger.info(f"🧹 Cleaned up temp file: {file_path}")
-        if job_id:
-            await update_job(job_id, status="completed", message="Done")
+        if completed:
+            await progress.set(status="completed", message=done_message)
+        await progress.flush()
@@ -0,0 +1,180 @@
+"""
+Job progress pub/sub behind the streaming endpoints (/upload/events, /upload/ws).
+
+ProgressReporter publishes the job document after every flush (its
+find_one_and_update already returns it, so publishing costs no extra read).
+Subscribers in the same process — the API with embedded workers — get it
+straight from memory. Updates from standalone workers (python -m app.worker)
+are relayed by one listener per API process, running only while somebody
+is subscribed:
+
+  changestream  watch job_statuses (replica set / Atlas)               default
+  capped        reporters also append each update to the capped collection
+                `job_events`, the listener tails it (standalone mongod)
+  local         in-process only (single-box deployments)
+
+PROGRESS_EVENTS selects the mode; with "capped" the workers must use it too.
+"""
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from app.models.job import JobStatus
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVENTS = os.getenv("PROGRESS_EVENTS", "changestream").lower()
+PROGRESS_EVENTS_MB = int(os.getenv("PROGRESS_EVENTS_MB", "16"))
+# SSE / WebSocket keep-alive when a job makes no progress
+PROGRESS_HEARTBEAT_SECONDS = float(os.getenv("PROGRESS_HEARTBEAT_SECONDS", "15"))
+
+EVENTS_COLLECTION = "job_events"
+TERMINAL_STATUSES = ("completed", "failed")
+# Queue internals and bulky fields stay out of streamed updates
+STREAM_PROJECTION = {"_id": 0, "file_id": 0, "worker_id": 0, "lease_expires_at": 0,
+                     "checkpoint_state": 0, "page_decisions": 0}
+_SUBSCRIBER_BACKLOG = 64
+
+
+def _events_col():
+    return JobStatus.get_pymongo_collection().database[EVENTS_COLLECTION]
+
+
+async def ensure_events_collection() -> None:
+    try:
+        await JobStatus.get_pymongo_collection().database.create_collection(
+            EVENTS_COLLECTION, capped=True, size=PROGRESS_EVENTS_MB * 1024 * 1024)
+    except CollectionInvalid:
+        pass  # already there
+
+
+class ProgressBus:
+    """job_id → subscriber queues; each queue receives job documents."""
+
+    def __init__(self):
+        self._subs: dict[str, set[asyncio.Queue]] = {}
+        self._listener: asyncio.Task | None = None
+        self._events_ready = False
+
+    # ── Publishing ──
+
+    async def publish(self, doc: dict) -> None:
+        """Called by ProgressReporter with the job document after a flush."""
+        self._deliver(doc)
+        if PROGRESS_EVENTS == "capped":
+            try:
+                if not self._events_ready:
+                    await ensure_events_collection()
+                    self._events_ready = True
+                await _events_col().insert_one({"job": doc})
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Could not append progress event: {e}")
+
+    def _deliver(self, doc: dict) -> None:
+        for queue in self._subs.get(doc.get("job_id"), ()):
+            if queue.full():
+                queue.get_nowait()  # a slow client only needs the latest state
+            queue.put_nowait(doc)
+
+    # ── Subscribing ──
+
+    @asynccontextmanager
+    async def subscribe(self, job_ids: list[str]):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_SUBSCRIBER_BACKLOG)
+        for job_id in job_ids:
+            self._subs.setdefault(job_id, set()).add(queue)
+        self._ensure_listener()
+        try:
+            yield queue
+        finally:
+            for job_id in job_ids:
+                subs = self._subs.get(job_id)
+                if subs is not None:
+                    subs.discard(queue)
+                    if not subs:
+                        del self._subs[job_id]
+            if not self._subs and self._listener is not None:
+                self._listener.cancel()
+                self._listener = None
+
+    def _ensure_listener(self) -> None:
+        if PROGRESS_EVENTS == "local" or (self._listener is not None and not self._listener.done()):
+            return
+        relay = self._tail_capped if PROGRESS_EVENTS == "capped" else self._watch_changes
+        self._listener = asyncio.create_task(relay())
+
+    async def _watch_changes(self) -> None:
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["update", "replace"]}}},
+            {"$project": {f"fullDocument.{f}": 0 for f in STREAM_PROJECTION}},
+        ]
+        try:
+            async with JobStatus.get_pymongo_collection().watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get("fullDocument")
+                    if doc and doc.get("job_id") in self._subs:
+                        self._deliver(doc)
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            # Standalone mongod: no change streams — only in-process updates reach subscribers
+            logger.warning(f"⚠️ Job change stream unavailable ({e}); set PROGRESS_EVENTS=capped for remote workers")
+
+    async def _tail_capped(self) -> None:
+        await ensure_events_collection()
+        last_id = ObjectId.from_datetime(datetime.utcnow())
+        while True:
+            cursor = _events_col().find({"_id": {"$gt": last_id}}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                async for event in cursor:
+                    last_id = event["_id"]
+                    doc = event.get("job") or {}
+                    if doc.get("job_id") in self._subs:
+                        self._deliver(doc)
+            except PyMongoError as e:
+                logger.warning(f"⚠️ Progress event tail interrupted: {e}")
+            await asyncio.sleep(1)  # cursor died (empty collection / rollover) — reopen
+
+
+progress_bus = ProgressBus()
+
+
+async def job_updates(job_id: str, snapshot: dict, children: list[str] | None = None, aggregate=None):
+    """
+    Yields the job's document whenever it changes, starting with `snapshot`,
+    until it reaches a terminal status; None every PROGRESS_HEARTBEAT_SECONDS
+    without news (keep-alive).
+
+    For a batch parent pass its `children` and an `aggregate()` coroutine
+    (job_queue.batch_progress): a child update re-aggregates, at most once a second.
+    """
+    watched = children if children is not None else [job_id]
+    async with progress_bus.subscribe(watched) as queue:
+        yield snapshot
+        last_seen = {job_id: snapshot.get("updated_at")}
+        status = snapshot.get("status")
+        while status not in TERMINAL_STATUSES:
+            try:
+                doc = await asyncio.wait_for(queue.get(), timeout=PROGRESS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            # The same update can arrive in-process and through the relay
+            key = doc.get("job_id")
+            if last_seen.get(key) is not None and doc.get("updated_at") is not None \
+                    and doc["updated_at"] <= last_seen[key]:
+                continue
+            last_seen[key] = doc.get("updated_at")
+            if aggregate is not None:
+                await asyncio.sleep(1)
+                while not queue.empty():
+                    queue.get_nowait()
+                doc = await aggregate()
+            status = doc.get("status")
+            yield doc
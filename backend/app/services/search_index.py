@@ -0,0 +1,133 @@
+"""
+Transaction search index — trigrams over description / payee / bank.
+
+The list search used to be case-insensitive regexes with `\\s*` between every
+character, run against every transaction of the user. Now each transaction
+carries `search_grams`: the distinct trigrams of its compacted fields
+(lowercase letters and digits only, so "BOOK MY SHOW" and "bookmyshow" read
+the same — the old "spaces don't matter" behaviour). A query is compacted the
+same way, all of its trigrams must be present (`$all` on the
+(user_id, search_grams) multikey index), and the old fuzzy regex only
+confirms those few candidates. A word prefix is a substring, so prefix
+matching comes free. Queries under 3 compacted characters keep the regex.
+
+Ranking (sort=relevance): payee starting with the query, payee containing
+it, a description word starting with it, anything else; then newest first.
+
+The grams are written at ingest (pipeline._transaction_doc, write_planner
+refreshes them on re-ingest), on edits (PUT /transactions/{id},
+re-extract-payees) and by the realtime webhook. Existing rows (--rebuild
+also rewrites rows that already have grams, e.g. ones indexed with an older
+gram set):
+
+    python -m app.services.search_index [--batch 1000] [--rebuild]
+"""
+import re
+import asyncio
+import logging
+import argparse
+
+logger = logging.getLogger(__name__)
+
+GRAM = 3
+SEARCH_FIELDS = ("description", "payee", "bank")
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def compact(text: str | None) -> str:
+    return _NON_ALNUM.sub("", (text or "").lower())
+
+
+def search_grams(description: str | None, payee: str | None, bank: str | None = None) -> list[str]:
+    """
+    Distinct trigrams of each field's compacted text (never across fields).
+    Whole fields are indexed: a term near the end of a long narration must
+    still pass the $all prefilter.
+    """
+    grams = set()
+    for text in (description, payee, bank):
+        c = compact(text)
+        grams.update(c[i:i + GRAM] for i in range(len(c) - GRAM + 1))
+    return sorted(grams)
+
+
+def fuzzy_pattern(search: str) -> str:
+    """The original search regex: whitespace allowed between any two characters."""
+    return r"\s*".join(re.escape(char) for char in search if not char.isspace())
+
+
+def search_filter(search: str) -> dict:
+    """
+    Filter for the text part of a search (description / payee / bank).
+    Rows not backfilled yet (no search_grams) skip the gram prefilter but
+    still have to match the regex, so nothing goes missing — and nothing
+    extra turns up — before `python -m app.services.search_index` has run.
+    """
+    pattern = fuzzy_pattern(search)
+    regexes = {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in SEARCH_FIELDS]}
+    c = compact(search)
+    if len(c) < GRAM:
+        return regexes
+    grams = sorted({c[i:i + GRAM] for i in range(len(c) - GRAM + 1)})
+    return {"$or": [
+        {"$and": [{"search_grams": {"$all": grams}}, regexes]},
+        {"$and": [{"search_grams": None}, regexes]},
+    ]}
+
+
+def relevance_stage(search: str) -> dict:
+    """$addFields stage scoring each matched row (higher = better)."""
+    pattern = fuzzy_pattern(search)
+
+    def matches(field: str, regex: str) -> dict:
+        return {"$regexMatch": {"input": {"$ifNull": [f"${field}", ""]}, "regex": regex, "options": "i"}}
+
+    return {"$addFields": {"_score": {"$switch": {
+        "branches": [
+            {"case": matches("payee", f"^{pattern}"), "then": 4},
+            {"case": matches("payee", pattern), "then": 3},
+            {"case": matches("description", rf"(^|[^a-z0-9]){pattern}"), "then": 2},
+        ],
+        "default": 1,
+    }}}}
+
+
+async def backfill(batch: int = 1000, rebuild: bool = False) -> int:
+    """Write search_grams on every transaction that has none (all of them with `rebuild`); returns the number updated."""
+    from pymongo import UpdateOne
+    from app.models.transaction import Transaction
+
+    collection = Transaction.get_pymongo_collection()
+    cursor = collection.find({} if rebuild else {"search_grams": None}, {"description": 1, "payee": 1, "bank": 1})
+    ops, updated = [], 0
+    async for doc in cursor:
+        grams = search_grams(doc.get("description"), doc.get("payee"), doc.get("bank"))
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_grams": grams}}))
+        if len(ops) >= batch:
+            await collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+            logger.info(f"🔎 search_grams backfilled on {updated} transactions")
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Backfill transaction search_grams")
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--rebuild", action="store_true", help="re-index rows that already have search_grams")
+    args = ap.parse_args()
+
+    async def _main():
+        from app.db.session import init_db
+        await init_db()
+        logger.info(f"✅ {await backfill(args.batch, args.rebuild)} transactions indexed for search")
+
+    asyncio.run(_main())
@@ -0,0 +1,156 @@
+"""
+Statement fingerprints — skip work on re-uploads.
+
+  - identical file (raw or unlocked sha256 already ingested for the account)
+    → the job completes without parsing
+  - overlapping statement (e.g. a quarter covering an ingested month)
+    → pages whose hash was seen before are not parsed or written, provided
+      every row of the statement they were seen in is still stored
+
+A page hash covers its content streams and, resolved through /Resources,
+every XObject (image bytes, form content) and font (embedded font file,
+ToUnicode map) it draws with. A scanned page is just "q … /Im0 Do Q", so
+the content stream alone is the same on every scanned page; its image is
+what tells pages apart. Hashing reads the already-open pdfplumber document
+(StatementSource.pdf), so it costs no second open of the file.
+"""
+import hashlib
+import logging
+
+from pdfminer.pdftypes import PDFStream, resolve1
+
+from app.models.statement_fingerprint import StatementFingerprint
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _name(value) -> str:
+    value = resolve1(value)
+    return getattr(value, "name", str(value))
+
+
+def _stream_bytes(stream: PDFStream) -> bytes:
+    # Images / font files: the stored (still encoded) bytes; content streams are decoded
+    raw = stream.get_rawdata()
+    return raw if raw is not None else stream.get_data()
+
+
+class _PageHasher:
+    """Hashes pages of one document; shared fonts / images are digested once."""
+
+    def __init__(self):
+        self._objects: dict[int, bytes] = {}
+
+    def _object(self, obj, depth: int = 0) -> bytes:
+        """Digest of a font or XObject (and what it references), cached by object id."""
+        objid = getattr(obj, "objid", None)
+        obj = resolve1(obj)
+        if objid is None:
+            objid = getattr(obj, "objid", None)
+        if objid is not None and objid in self._objects:
+            return self._objects[objid]
+        digest = hashlib.sha256()
+        attrs = obj.attrs if isinstance(obj, PDFStream) else obj if isinstance(obj, dict) else {}
+        if isinstance(obj, PDFStream):
+            digest.update(_stream_bytes(obj))
+        for key in ("Subtype", "BaseFont", "Encoding", "Width", "Height"):
+            if key in attrs:
+                digest.update(f"{key}={_name(attrs[key])}".encode())
+        if depth < 8:
+            for key in ("ToUnicode", "FontDescriptor", "FontFile", "FontFile2", "FontFile3"):
+                if key in attrs:
+                    digest.update(self._object(attrs[key], depth + 1))
+            for descendant in resolve1(attrs.get("DescendantFonts")) or []:
+                digest.update(self._object(descendant, depth + 1))
+            if "Resources" in attrs:  # form XObject / Type3 font
+                digest.update(self._resources(attrs["Resources"], depth + 1))
+        result = digest.digest()
+        if objid is not None:
+            self._objects[objid] = result
+        return result
+
+    def _resources(self, resources, depth: int = 0) -> bytes:
+        digest = hashlib.sha256()
+        resources = resolve1(resources) or {}
+        for kind in ("XObject", "Font"):
+            entries = resolve1(resources.get(kind)) or {}
+            for name in sorted(entries):
+                digest.update(f"/{kind}/{name}".encode())
+                digest.update(self._object(entries[name], depth))
+        return digest.digest()
+
+    def page(self, page_obj) -> str:
+        digest = hashlib.sha256()
+        for stream in page_obj.contents or []:
+            stream = resolve1(stream)
+            if isinstance(stream, PDFStream):
+                digest.update(stream.get_data())
+        digest.update(self._resources(page_obj.resources))
+        return digest.hexdigest()
+
+
+def page_hashes(pdf) -> list[str]:
+    """sha256 of each page of an open pdfplumber document: content streams plus resolved resources."""
+    hasher = _PageHasher()
+    return [hasher.page(page.page_obj) for page in pdf.pages]
+
+
+async def find_duplicate(user_id: str, account_id: str, *shas: str | None) -> StatementFingerprint | None:
+    shas = [s for s in shas if s]
+    if not shas:
+        return None
+    return await StatementFingerprint.find_one({
+        "user_id": user_id,
+        "account_id": account_id,
+        "$or": [{"raw_sha256": {"$in": shas}}, {"unlocked_sha256": {"$in": shas}}],
+    })
+
+
+async def _rows_still_stored(user_id: str, txn_hashes: list[str]) -> bool:
+    """True when every transaction an earlier statement wrote is still in the ledger."""
+    if not txn_hashes:
+        return True
+    stored = await Transaction.get_pymongo_collection().count_documents(
+        {"user_id": user_id, "hash": {"$in": txn_hashes}})
+    return stored >= len(txn_hashes)
+
+
+async def known_page_hashes(user_id: str, account_id: str, hashes: list[str]) -> dict[str, int]:
+    """
+    {page hash: rows it produced} for the `hashes` already ingested for this
+    account. Statements some of whose rows have since been deleted are left
+    out, so their pages are parsed (and the rows written) again.
+    """
+    cursor = StatementFingerprint.get_pymongo_collection().find(
+        {"user_id": user_id, "account_id": account_id, "page_hashes": {"$in": hashes}},
+        {"page_hashes": 1, "page_rows": 1, "txn_hashes": 1},
+    )
+    wanted = set(hashes)
+    known = {}
+    async for doc in cursor:
+        if not await _rows_still_stored(user_id, doc.get("txn_hashes") or []):
+            logger.info(f"♻️ Statement {doc['_id']} has rows missing from the ledger; not skipping its pages")
+            continue
+        rows = doc.get("page_rows") or []
+        for n, h in enumerate(doc.get("page_hashes", [])):
+            if h in wanted:
+                known[h] = max(known.get(h, 0), rows[n] if n < len(rows) else 0)
+    return known
+
+
+async def record_fingerprint(**fields) -> None:
+    try:
+        await StatementFingerprint(**fields).insert()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record statement fingerprint: {e}")
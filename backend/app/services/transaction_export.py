@@ -0,0 +1,181 @@
+"""
+Streaming transaction export — CSV (optionally gzipped), XLSX and Parquet.
+
+/transactions/export used to load the whole filtered history as Beanie
+models, render one CSV string and only then start the response. Here the
+rows come from a projected cursor in EXPORT_BATCH_ROWS batches, so memory
+stays flat whatever the history size:
+
+  csv      streamed: one CSV chunk per batch, sent before the next batch is
+           read; gzip=True runs it through one streaming gzip member (a
+           plain .csv.gz)
+  xlsx     not streamed while rows are read: an openpyxl write-only workbook
+           spools them to a temp file, and the finished file is sent from
+           disk in EXPORT_CHUNK_BYTES chunks — the first byte arrives once
+           the whole workbook is written
+  parquet  streamed: one row group per batch (typed date / amount columns);
+           needs pyarrow
+
+The writers take any async iterator of document batches, so
+benchmarks/bench_export.py drives them without Mongo.
+"""
+import io
+import os
+import csv
+import zlib
+import asyncio
+import tempfile
+from typing import AsyncIterator
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+EXPORT_CHUNK_BYTES = 256 * 1024
+
+EXPORT_FORMATS = {
+    # format → (file extension, media type)
+    "csv": ("csv", "text/csv"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+EXPORT_HEADER = ["Date", "Bank", "Description", "Payee", "Category", "Debit", "Credit", "Balance"]
+EXPORT_PROJECTION = {"_id": 0, "date": 1, "bank": 1, "description": 1, "payee": 1, "category": 1,
+                     "debit": 1, "credit": 1, "balance": 1}
+
+
+def _csv_row(doc: dict) -> list:
+    date, debit, credit = doc.get("date"), doc.get("debit"), doc.get("credit")
+    return [
+        date.strftime("%Y-%m-%d") if date else "N/A",
+        doc.get("bank"),
+        doc.get("description"),
+        doc.get("payee"),
+        doc.get("category", "Personal"),
+        f"{debit:.2f}" if debit else "0.00",
+        f"{credit:.2f}" if credit else "0.00",
+        f"{doc.get('balance') or 0.0:.2f}",
+    ]
+
+
+async def cursor_batches(collection, filter_dict: dict, batch_rows: int = EXPORT_BATCH_ROWS) -> AsyncIterator[list[dict]]:
+    """Projected documents for `filter_dict`, newest first, `batch_rows` at a time."""
+    cursor = collection.find(filter_dict, EXPORT_PROJECTION).sort([("date", -1), ("_id", -1)]).batch_size(batch_rows)
+    while batch := await cursor.to_list(batch_rows):
+        yield batch
+
+
+async def csv_chunks(batches: AsyncIterator[list[dict]], gzip: bool = False) -> AsyncIterator[bytes]:
+    packer = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None  # wbits 31 → gzip container
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return packer.compress(data) if packer else data
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_HEADER)
+    async for batch in batches:
+        writer.writerows(_csv_row(doc) for doc in batch)
+        chunk = encode(out.getvalue())
+        out.seek(0)
+        out.truncate()
+        if chunk:
+            yield chunk
+    tail = encode(out.getvalue())
+    if packer:
+        tail += packer.flush()
+    if tail:
+        yield tail
+
+
+def _xlsx_text(value):
+    # Control characters (e.g. from SMS narrations) make openpyxl raise mid-response
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    return ILLEGAL_CHARACTERS_RE.sub("", value) if isinstance(value, str) else value
+
+
+async def xlsx_chunks(batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Transactions")
+    ws.append(EXPORT_HEADER)
+
+    def append(batch: list[dict]) -> None:
+        for doc in batch:
+            ws.append([doc.get("date"), _xlsx_text(doc.get("bank")), _xlsx_text(doc.get("description")),
+                       _xlsx_text(doc.get("payee")), _xlsx_text(doc.get("category", "Personal")),
+                       doc.get("debit") or 0.0, doc.get("credit") or 0.0, doc.get("balance") or 0.0])
+
+    with tempfile.TemporaryFile() as tmp:
+        async for batch in batches:
+            await asyncio.to_thread(append, batch)
+        await asyncio.to_thread(wb.save, tmp)
+        tmp.seek(0)
+        while chunk := await asyncio.to_thread(tmp.read, EXPORT_CHUNK_BYTES):
+            yield chunk
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose bytes are taken after every Parquet row group."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buf += data
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def take(self) -> bytes:
+        data, self._buf = bytes(self._buf), bytearray()
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("date", pa.timestamp("ms")), ("bank", pa.string()), ("description", pa.string()),
+        ("payee", pa.string()), ("category", pa.string()),
+        ("debit", pa.float64()), ("credit", pa.float64()), ("balance", pa.float64()),
+    ])
+
+
+async def parquet_chunks(batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    def write(batch: list[dict]) -> None:
+        columns = {name: [doc.get(name) for doc in batch] for name in schema.names}
+        columns["category"] = [c or "Personal" for c in columns["category"]]
+        for name in ("debit", "credit", "balance"):
+            columns[name] = [v or 0.0 for v in columns[name]]
+        writer.write_table(pa.table(columns, schema=schema))
+
+    try:
+        async for batch in batches:
+            await asyncio.to_thread(write, batch)
+            if chunk := sink.take():
+                yield chunk
+    finally:
+        writer.close()
+    if tail := sink.take():
+        yield tail
+
+
+def export_stream(batches: AsyncIterator[list[dict]], fmt: str, gzip: bool = False) -> AsyncIterator[bytes]:
+    if fmt == "xlsx":
+        return xlsx_chunks(batches)
+    if fmt == "parquet":
+        return parquet_chunks(batches)
+    return csv_chunks(batches, gzip=gzip)
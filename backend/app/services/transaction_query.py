@@ -0,0 +1,114 @@
+"""
+Transaction list executor — page, total and summary with the filter compiled once.
+
+GET /transactions used to run three operations over the same filter (count,
+a $group for the debit/credit sums, then the paged find), so the regex-heavy
+search filter was evaluated three times. Here the filter is compiled once
+(Beanie → dict by the caller) and:
+
+  page mode    one pipeline  $match → $sort (date, _id) → $facet {rows, total, sums}
+               with $skip / $limit in the rows branch. A search sorted by
+               relevance adds its `rank` $addFields stage after $match and
+               sorts on _score first.
+  keyset mode  the rows are an indexed find(filter ∧ seek).sort().limit() —
+               a bounded range scan, so page 500 costs what page 1 does —
+               while a $facet {total, sums} runs alongside.
+
+Rows come back as raw projected documents — no Transaction models, no
+.dict() copies.
+
+Should the aggregation run past TRANSACTIONS_LIST_MAX_MS (a huge history
+with a slow regex), the rows are fetched on their own and the total is
+counted with the same filter under a fresh time budget; if that times out
+too, the total is a lower bound (the rows seen so far, plus one more page
+when there are more). Either way the sums are None and the result is
+flagged `estimated`.
+"""
+import os
+import asyncio
+
+from pymongo.errors import ExecutionTimeout
+
+TRANSACTIONS_LIST_MAX_MS = int(os.getenv("TRANSACTIONS_LIST_MAX_MS", "2000"))
+
+# Fields returned to the client, and the model defaults for ones a document lacks
+LIST_FIELDS = ("user_id", "account_id", "hash", "txn_date", "date", "description", "payee", "category",
+               "debit", "credit", "balance", "bank", "type", "updated_at")
+_DEFAULTS = {"category": "Personal", "debit": 0.0, "credit": 0.0, "balance": 0.0}
+_FIELDS = {field: 1 for field in LIST_FIELDS}
+_PROJECTION = {"$project": _FIELDS}
+_TOTAL = [{"$count": "n"}]
+_SUMS = [{"$group": {"_id": None, "debit": {"$sum": "$debit"}, "credit": {"$sum": "$credit"}}}]
+
+
+def format_row(doc: dict) -> dict:
+    """Raw document → the list item the frontend expects."""
+    row = {**_DEFAULTS, **doc}
+    row["_id"] = row["id"] = str(doc["_id"])
+    if row.get("date"):
+        row["date"] = row["date"].strftime("%d %b %Y")
+    return row
+
+
+def _summary(result: dict, rows: list[dict]) -> dict:
+    sums = result["sums"][0] if result["sums"] else {"debit": 0, "credit": 0}
+    return {
+        "rows": rows,
+        "total": result["total"][0]["n"] if result["total"] else 0,
+        "total_debit": sums["debit"],
+        "total_credit": sums["credit"],
+        "estimated": False,
+    }
+
+
+async def _estimated(collection, filter_dict: dict, rows: list[dict], seen_before: int, limit: int) -> dict:
+    """Timeout fallback: count with the same filter, else a lower bound from the rows read."""
+    try:
+        total = await collection.count_documents(filter_dict, maxTimeMS=TRANSACTIONS_LIST_MAX_MS)
+    except ExecutionTimeout:
+        total = seen_before + len(rows) + (limit if len(rows) >= limit else 0)
+    return {"rows": rows, "total": total, "total_debit": None, "total_credit": None, "estimated": True}
+
+
+async def run_list_query(collection, filter_dict: dict, sort_direction: int, *, limit: int,
+                         skip: int = 0, seek: dict | None = None, scan_direction: int | None = None,
+                         keyset: bool = False, rank: dict | None = None) -> dict:
+    """
+    Rows, total and debit/credit sums for `filter_dict`.
+
+    Page mode: rows = $skip `skip` / $limit `limit` of the (date, _id) order.
+    Keyset mode (keyset=True): rows = the first `limit` matching `seek`
+    (none on the first page), read in `scan_direction` (defaults to
+    `sort_direction`; "prev" pages read backwards).
+    Returns {"rows", "total", "total_debit", "total_credit", "estimated"}.
+    """
+    if keyset:
+        return await _run_keyset(collection, filter_dict, seek, scan_direction or sort_direction, limit)
+
+    head = [{"$match": filter_dict}, {"$sort": {"date": sort_direction, "_id": sort_direction}}]
+    if rank is not None:
+        head = [head[0], rank, {"$sort": {"_score": -1, "date": sort_direction, "_id": sort_direction}}]
+    rows_branch = [{"$skip": skip}, {"$limit": limit}, _PROJECTION]
+    pipeline = head + [{"$facet": {"rows": rows_branch, "total": _TOTAL, "sums": _SUMS}}]
+    try:
+        result = (await collection.aggregate(pipeline, maxTimeMS=TRANSACTIONS_LIST_MAX_MS).to_list(1))[0]
+    except ExecutionTimeout:
+        rows = await collection.aggregate(head + rows_branch).to_list(None)
+        return await _estimated(collection, filter_dict, rows, skip, limit)
+    return _summary(result, result["rows"])
+
+
+async def _run_keyset(collection, filter_dict: dict, seek: dict | None, scan_direction: int, limit: int) -> dict:
+    rows_filter = {"$and": [filter_dict, seek]} if seek else filter_dict
+    rows_cursor = collection.find(rows_filter, _FIELDS) \
+        .sort([("date", scan_direction), ("_id", scan_direction)]).limit(limit)
+    summary = collection.aggregate([{"$match": filter_dict}, {"$facet": {"total": _TOTAL, "sums": _SUMS}}],
+                                   maxTimeMS=TRANSACTIONS_LIST_MAX_MS)
+    rows, summary = await asyncio.gather(rows_cursor.to_list(limit), summary.to_list(1), return_exceptions=True)
+    if isinstance(rows, BaseException):
+        raise rows
+    if isinstance(summary, ExecutionTimeout):
+        return await _estimated(collection, filter_dict, rows, 0, limit)
+    if isinstance(summary, BaseException):
+        raise summary
+    return _summary(summary[0], rows)
@@ -0,0 +1,77 @@
+"""
+Write planner — replaces blind per-row upserts during ingestion.
+
+For one page of normalized rows it runs a single `$in` lookup on the row
+hashes, then:
+  - rows whose hash is new          → insert_many(ordered=False)
+  - rows whose stored fields differ → UpdateOne with only the changed fields
+  - identical rows                  → no write at all
+
+so re-ingesting a statement touches (almost) nothing instead of rewriting
+every document and its index entries.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Fields a re-ingest may legitimately change on an existing transaction
+# (search_grams, bank_key and source_kind are derived, and fill in rows that predate them)
+MUTABLE_FIELDS = ("description", "payee", "category", "debit", "credit", "balance", "bank", "type", "search_grams",
+                  "bank_key", "source_kind")
+
+_DUPLICATE_KEY = 11000
+
+
+@dataclass
+class WriteResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+async def write_transactions(collection, user_id: str, docs: list[dict]) -> WriteResult:
+    """Insert / minimally update `docs` (full transaction documents keyed by `hash`)."""
+    result = WriteResult()
+    if not docs:
+        return result
+
+    existing = {}
+    projection = {"hash": 1, **{f: 1 for f in MUTABLE_FIELDS}}
+    async for doc in collection.find({"user_id": user_id, "hash": {"$in": [d["hash"] for d in docs]}}, projection):
+        existing[doc["hash"]] = doc
+
+    inserts, updates = [], []
+    now = datetime.utcnow()
+    for doc in docs:
+        current = existing.get(doc["hash"])
+        if current is None:
+            inserts.append({**doc, "updated_at": now})
+            continue
+        changed = {f: doc.get(f) for f in MUTABLE_FIELDS if current.get(f) != doc.get(f)}
+        if changed:
+            changed["updated_at"] = now
+            updates.append(UpdateOne({"_id": current["_id"]}, {"$set": changed}))
+        else:
+            result.unchanged += 1
+
+    if inserts:
+        try:
+            await collection.insert_many(inserts, ordered=False)
+            result.inserted = len(inserts)
+        except BulkWriteError as e:
+            # Another job inserted some of these hashes since the lookup — they already exist
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != _DUPLICATE_KEY for err in errors):
+                raise
+            result.inserted = e.details.get("nInserted", 0)
+            result.unchanged += len(errors)
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+        result.updated = len(updates)
+
+    return result
@@ -1,89 +1,175 @@
 import re
+from functools import lru_cache
+from app.utils.memo import memoized
 
-def classify_category(payee: str) -> str:
-    if not payee:
-        return "Personal"
-    p = payee.upper()
-
-    categories = {
-        "Food & Dining": [
-            "ZOMATO", "SWIGGY", "BLINKIT", "INSTAMART", "ZEPTO", "DUNZO",
-            "RESTAURANT", "HOTEL", "CAFE", "BAKES", "BAKERY", "TEA", "COFFEE",
-            "PIZZA", "BURGER", "KFC", "MCDONALDS", "DOMINOS", "SUBWAY",
-            "BIRYANI", "HALWA", "MEAT", "CHICKEN", "DINER", "DHABA",
-        ],
-        "Shopping": [
-            "AMAZON", "FLIPKART", "MYNTRA", "MEESHO", "NYKAA", "AJIO",
-            "SNAPDEAL", "SHOPSY", "TATACLIQ", "RELIANCE DIGITAL",
-            "RETAIL", "SUPERMARKET", "GROCERY", "MALL", "STORE", "MART",
-            "DMART", "BIGBASKET", "GROFERS", "BLINKIT", "JIOMART",
-            "MORE RETAIL", "LULU", "LIFESTYLE", "PANTALOONS", "WESTSIDE",
-        ],
-        "Bills & Utilities": [
-            "KSEB", "BESCOM", "MSEDCL", "TNEB", "BSES", "TPDDL", "CESC",
-            "ELECTRIC", "ELECTRICITY", "WATER", "GAS",
-            "BROADBAND", "WIFI", "INTERNET", "RECHARGE",
-            "AIRTEL", "JIO", "VI ", "BSNL", "VODAFONE",
-            "TATA SKY", "DISH TV", "D2H", "SITICABLE",
-            "KERALAVISION", "ASIANET", "SUN DIRECT",
-            "POSTPAID", "PREPAID",
-        ],
-        "Entertainment/Gaming": [
-            "NETFLIX", "HOTSTAR", "PRIME VIDEO", "AMAZON PRIME",
-            "SPOTIFY", "APPLE MUSIC", "GAANA", "WYNK",
-            "YOUTUBE", "SONY LIV", "VOOT", "ZEE5", "MXPLAYER",
-            "STEAM", "PLAYSTATION", "XBOX", "GAMES",
-            "DREAM11", "MY11CIRCLE", "MPL", "WINZO", "FANTASYPOWER",
-            "PAYTM GAMES", "LUDO", "RUMMY",
-        ],
-        "Transport/Fuel": [
-            "PETROL", "DIESEL", "FUEL",
-            "HP ", "HPCL", "INDIAN OIL", "IOCL", "BHARAT PETROLEUM", "BPCL",
-            "SHELL", "ESSAR",
-            "UBER", "OLA", "RAPIDO", "BOUNCE",
-            "IRCTC", "RAILWAYS", "RAILWAY", "METRO",
-            "REDBUS", "MAKEMYTRIP", "YATRA", "IXIGO", "CLEARTRIP", "GOIBIBO",
-            "AIRPORT", "AIR", "INDIGO", "SPICEJET", "AIRINDIA", "VISTARA",
-        ],
-        "Health & Fitness": [
-            "HOSPITAL", "CLINIC", "HEALTH", "MEDICAL",
-            "APOLLO", "FORTIS", "MANIPAL", "AIIMS",
-            "MEDPLUS", "NETMEDS", "PHARMEASY", "1MG", "PRACTO",
-            "PHARMACY", "CHEMIST", "LAB", "DIAGNOSTICS",
-            "GYM", "FITNESS", "WORKOUT", "CROSSFIT", "YOGA", "CULT.FIT",
-            "PROTEIN", "SUPPLEMENT",
-        ],
-        "Automotive": [
-            "REPAIR", "SERVICE", "GARAGE", "WORKSHOP",
-            "MOTORS", "HONDA", "SUZUKI", "TYRE", "TYRES",
-            "WASH", "SPARE", "PARTS", "ACCESSORIES",
-            "MARUTI", "TATA MOTORS", "HYUNDAI",
-        ],
-        "Insurance": [
-            "LIC", "IRDAI", "INSURANCE", "POLICY",
-            "STAR HEALTH", "BAJAJ ALLIANZ", "HDFC LIFE",
-            "ICICI PRUDENTIAL", "SBI LIFE", "MAX LIFE",
-            "GENERAL INSURANCE", "TERM PLAN",
-        ],
-        "EMI & Loans": [
-            "EMI", "LOAN", "LENDING", "CREDILA", "BAJAJ FINANCE",
-            "HOME LOAN", "CAR LOAN", "PERSONAL LOAN",
-            "HDFC CREDILA", "SBI LOAN", "ICICI LOAN",
-            "NACH", "ACH", "MANDATE", "REPAYMENT", "INSTALMENT",
-        ],
-        "Investments": [
-            "MUTUAL FUND", "ZERODHA", "GROWW", "UPSTOX", "NUVAMA",
-            "NSE", "BSE", "SEBI", "DEMAT", "STOCKS", "SIP",
-            "SMALLCASE", "FISDOM", "PAYTM MONEY", "ANGEL",
-            "RD", "FD", "FIXED DEPOSIT", "RECURRING",
-        ],
-    }
-
-    for category, keywords in categories.items():
-        if any(key.upper() in p for key in keywords):
-            return category
-
-    return "Personal"
+DEFAULT_CATEGORY = "Personal"
+
+# Checked in order: the first category with a keyword anywhere in the payee wins.
+# Keywords are plain substrings of the upper-cased payee (a trailing space, as
+# in "VI " / "HP ", is the only word-boundary marker).
+CATEGORY_KEYWORDS = {
+    "Food & Dining": [
+        "ZOMATO", "SWIGGY", "BLINKIT", "INSTAMART", "ZEPTO", "DUNZO",
+        "RESTAURANT", "HOTEL", "CAFE", "BAKES", "BAKERY", "TEA", "COFFEE",
+        "PIZZA", "BURGER", "KFC", "MCDONALDS", "DOMINOS", "SUBWAY",
+        "BIRYANI", "HALWA", "MEAT", "CHICKEN", "DINER", "DHABA",
+    ],
+    "Shopping": [
+        "AMAZON", "FLIPKART", "MYNTRA", "MEESHO", "NYKAA", "AJIO",
+        "SNAPDEAL", "SHOPSY", "TATACLIQ", "RELIANCE DIGITAL",
+        "RETAIL", "SUPERMARKET", "GROCERY", "MALL", "STORE", "MART",
+        "DMART", "BIGBASKET", "GROFERS", "BLINKIT", "JIOMART",
+        "MORE RETAIL", "LULU", "LIFESTYLE", "PANTALOONS", "WESTSIDE",
+    ],
+    "Bills & Utilities": [
+        "KSEB", "BESCOM", "MSEDCL", "TNEB", "BSES", "TPDDL", "CESC",
+        "ELECTRIC", "ELECTRICITY", "WATER", "GAS",
+        "BROADBAND", "WIFI", "INTERNET", "RECHARGE",
+        "AIRTEL", "JIO", "VI ", "BSNL", "VODAFONE",
+        "TATA SKY", "DISH TV", "D2H", "SITICABLE",
+        "KERALAVISION", "ASIANET", "SUN DIRECT",
+        "POSTPAID", "PREPAID",
+    ],
+    "Entertainment/Gaming": [
+        "NETFLIX", "HOTSTAR", "PRIME VIDEO", "AMAZON PRIME",
+        "SPOTIFY", "APPLE MUSIC", "GAANA", "WYNK",
+        "YOUTUBE", "SONY LIV", "VOOT", "ZEE5", "MXPLAYER",
+        "STEAM", "PLAYSTATION", "XBOX", "GAMES",
+        "DREAM11", "MY11CIRCLE", "MPL", "WINZO", "FANTASYPOWER",
+        "PAYTM GAMES", "LUDO", "RUMMY",
+    ],
+    "Transport/Fuel": [
+        "PETROL", "DIESEL", "FUEL",
+        "HP ", "HPCL", "INDIAN OIL", "IOCL", "BHARAT PETROLEUM", "BPCL",
+        "SHELL", "ESSAR",
+        "UBER", "OLA", "RAPIDO", "BOUNCE",
+        "IRCTC", "RAILWAYS", "RAILWAY", "METRO",
+        "REDBUS", "MAKEMYTRIP", "YATRA", "IXIGO", "CLEARTRIP", "GOIBIBO",
+        "AIRPORT", "AIR", "INDIGO", "SPICEJET", "AIRINDIA", "VISTARA",
+    ],
+    "Health & Fitness": [
+        "HOSPITAL", "CLINIC", "HEALTH", "MEDICAL",
+        "APOLLO", "FORTIS", "MANIPAL", "AIIMS",
+        "MEDPLUS", "NETMEDS", "PHARMEASY", "1MG", "PRACTO",
+        "PHARMACY", "CHEMIST", "LAB", "DIAGNOSTICS",
+        "GYM", "FITNESS", "WORKOUT", "CROSSFIT", "YOGA", "CULT.FIT",
+        "PROTEIN", "SUPPLEMENT",
+    ],
+    "Automotive": [
+        "REPAIR", "SERVICE", "GARAGE", "WORKSHOP",
+        "MOTORS", "HONDA", "SUZUKI", "TYRE", "TYRES",
+        "WASH", "SPARE", "PARTS", "ACCESSORIES",
+        "MARUTI", "TATA MOTORS", "HYUNDAI",
+    ],
+    "Insurance": [
+        "LIC", "IRDAI", "INSURANCE", "POLICY",
+        "STAR HEALTH", "BAJAJ ALLIANZ", "HDFC LIFE",
+        "ICICI PRUDENTIAL", "SBI LIFE", "MAX LIFE",
+        "GENERAL INSURANCE", "TERM PLAN",
+    ],
+    "EMI & Loans": [
+        "EMI", "LOAN", "LENDING", "CREDILA", "BAJAJ FINANCE",
+        "HOME LOAN", "CAR LOAN", "PERSONAL LOAN",
+        "HDFC CREDILA", "SBI LOAN", "ICICI LOAN",
+        "NACH", "ACH", "MANDATE", "REPAYMENT", "INSTALMENT",
+    ],
+    "Investments": [
+        "MUTUAL FUND", "ZERODHA", "GROWW", "UPSTOX", "NUVAMA",
+        "NSE", "BSE", "SEBI", "DEMAT", "STOCKS", "SIP",
+        "SMALLCASE", "FISDOM", "PAYTM MONEY", "ANGEL",
+        "RD", "FD", "FIXED DEPOSIT", "RECURRING",
+    ],
+}
+
+
+class KeywordClassifier:
+    """
+    Aho-Corasick automaton over a {category: [keywords]} table, built once.
+
+    classify() scans the payee a single time and returns the highest-priority
+    category (earliest in the table) with any keyword occurring in it — the
+    same answer as checking every keyword with `in`, category by category.
+    """
+
+    def __init__(self, table: dict[str, list[str]]):
+        self.categories = list(table)
+        goto: list[dict[str, int]] = [{}]
+        best = [len(self.categories)]  # lowest category index ending at each state
+
+        for priority, keywords in enumerate(table.values()):
+            for keyword in keywords:
+                state = 0
+                for ch in keyword.upper():
+                    if ch not in goto[state]:
+                        goto.append({})
+                        best.append(len(self.categories))
+                        goto[state][ch] = len(goto) - 1
+                    state = goto[state][ch]
+                best[state] = min(best[state], priority)
+
+        # BFS: failure links, folded into a full transition table so the scan
+        # never follows fail pointers
+        fail = [0] * len(goto)
+        self._delta: list[dict[str, int]] = [dict(goto[0])]
+        self._delta.extend({} for _ in range(len(goto) - 1))
+        queue = list(goto[0].values())
+        for state in queue:
+            fail[state] = 0
+        for state in queue:
+            best[state] = min(best[state], best[fail[state]])
+            self._delta[state] = {**self._delta[fail[state]], **goto[state]}
+            for ch, nxt in goto[state].items():
+                if state != 0:
+                    fail[nxt] = self._delta[fail[state]].get(ch, 0)
+                queue.append(nxt)
+        self._best = best
+
+    def classify(self, payee: str, default: str = DEFAULT_CATEGORY) -> str:
+        if not payee:
+            return default
+        delta, best = self._delta, self._best
+        none = len(self.categories)
+        found = none
+        state = 0
+        for ch in payee.upper():
+            state = delta[state].get(ch, 0)
+            if best[state] < found:
+                found = best[state]
+                if found == 0:
+                    break
+        return self.categories[found] if found < none else default
+
+
+_DEFAULT_CLASSIFIER = KeywordClassifier(CATEGORY_KEYWORDS)
+
+
+@lru_cache(maxsize=64)
+def _classifier_with_rules(rules: tuple) -> KeywordClassifier:
+    # User rules come first, so they win over the built-in table
+    table: dict[str, list[str]] = {}
+    for category, keywords in rules:
+        table.setdefault(category, []).extend(keywords)
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        table.setdefault(category, []).extend(keywords)
+    return KeywordClassifier(table)
+
+
+def get_classifier(user_rules: dict[str, list[str]] | None = None) -> KeywordClassifier:
+    """The compiled classifier for a set of user rules ({category: [keywords]}); cached per rule set."""
+    if not user_rules:
+        return _DEFAULT_CLASSIFIER
+    return _classifier_with_rules(tuple((c, tuple(k)) for c, k in user_rules.items()))
+
+
+@memoized("category", mask_digits=False)  # keywords like 1MG / ZEE5 contain digits
+def _classify_default(payee: str) -> str:
+    return _DEFAULT_CLASSIFIER.classify(payee)
+
+
+def classify_category(payee: str, user_rules: dict[str, list[str]] | None = None) -> str:
+    if not user_rules:
+        return _classify_default(payee)
+    return get_classifier(user_rules).classify(payee)
 
 
 def extract_clean_name(text):
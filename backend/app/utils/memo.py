@@ -0,0 +1,178 @@
+"""
+Memoization for the narration → payee / grouping name / category helpers.
+
+The same UPI narrations repeat thousands of times per user with only the
+reference numbers changing, so results are cached in a bounded LRU keyed on
+the narration with every run of MEMO_MASK_MIN_DIGITS or more digits masked
+to "9"s of the same length. Shorter runs are kept as they are: the helpers
+match digit-bearing literals such as the IFSC prefixes HDFC0 / UTIB0 / ICIC0,
+so "NEFT HDFC0 ACME CORP" and "NEFT HDFC5 ACME CORP" must not share a key.
+Every other pattern they use sees digits only by class and run length
+(\\d{6,}, \\b\\d{1,5}\\b, isdigit, ...), which a same-length mask preserves.
+An answer that itself contains digits came from that exact narration and is
+computed but not cached.
+
+Each process has its own LRU (lock-guarded, so threads share it safely).
+With PAYEE_MEMO_PERSIST=1, new entries are written to the `payee_memo`
+collection after each ingestion job and loaded on startup, so API and
+worker processes warm-start from each other's work.
+
+Configuration (env):
+  PAYEE_MEMO_MAX_ENTRIES  LRU size per kind
+  PAYEE_MEMO_PERSIST      1 → load/save through Mongo
+  PAYEE_MEMO_WARM_ENTRIES entries loaded per process on startup
+"""
+import os
+import re
+import logging
+import threading
+from functools import wraps
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PAYEE_MEMO_MAX_ENTRIES = int(os.getenv("PAYEE_MEMO_MAX_ENTRIES", "50000"))
+PAYEE_MEMO_PERSIST = os.getenv("PAYEE_MEMO_PERSIST", "1") == "1"
+PAYEE_MEMO_WARM_ENTRIES = int(os.getenv("PAYEE_MEMO_WARM_ENTRIES", "20000"))
+
+# Bump when a memoized helper changes behaviour, so persisted answers are ignored
+MEMO_VERSION = "2"
+
+# Digit runs at least this long (reference numbers, account numbers) are masked in keys
+MEMO_MASK_MIN_DIGITS = 4
+_LONG_DIGITS = re.compile(rf"\d{{{MEMO_MASK_MIN_DIGITS},}}")
+_HAS_DIGIT = str.maketrans("", "", "0123456789")
+
+
+class Memo:
+    """Bounded LRU for one helper, with hit/miss counters and a queue of unsaved entries."""
+
+    def __init__(self, kind: str, mask_digits: bool, max_entries: int = PAYEE_MEMO_MAX_ENTRIES):
+        self.kind = kind
+        self.mask_digits = mask_digits
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lru: OrderedDict[str, str] = OrderedDict()
+        self._unsaved: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def key(self, text: str) -> str:
+        return _LONG_DIGITS.sub(lambda m: "9" * len(m.group()), text) if self.mask_digits else text
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._lru.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._lru.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, persist: bool = True) -> None:
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+            if persist and PAYEE_MEMO_PERSIST and len(self._unsaved) < self.max_entries:
+                self._unsaved[key] = value
+
+    def take_unsaved(self) -> dict[str, str]:
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+            return unsaved
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "entries": len(self._lru),
+        }
+
+
+_memos: dict[str, Memo] = {}
+
+
+def memoized(kind: str, mask_digits: bool = True):
+    """Decorator for a str → str helper. Empty input bypasses the cache."""
+    memo = _memos.setdefault(kind, Memo(kind, mask_digits))
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(text):
+            if not text or not isinstance(text, str):
+                return fn(text)
+            key = memo.key(text)
+            value = memo.get(key)
+            if value is None:
+                value = fn(text)
+                # an answer containing digits came from this exact narration
+                if not memo.mask_digits or len(value.translate(_HAS_DIGIT)) == len(value):
+                    memo.put(key, value)
+            return value
+
+        wrapper.memo = memo
+        return wrapper
+
+    return decorator
+
+
+def memo_stats() -> dict:
+    return {kind: memo.stats() for kind, memo in _memos.items()}
+
+
+def _db_key(kind: str, key: str) -> str:
+    return f"{kind}|{MEMO_VERSION}|{key}"
+
+
+async def load_memos(limit: int = PAYEE_MEMO_WARM_ENTRIES) -> int:
+    """Warm the LRUs from Mongo with the most recent entries. Returns how many were loaded."""
+    if not PAYEE_MEMO_PERSIST or limit <= 0:
+        return 0
+    from app.models.payee_memo import PayeeMemoEntry
+
+    loaded = 0
+    try:
+        cursor = PayeeMemoEntry.get_pymongo_collection().find(
+            {"key": {"$regex": f"^[a-z]+\\|{MEMO_VERSION}\\|"}}, {"kind": 1, "key": 1, "value": 1},
+        ).sort("created_at", -1).limit(limit)
+        async for doc in cursor:
+            memo = _memos.get(doc["kind"])
+            if memo is not None:
+                memo.put(doc["key"].split("|", 2)[2], doc["value"], persist=False)
+                loaded += 1
+    except Exception as e:
+        logger.warning(f"⚠️ Payee memo warm-start failed: {e}")
+    logger.info(f"🧠 Payee memo warm-started with {loaded} entries")
+    return loaded
+
+
+async def save_memos() -> int:
+    """Insert entries computed since the last save (existing keys are left alone)."""
+    if not PAYEE_MEMO_PERSIST:
+        return 0
+    from pymongo import UpdateOne
+    from datetime import datetime
+    from app.models.payee_memo import PayeeMemoEntry
+
+    ops = []
+    for kind, memo in _memos.items():
+        for key, value in memo.take_unsaved().items():
+            db_key = _db_key(kind, key)
+            ops.append(UpdateOne(
+                {"key": db_key},
+                {"$setOnInsert": {"key": db_key, "kind": kind, "value": value, "created_at": datetime.utcnow()}},
+                upsert=True,
+            ))
+    if not ops:
+        return 0
+    try:
+        await PayeeMemoEntry.get_pymongo_collection().bulk_write(ops, ordered=False)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not persist payee memo: {e}")
+        return 0
+    return len(ops)
@@ -2,6 +2,7 @@ import re
 import os
 import json
 from datetime import datetime
+from app.utils.memo import memoized
 
 # ---------------------------------------------------------------------------
 # Patterns for noise removal (reference IDs, dates, transaction type words)
@@ -27,6 +28,7 @@ _SEPS = re.compile(r'[/|_\-]+')
 _SHORT_TOKENS = re.compile(r'\b(DR|CR|TO|BY|FROM|AC|A/C|MB|IB)\b', re.IGNORECASE)
 
 
+@memoized("grouping")
 def normalize_description_for_grouping(description: str) -> str:
     """
     Extract the real payee name from bank narrations.
@@ -91,6 +93,7 @@ _BANK_NOISE = re.compile(
 _COMMON_ID_PATTERN = re.compile(r"\b\d{6,}\b")
 _VPA_PATTERN = re.compile(r"([A-Z0-9\.\-_]+)@[A-Z]{3,}")
 
+@memoized("payee")
 def extract_payee_name(description: str) -> str:
     if not description: return "Miscellaneous"
     raw = description.replace("\\", "/").upper().strip()
@@ -146,6 +149,8 @@ def normalize(txn):
     else: return None
 
     def to_float(v):
+        # Parsers already hand over floats — don't round-trip them through str
+        if isinstance(v, (int, float)): return float(v)
         try: return float(str(v).replace(',', '').replace(' ', '').strip())
         except: return 0.0
 
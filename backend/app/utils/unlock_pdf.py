@@ -1,27 +1,52 @@
 import io
+import os
 import pdfplumber
 import pikepdf
 
+# Bytes scanned at each end of the file when looking for the /Encrypt entry.
+# The trailer (or xref stream dict) lives at the end; linearized files repeat it near the start.
+_TRAILER_SCAN_BYTES = 64 * 1024
+_HEAD_SCAN_BYTES = 4 * 1024
 
-def unlock_pdf(file_bytes: bytes, password: str | None):
-    # 🚀 FAST PATH: try opening without password
-    try:
-        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-            # If this works, PDF is NOT encrypted
-            return file_bytes
-    except Exception:
-        # PDF is encrypted → continue
-        pass
 
-    # 🔐 Encrypted PDF but no password
-    if not password:
-        raise ValueError("PDF is password protected")
+def is_encrypted_pdf(source) -> bool:
+    """
+    Cheap encryption check from the trailer — looks for /Encrypt without
+    parsing the object tree. `source` is a file path or raw bytes.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        head = source[:_HEAD_SCAN_BYTES]
+        tail = source[-_TRAILER_SCAN_BYTES:]
+    else:
+        size = os.path.getsize(source)
+        with open(source, "rb") as f:
+            head = f.read(_HEAD_SCAN_BYTES)
+            f.seek(max(0, size - _TRAILER_SCAN_BYTES))
+            tail = f.read()
+    return b"/Encrypt" in head or b"/Encrypt" in tail
+
+
+def unlock_pdf(file_bytes: bytes, password: str | None):
+    # 🚀 FAST PATH: no /Encrypt in the trailer → not encrypted
+    if not is_encrypted_pdf(file_bytes):
+        try:
+            with pdfplumber.open(io.BytesIO(file_bytes)):
+                return file_bytes
+        except Exception:
+            # Encrypt dict hidden in a compressed xref stream → continue
+            pass
 
     # 🔓 Unlock using pikepdf ONLY when required
+    # (empty password still opens owner-password-only PDFs)
     try:
-        with pikepdf.open(io.BytesIO(file_bytes), password=password) as pdf:
+        with pikepdf.open(io.BytesIO(file_bytes), password=password or "") as pdf:
             output = io.BytesIO()
             pdf.save(output)
             return output.getvalue()
+    except pikepdf.PasswordError:
+        # 🔐 Encrypted PDF but no password
+        if not password:
+            raise ValueError("PDF is password protected")
+        raise ValueError("Invalid PDF password")
     except Exception:
         raise ValueError("Invalid PDF password")
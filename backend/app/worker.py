@@ -0,0 +1,52 @@
+"""
+Standalone statement-ingestion worker.
+
+    python -m app.worker [--concurrency N]
+
+Claims queued jobs from `job_statuses` and parses them; scale these
+processes independently of the API replicas. PARSE_WORKERS still sizes the
+per-process parse pool.
+"""
+import signal
+import asyncio
+import logging
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.db.session import init_db
+from app.services.job_queue import StatementWorker, INGEST_CONCURRENCY
+from app.services.parse_executor import shutdown_executor
+from app.utils.memo import load_memos
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+)
+
+
+async def main(concurrency: int):
+    await init_db()
+    await load_memos()
+    worker = StatementWorker(concurrency=concurrency)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C still raises KeyboardInterrupt
+
+    try:
+        await worker.run()
+    finally:
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Statement ingestion worker")
+    parser.add_argument("--concurrency", type=int, default=INGEST_CONCURRENCY,
+                        help="jobs processed at once by this worker process")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
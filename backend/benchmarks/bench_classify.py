@@ -0,0 +1,75 @@
+"""
+classify_category micro-benchmark: legacy per-call keyword scan vs the
+compiled Aho-Corasick classifier, over synthetic UPI/NEFT-style narrations.
+Also checks that both give the same category for every narration.
+
+    python -m benchmarks.bench_classify [-n 1000000] [--seed 7]
+"""
+import json
+import time
+import random
+import argparse
+
+from app.utils.analysis import CATEGORY_KEYWORDS, classify_category
+
+_FILLER = ["RAHUL", "KUMAR", "PAYMENT", "TRANSFER", "OKAXIS", "YBL", "PVT", "LTD",
+           "INDIA", "KOCHI", "BANGALORE", "SERVICES", "ONLINE", "TXN", "REF"]
+
+
+def _legacy(payee: str) -> str:
+    # the original rebuilt the keyword table on every call
+    categories = {c: list(k) for c, k in CATEGORY_KEYWORDS.items()}
+    if not payee:
+        return "Personal"
+    p = payee.upper()
+    for category, keywords in categories.items():
+        if any(key.upper() in p for key in keywords):
+            return category
+    return "Personal"
+
+
+def narrations(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    keywords = [k for ks in CATEGORY_KEYWORDS.values() for k in ks]
+    out = []
+    for _ in range(n):
+        words = rng.sample(_FILLER, rng.randint(1, 4))
+        if rng.random() < 0.6:
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        ref = str(rng.randint(10**9, 10**12))
+        out.append(f"UPI/{ref}/{' '.join(words)}/{rng.choice(_FILLER).lower()}@okicici")
+    return out
+
+
+def _time(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=1_000_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    items = narrations(args.n, args.seed)
+    mismatches = sum(1 for s in items if _legacy(s) != classify_category(s))
+    legacy_s = _time(_legacy, items)
+    compiled_s = _time(classify_category, items)
+
+    report = {
+        "narrations": args.n,
+        "legacy_s": round(legacy_s, 3),
+        "compiled_s": round(compiled_s, 3),
+        "speedup": round(legacy_s / compiled_s, 1),
+        "legacy_per_s": round(args.n / legacy_s),
+        "compiled_per_s": round(args.n / compiled_s),
+        "mismatches": mismatches,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
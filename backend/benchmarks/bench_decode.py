@@ -0,0 +1,100 @@
+"""
+Cell-decoding benchmark: the old per-cell strptime loop / findall cleaner vs
+ColumnDecoders inferred from the first rows, for date columns in early and
+late DATE_FORMATS positions. Also times _extract_txn_from_row end to end.
+
+    python -m benchmarks.bench_decode [--rows 200000]
+"""
+import re
+import json
+import time
+import argparse
+from datetime import datetime
+
+from app.parsers.column_decoder import DATE_FORMATS, ColumnDecoders
+from app.parsers.smart_universal import _extract_txn_from_row
+from benchmarks.synthetic import generate_rows
+
+MAPPING = {"date": 0, "desc": 1, "chqref": 2, "debit": 3, "credit": 4, "balance": 5}
+AMOUNT_KEYS = ("debit", "credit", "balance")
+
+
+def _legacy_date(cell: str):
+    cell = re.split(r"\s+\d{2}:\d{2}", cell.strip())[0].strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(cell, fmt)
+        except Exception:
+            continue
+    return None
+
+
+def _legacy_num(val: str) -> float:
+    if not val:
+        return 0.0
+    nums = "".join(re.findall(r"[-\d.]", val.replace(",", "").strip()))
+    try:
+        return float(nums) if nums else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _rows(n: int, date_fmt: str) -> list[list[str]]:
+    rows = generate_rows(n)
+    for row in rows:
+        row[0] = datetime.strptime(row[0], "%d-%m-%Y").strftime(date_fmt)
+    return rows
+
+
+def _rate(fn, rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        fn(row)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    args = ap.parse_args()
+
+    report = {"rows": args.rows, "formats": {}}
+    for fmt in ("%d-%m-%Y", "%d %b %y", "%d.%m.%y"):
+        rows = _rows(args.rows, fmt)
+        decoders = ColumnDecoders()
+        decoders.infer(rows, MAPPING)
+
+        def legacy(row):
+            _legacy_date(row[0])
+            for key in AMOUNT_KEYS:
+                _legacy_num(row[MAPPING[key]])
+
+        def columnar(row):
+            decoders.date.decode(row[0])
+            for key in AMOUNT_KEYS:
+                decoders.amount(key).decode(row[MAPPING[key]])
+
+        mismatches = sum(
+            1 for row in rows
+            if _legacy_date(row[0]) != decoders.date.decode(row[0])
+            or any(_legacy_num(row[MAPPING[k]]) != decoders.amount(k).decode(row[MAPPING[k]]) for k in AMOUNT_KEYS)
+        )
+        legacy_rate, columnar_rate = _rate(legacy, rows), _rate(columnar, rows)
+        report["formats"][fmt] = {
+            "legacy_rows_per_s": round(legacy_rate),
+            "columnar_rows_per_s": round(columnar_rate),
+            "speedup": round(columnar_rate / legacy_rate, 1),
+            "mismatches": mismatches,
+        }
+
+    rows = _rows(args.rows, "%d-%m-%Y")
+    decoders = ColumnDecoders()
+    decoders.infer(rows, MAPPING)
+    module_rate = _rate(lambda r: _extract_txn_from_row(r, MAPPING, "HDFC"), rows)
+    inferred_rate = _rate(lambda r: _extract_txn_from_row(r, MAPPING, "HDFC", decoders), rows)
+    report["extract_txn_rows_per_s"] = {"module_decoders": round(module_rate), "inferred_decoders": round(inferred_rate)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
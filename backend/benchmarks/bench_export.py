@@ -0,0 +1,85 @@
+"""
+Export benchmark: time, output size and RSS growth of the streaming writers
+(services/transaction_export.py) for --rows synthetic transactions, next to
+the old whole-history approach (every row in a list, one StringIO CSV).
+Batches are fed from memory in EXPORT_BATCH_ROWS slices — no Mongo needed.
+
+    python -m benchmarks.bench_export [--rows 1000000] [--formats csv,csv.gz,xlsx,parquet]
+"""
+import io
+import csv
+import json
+import time
+import asyncio
+import argparse
+
+from app.services.memory import rss_mb
+from app.services.transaction_export import export_stream, EXPORT_BATCH_ROWS, EXPORT_HEADER, _csv_row
+from benchmarks.synthetic import generate_txns
+
+BASE_ROWS = 5000
+
+
+def _base_docs() -> list[dict]:
+    return [{**t, "bank": "HDFC", "payee": t["description"].split("/")[2].title(), "category": "Personal"}
+            for t in generate_txns(BASE_ROWS)]
+
+
+async def _batches(base: list[dict], rows: int):
+    """`rows` documents in EXPORT_BATCH_ROWS batches, each batch a fresh copy (like a cursor)."""
+    for start in range(0, rows, EXPORT_BATCH_ROWS):
+        n = min(EXPORT_BATCH_ROWS, rows - start)
+        yield [dict(base[(start + i) % BASE_ROWS]) for i in range(n)]
+
+
+async def run_streaming(base: list[dict], rows: int, fmt: str) -> dict:
+    kind, gzip = fmt.split(".")[0], fmt.endswith(".gz")
+    rss_before, peak, size = rss_mb(), 0.0, 0
+    start = time.perf_counter()
+    first_byte = None
+    async for chunk in export_stream(_batches(base, rows), kind, gzip=gzip):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+        peak = max(peak, rss_mb())
+    return {"format": fmt, "seconds": round(time.perf_counter() - start, 2),
+            "first_byte_s": round(first_byte, 3), "output_mb": round(size / 2**20, 1),
+            "rss_growth_mb": round(peak - rss_before, 1)}
+
+
+def run_old(base: list[dict], rows: int) -> dict:
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    docs = [dict(base[i % BASE_ROWS]) for i in range(rows)]  # find().to_list()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(EXPORT_HEADER)
+    for doc in docs:
+        writer.writerow(_csv_row(doc))
+    body = output.getvalue()
+    peak = rss_mb()
+    seconds = time.perf_counter() - start
+    return {"format": "csv (old, in memory)", "seconds": round(seconds, 2), "first_byte_s": round(seconds, 3),
+            "output_mb": round(len(body.encode()) / 2**20, 1), "rss_growth_mb": round(peak - rss_before, 1)}
+
+
+async def main(rows: int, formats: list[str], old: bool):
+    import openpyxl  # noqa: F401 — library imports are not counted as export memory
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        formats = [f for f in formats if f != "parquet"]
+    base = _base_docs()
+    report = [await run_streaming(base, rows, fmt) for fmt in formats]
+    if old:
+        report.append(run_old(base, rows))  # last: its garbage would inflate the streaming numbers
+    print(json.dumps({"rows": rows, "batch_rows": EXPORT_BATCH_ROWS, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--formats", default="csv,csv.gz,xlsx,parquet")
+    ap.add_argument("--no-old", action="store_true", help="skip the whole-history baseline")
+    args = ap.parse_args()
+    asyncio.run(main(args.rows, args.formats.split(","), not args.no_old))
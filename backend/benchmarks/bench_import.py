@@ -0,0 +1,128 @@
+"""
+Tabular import benchmark: decode + normalize + make_hash throughput of the
+CSV / XLSX / OFX importers (parsers/tabular.py) on synthetic exports, and a
+hash-compatibility check against the PDF parse of the same transactions.
+
+    python -m benchmarks.bench_import [--rows 100000] [--pdf-pages 3]
+"""
+import os
+import csv
+import json
+import time
+import tempfile
+import argparse
+from itertools import islice
+
+from app.parsers.tabular import iter_transactions
+from app.parsers.smart_universal import SmartUniversalParser
+from app.services.pdf_source import StatementSource
+from app.utils.normalize import normalize
+from app.utils.hash import make_hash
+from app.services.memory import rss_mb
+from benchmarks.synthetic import generate_txns, build_statement, LAYOUTS, ROWS_PER_PAGE
+
+ACCOUNT_ID = "bench_HDFC"
+PREAMBLE = [["Account Statement"], ["Account No", "XXXXXXXX1234"], []]
+
+
+def write_csv(path: str, txns: list[dict]) -> None:
+    spec = LAYOUTS["hdfc"]
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerows(PREAMBLE)
+        w.writerow(spec["header"])
+        w.writerows(spec["row"](t, i) for i, t in enumerate(txns))
+
+
+def write_xlsx(path: str, txns: list[dict]) -> None:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for row in PREAMBLE:
+        ws.append(row)
+    ws.append(LAYOUTS["hdfc"]["header"])
+    for t in txns:
+        ws.append([t["date"], t["description"], t["ref"], t["debit"] or None, t["credit"] or None, t["balance"]])
+    wb.save(path)
+
+
+def write_ofx(path: str, txns: list[dict]) -> None:
+    with open(path, "w") as f:
+        f.write("OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n")
+        for i, t in enumerate(txns):
+            amount = t["credit"] - t["debit"]
+            f.write(f"<STMTTRN>\n<TRNTYPE>{'CREDIT' if amount > 0 else 'DEBIT'}\n"
+                    f"<DTPOSTED>{t['date']:%Y%m%d}\n<TRNAMT>{amount:.2f}\n<FITID>{i}\n"
+                    f"<NAME>{t['description'][:32]}\n<MEMO>{t['description']}\n</STMTTRN>\n")
+        f.write(f"</BANKTRANLIST><LEDGERBAL><BALAMT>{txns[-1]['balance']:.2f}\n<DTASOF>20250101\n"
+                f"</LEDGERBAL></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "ofx": write_ofx}
+
+
+def hashes_of(raw_txns) -> list[str]:
+    out = []
+    for txn in raw_txns:
+        clean = normalize(txn)
+        if clean:
+            out.append(make_hash(ACCOUNT_ID, clean))
+    return out
+
+
+def run_kind(kind: str, rows: int, tmp: str) -> dict:
+    path = os.path.join(tmp, f"export.{kind}")
+    WRITERS[kind](path, generate_txns(rows))
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    count = 0
+    txns = iter_transactions(path, kind, "HDFC")
+    while True:
+        batch = list(islice(txns, 2000))
+        if not batch:
+            break
+        count += len(hashes_of(batch))
+    seconds = time.perf_counter() - start
+    return {
+        "kind": kind,
+        "rows": rows,
+        "rows_imported": count,
+        "file_mb": round(os.path.getsize(path) / 2**20, 1),
+        "seconds": round(seconds, 2),
+        "rows_per_s": round(count / seconds),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+    }
+
+
+def hash_check(pages: int, tmp: str) -> dict:
+    """PDF and CSV/XLSX/OFX exports of the same transactions → same hashes?"""
+    pdf_path = os.path.join(tmp, "statement.pdf")
+    txns = build_statement(pdf_path, pages)
+    parser = SmartUniversalParser("HDFC")
+    with StatementSource(pdf_path).open() as source:
+        pdf_hashes = set(hashes_of(t for page in source.pdf.pages for t in parser.parse_page(page)))
+    result = {"pdf_rows": len(pdf_hashes)}
+    for kind, write in WRITERS.items():
+        path = os.path.join(tmp, f"same.{kind}")
+        write(path, txns)
+        export_hashes = set(hashes_of(iter_transactions(path, kind, "HDFC")))
+        result[kind] = {"rows": len(export_hashes), "same_as_pdf": len(export_hashes & pdf_hashes)}
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--pdf-pages", type=int, default=3)
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        report = {
+            "throughput": [run_kind(kind, args.rows, tmp) for kind in WRITERS],
+            "hash_compat": hash_check(args.pdf_pages, tmp),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Parser throughput / accuracy benchmark on synthetic statements.
+
+For every layout × page count (× password variant) a statement is generated
+with benchmarks.synthetic and measured in a fresh subprocess (so peak RSS is
+that run's own):
+
+  parse     StatementSource + get_parser(bank).parse_page on every page
+            (LLM fallback deferred, never called)
+  pipeline  the full process_statement_pipeline against Mongo
+            (MONGO_URI / DB_NAME; use a throwaway database), with a fresh
+            user per run; that user's rows are read back and then deleted
+
+Each run reports pages/s, rows/s, peak RSS (own + reaped parse-pool
+children), the strategies chosen per page and row-level precision / recall
+against the generator's ground truth. Rows match on
+(date, debit, credit, balance).
+
+    python -m benchmarks.bench_parsers [--layouts hdfc sbi] [--pages 1 10 100]
+        [--password secret] [--mode parse pipeline] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from collections import Counter
+
+DEFAULT_PAGES = [1, 10, 100]
+
+
+def _peak_rss_mb(who) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(who).ru_maxrss / scale, 1)
+
+
+def _row_key(txn: dict) -> tuple:
+    date = txn["date"]
+    return (date.strftime("%Y-%m-%d"), round(float(txn.get("debit") or 0), 2),
+            round(float(txn.get("credit") or 0), 2), round(float(txn.get("balance") or 0), 2))
+
+
+def _accuracy(found: list[dict], truth: list[dict]) -> dict:
+    found_keys, truth_keys = Counter(_row_key(t) for t in found), Counter(_row_key(t) for t in truth)
+    matched = sum((found_keys & truth_keys).values())
+    return {
+        "rows_found": sum(found_keys.values()),
+        "rows_expected": sum(truth_keys.values()),
+        "precision": round(matched / sum(found_keys.values()), 4) if found_keys else 0.0,
+        "recall": round(matched / sum(truth_keys.values()), 4) if truth_keys else 0.0,
+    }
+
+
+def _measure_parse(path: str, bank: str, password: str | None) -> dict:
+    from app.parsers.factory import get_parser
+    from app.services.pdf_source import StatementSource
+    from app.utils.normalize import normalize
+
+    strategies = Counter()
+    found = []
+    start = time.perf_counter()
+    with StatementSource(path, password) as source:
+        parser = get_parser(bank)
+        parser.defer_llm = True
+        for page in source.pdf.pages:
+            parser.deferred_text = None
+            for txn in parser.parse_page(page):
+                clean = normalize(txn)
+                if clean:
+                    found.append(clean)
+            strategies[parser.last_strategy or "none"] += 1
+            page.close()
+        pages = source.page_count
+    elapsed = time.perf_counter() - start
+    return {"pages": pages, "seconds": elapsed, "strategies": dict(strategies), "found": found}
+
+
+async def _measure_pipeline(path: str, bank: str, password: str | None) -> dict:
+    from app.db.session import init_db
+    from app.models.transaction import Transaction
+    from app.models.statement_fingerprint import StatementFingerprint
+    from app.services.pipeline import process_statement_pipeline
+    from app.services.parse_executor import shutdown_executor
+
+    await init_db()
+    user_id = f"bench-{uuid.uuid4()}"
+    # the pipeline deletes its input when done
+    work_path = f"{path}.{user_id}.pdf"
+    shutil.copy(path, work_path)
+    from app.services.pdf_source import StatementSource
+    with StatementSource(path, password) as source:
+        pages = source.page_count
+
+    start = time.perf_counter()
+    try:
+        await process_statement_pipeline(work_path, bank, password, user_id, raise_errors=True)
+        elapsed = time.perf_counter() - start
+        found = await Transaction.get_pymongo_collection().find(
+            {"user_id": user_id}, {"date": 1, "debit": 1, "credit": 1, "balance": 1}).to_list(length=None)
+    finally:
+        await Transaction.get_pymongo_collection().delete_many({"user_id": user_id})
+        await StatementFingerprint.get_pymongo_collection().delete_many({"user_id": user_id})
+        shutdown_executor(wait=True)
+    return {"pages": pages, "seconds": elapsed, "strategies": {}, "found": found}
+
+
+def _child(mode: str, layout: str, pages: int, password: str | None, seed: int) -> None:
+    """Subprocess entry: measure the statement at $BENCH_PDF and print one JSON line."""
+    from benchmarks.synthetic import LAYOUTS, generate_txns, ROWS_PER_PAGE
+
+    path = os.environ["BENCH_PDF"]
+    bank = LAYOUTS[layout]["bank"]
+    if mode == "parse":
+        result = _measure_parse(path, bank, password)
+    else:
+        result = asyncio.run(_measure_pipeline(path, bank, password))
+
+    truth = generate_txns(pages * ROWS_PER_PAGE, seed)
+    accuracy = _accuracy(result["found"], truth)
+    seconds = result["seconds"]
+    print(json.dumps({
+        "mode": mode,
+        "layout": layout,
+        "bank": bank,
+        "pages": result["pages"],
+        "encrypted": bool(password),
+        "seconds": round(seconds, 3),
+        "pages_per_s": round(result["pages"] / seconds, 2) if seconds else None,
+        "rows_per_s": round(accuracy["rows_found"] / seconds, 1) if seconds else None,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_children_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "strategies": result["strategies"],
+        **accuracy,
+    }))
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    from benchmarks.synthetic import LAYOUTS
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--layouts", nargs="+", choices=sorted(LAYOUTS), default=sorted(LAYOUTS))
+    ap.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES)
+    ap.add_argument("--password", help="also run every statement as a password-protected copy")
+    ap.add_argument("--mode", nargs="+", choices=["parse", "pipeline"], default=["parse"])
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write the JSON report here instead of stdout")
+    ap.add_argument("--_child", nargs=3, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._child:
+        mode, layout, pages = args._child
+        _child(mode, layout, int(pages), args.password, args.seed)
+        return
+
+    from benchmarks.synthetic import build_statement
+
+    results = []
+    passwords = [None] + ([args.password] if args.password else [])
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in args.layouts:
+            for pages in args.pages:
+                for password in passwords:
+                    path = os.path.join(tmp, f"{layout}_{pages}{'_enc' if password else ''}.pdf")
+                    build_statement(path, pages, password, seed=args.seed, layout=layout)
+                    for mode in args.mode:
+                        cmd = [sys.executable, "-m", "benchmarks.bench_parsers",
+                               "--_child", mode, layout, str(pages), "--seed", str(args.seed)]
+                        if password:
+                            cmd += ["--password", password]
+                        proc = subprocess.run(cmd, capture_output=True, text=True,
+                                              env={**os.environ, "BENCH_PDF": path})
+                        if proc.returncode != 0:
+                            results.append({"mode": mode, "layout": layout, "pages": pages,
+                                            "encrypted": bool(password), "error": proc.stderr.strip()[-2000:]})
+                        else:
+                            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+                        r = results[-1]
+                        print(f"{mode:<8} {layout:<10} {pages:>5}p {'enc' if password else '   '} "
+                              + (f"{r['pages_per_s']:>8} p/s {r['rows_per_s']:>9} rows/s "
+                                 f"{r['peak_rss_mb']:>7} MB  P={r['precision']} R={r['recall']} {r['strategies']}"
+                                 if "error" not in r else "ERROR"), file=sys.stderr)
+
+    report = {"commit": _git_commit(), "python": sys.version.split()[0], "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
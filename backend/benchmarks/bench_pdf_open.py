@@ -0,0 +1,90 @@
+"""
+Open-path benchmark: legacy triple open vs StatementSource single open.
+
+Each measurement runs in a fresh subprocess so ru_maxrss is the peak RSS of
+that path alone. Run from the backend directory:
+
+    python -m benchmarks.bench_pdf_open [--pages 1 50 500] [--password secret]
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+
+def _legacy(path: str, password: str | None) -> int:
+    import pdfplumber
+    from app.utils.unlock_pdf import unlock_pdf
+
+    with open(path, "rb") as f:
+        file_bytes = f.read()
+    # the original unlock_pdf did a full pdfplumber open just to detect encryption
+    try:
+        with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+            len(pdf.pages)
+    except Exception:
+        pass
+    unlocked = unlock_pdf(file_bytes, password)
+    with pdfplumber.open(io.BytesIO(unlocked)) as pdf:
+        total = len(pdf.pages)
+    with pdfplumber.open(io.BytesIO(unlocked)) as pdf:
+        len(pdf.pages)
+    return total
+
+
+def _source(path: str, password: str | None) -> int:
+    from app.services.pdf_source import StatementSource
+
+    with StatementSource(path, password) as source:
+        return source.page_count
+
+
+def _measure(mode: str, path: str, password: str | None) -> None:
+    fn = _legacy if mode == "legacy" else _source
+    t0 = time.perf_counter()
+    pages = fn(path, password)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "mode": mode,
+        "pages": pages,
+        "open_ms": round(elapsed * 1000, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, nargs="+", default=[1, 50, 500])
+    ap.add_argument("--password")
+    ap.add_argument("--_measure", nargs=2, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._measure:
+        _measure(args._measure[0], args._measure[1], args.password)
+        return
+
+    from benchmarks.synthetic import build_statement
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.pages:
+            path = os.path.join(tmp, f"stmt_{n}.pdf")
+            build_statement(path, n, args.password)
+            for mode in ("legacy", "source"):
+                cmd = [sys.executable, "-m", "benchmarks.bench_pdf_open", "--_measure", mode, path]
+                if args.password:
+                    cmd += ["--password", args.password]
+                out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+                results.append(json.loads(out.strip().splitlines()[-1]))
+                print(f"{n:>5} pages  {mode:<7} {results[-1]['open_ms']:>9} ms  {results[-1]['peak_rss_mb']:>7} MB")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
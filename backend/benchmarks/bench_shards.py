@@ -0,0 +1,63 @@
+"""
+Sharded parsing benchmark: wall-clock of iter_parsed_pages over one synthetic
+statement for several pool sizes, checking every run yields exactly what the
+single-worker run does.
+
+    python -m benchmarks.bench_shards [--pages 500] [--layout hdfc] [--workers 1 2 4 8]
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+import app.services.parse_executor as parse_executor
+from app.services.pdf_source import StatementSource
+from benchmarks.synthetic import LAYOUTS, build_statement
+
+
+async def _run(path: str, bank: str, workers: int) -> tuple[list, float, dict]:
+    parse_executor.PARSE_WORKERS = workers
+    parse_executor.shutdown_executor(wait=True)
+    parse_executor.get_executor()  # start the pool outside the timed section
+    stats = parse_executor.ShardStats()
+    pages = []
+    with StatementSource(path) as source:
+        start = time.perf_counter()
+        async for i, txns, *_ in parse_executor.iter_parsed_pages(source, bank, stats=stats):
+            pages.append((i, [(t["date"], t["debit"], t["credit"], t["balance"]) for t in txns or []]))
+        elapsed = time.perf_counter() - start
+    parse_executor.shutdown_executor(wait=True)
+    return pages, elapsed, vars(stats)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=500)
+    ap.add_argument("--layout", choices=sorted(LAYOUTS), default="hdfc")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    bank = LAYOUTS[args.layout]["bank"]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.pdf")
+        build_statement(path, args.pages, layout=args.layout)
+        baseline = None
+        for workers in args.workers:
+            pages, elapsed, stats = asyncio.run(_run(path, bank, workers))
+            baseline = baseline or (pages, elapsed)
+            results.append({
+                "workers": workers,
+                "seconds": round(elapsed, 2),
+                "pages_per_s": round(args.pages / elapsed, 2),
+                "speedup": round(baseline[1] / elapsed, 2),
+                "identical_to_first_run": pages == baseline[0],
+                **stats,
+            })
+    print(json.dumps({"layout": args.layout, "pages": args.pages, "cpus": os.cpu_count(), "runs": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+GET /transactions latency: the old three operations (count + $group sums +
+hydrated skip/limit find) against run_list_query's single $facet, for a user
+with --rows transactions. Needs Mongo (MONGO_URI / DB_NAME; use a throwaway
+database): the user is seeded from benchmarks.synthetic and deleted afterwards.
+
+Cases cover the unfiltered list, the fuzzy search regex (alone and behind
+the search_grams trigram index), a type filter and
+deep pages (page mode with skip vs keyset cursor). Reports p50 / p95 in ms.
+
+    python -m benchmarks.bench_transactions_list [--rows 100000] [--repeat 30]
+"""
+import re
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+
+from benchmarks.synthetic import generate_txns
+
+LIMIT = 20
+
+
+def _filter(user_id: str, search: str | None = None, type_: str = "all", indexed: bool = False) -> dict:
+    """Same shape as the endpoint's compiled Beanie filter (indexed: trigram search_filter)."""
+    from app.services.search_index import search_filter
+
+    from app.services.bank_dimension import ledger_match
+
+    clauses = [ledger_match(user_id)]
+    if search and indexed:
+        clauses.append(search_filter(search))
+    elif search:
+        pattern = r"\s*".join(re.escape(c) for c in search if not c.isspace())
+        clauses.append({"$or": [{f: {"$regex": pattern, "$options": "i"}} for f in ("description", "payee", "bank")]})
+    if type_ == "debit":
+        clauses.append({"debit": {"$gt": 0}})
+    return {"$and": clauses}
+
+
+async def _old(collection, model, filter_dict: dict, skip: int) -> int:
+    total = await collection.count_documents(filter_dict)
+    await collection.aggregate([
+        {"$match": filter_dict},
+        {"$group": {"_id": None, "total_debit": {"$sum": "$debit"}, "total_credit": {"$sum": "$credit"}}},
+    ]).to_list(1)
+    docs = await collection.find(filter_dict).sort([("date", -1), ("_id", -1)]).skip(skip).limit(LIMIT).to_list(LIMIT)
+    rows = [model.model_validate(d).dict() for d in docs]
+    return total + len(rows)
+
+
+async def _time(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 1),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1)}
+
+
+async def main(rows: int, repeat: int):
+    from app.db.session import init_db
+    from app.models.transaction import Transaction
+    from app.utils.hash import make_hash
+    from app.services.search_index import search_grams
+    from app.services.transaction_query import run_list_query, format_row
+    from app.api.v1.endpoints.transactions import _seek_filter
+
+    await init_db()
+    collection = Transaction.get_pymongo_collection()
+    user_id = f"bench-{uuid.uuid4()}"
+    account_id = f"{user_id}_HDFC"
+    docs = []
+    for t in generate_txns(rows):
+        t = {**t, "bank": "HDFC", "payee": t["description"].split("/")[2].title(), "category": "Personal",
+             "type": "DEBIT" if t["debit"] else "CREDIT"}
+        docs.append({**t, "user_id": user_id, "account_id": account_id, "hash": make_hash(account_id, t),
+                     "search_grams": search_grams(t["description"], t["payee"], t["bank"]),
+                     "bank_key": "HDFC", "source_kind": "statement"})
+    for n in range(0, len(docs), 10_000):
+        await collection.insert_many(docs[n:n + 10_000], ordered=False)
+
+    report = []
+    try:
+        deep_skip = (rows // LIMIT // 2) * LIMIT
+        # Keyset boundary at the same depth as the deep skip page
+        boundary = await collection.find({"user_id": user_id}).sort([("date", -1), ("_id", -1)]) \
+            .skip(deep_skip - 1).limit(1).to_list(1)
+        seek = _seek_filter(boundary[0]["date"], boundary[0]["_id"], -1)
+
+        cases = {
+            "page 1": (_filter(user_id), 0),
+            f"page {deep_skip // LIMIT + 1}": (_filter(user_id), deep_skip),
+            "search 'swiggy'": (_filter(user_id, "swiggy"), 0),
+            "search 'swiggy' (trigrams)": (_filter(user_id, "swiggy", indexed=True), 0),
+            "type=debit": (_filter(user_id, type_="debit"), 0),
+        }
+        for name, (flt, skip) in cases.items():
+            before = await _time(lambda: _old(collection, Transaction, flt, skip), repeat)
+
+            async def facet():
+                result = await run_list_query(collection, flt, -1, skip=skip, limit=LIMIT)
+                return [format_row(d) for d in result["rows"]]
+
+            report.append({"case": name, "before": before, "after": await _time(facet, repeat)})
+
+        async def keyset():
+            result = await run_list_query(collection, _filter(user_id), -1, limit=LIMIT + 1, keyset=True, seek=seek)
+            return [format_row(d) for d in result["rows"]]
+
+        report.append({"case": f"cursor at page {deep_skip // LIMIT + 1}", "after": await _time(keyset, repeat)})
+    finally:
+        await collection.delete_many({"user_id": user_id})
+
+    print(json.dumps({"rows": rows, "repeat": repeat, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
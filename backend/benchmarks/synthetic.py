@@ -0,0 +1,134 @@
+"""
+Synthetic bank statement generator (reportlab) for benchmarks.
+
+Layouts mimic the statements the parsers see in practice:
+
+  hdfc        bordered grid, separate withdrawal / deposit columns
+  federal     bordered grid with Value Date / Tran Type / DR-CR columns (FederalBankParser)
+  sbi         bordered grid, "Txn Date", "dd Mon YYYY" dates
+  icici       bordered grid, serial number first, "Transaction Remarks"
+  borderless  no ruling lines, single Amount column with Dr/Cr suffix
+
+    python -m benchmarks.synthetic out.pdf --pages 50 [--layout sbi] [--password secret]
+"""
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.pdfencrypt import StandardEncryption
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, PageBreak
+
+HEADER = ["Date", "Narration", "Chq/Ref No.", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"]
+ROWS_PER_PAGE = 30
+PAYEES = ["SWIGGY", "ZOMATO", "AMAZON", "FLIPKART", "UBER", "IRCTC", "KSEB", "AIRTEL", "NETFLIX", "APOLLO PHARMACY"]
+
+
+def _fmt(amount: float) -> str:
+    return f"{amount:,.2f}" if amount else ""
+
+
+def generate_txns(n: int, seed: int = 7) -> list[dict]:
+    """Ground-truth transactions: date, description, ref, debit, credit, balance."""
+    rnd = random.Random(seed)
+    day = datetime(2025, 1, 1)
+    balance = 50000.0
+    txns = []
+    for i in range(n):
+        day += timedelta(hours=rnd.randint(1, 30))
+        payee = rnd.choice(PAYEES)
+        if rnd.random() < 0.85:
+            debit, credit = round(rnd.uniform(10, 5000), 2), 0.0
+        else:
+            debit, credit = 0.0, round(rnd.uniform(1000, 60000), 2)
+        balance = round(balance + credit - debit, 2)
+        txns.append({
+            "date": datetime(day.year, day.month, day.day),
+            "description": f"UPI/{rnd.randint(10**11, 10**12 - 1)}/{payee}/{payee.lower().replace(' ', '')}@okicici",
+            "ref": f"REF{i:08d}",
+            "debit": debit,
+            "credit": credit,
+            "balance": balance,
+        })
+    return txns
+
+
+def generate_rows(n: int, seed: int = 7) -> list[list[str]]:
+    """HDFC-layout table rows (as strings) for n transactions."""
+    return [LAYOUTS["hdfc"]["row"](t, i) for i, t in enumerate(generate_txns(n, seed))]
+
+
+LAYOUTS = {
+    "hdfc": {
+        "bank": "HDFC",
+        "header": HEADER,
+        "row": lambda t, i: [t["date"].strftime("%d-%m-%Y"), t["description"], t["ref"],
+                             _fmt(t["debit"]), _fmt(t["credit"]), _fmt(t["balance"])],
+        "grid": True,
+    },
+    "federal": {
+        "bank": "FEDERAL",
+        "header": ["Date", "Value Date", "Particulars", "Tran Type", "Cheque Details",
+                   "Withdrawals", "Deposits", "Balance", "DR/CR"],
+        "row": lambda t, i: [t["date"].strftime("%d-%b-%Y").upper(), t["date"].strftime("%d-%b-%Y").upper(),
+                             t["description"], "TFR", "", _fmt(t["debit"]), _fmt(t["credit"]),
+                             _fmt(t["balance"]), "Cr"],
+        "grid": True,
+    },
+    "sbi": {
+        "bank": "SBI",
+        "header": ["Txn Date", "Description", "Ref No./Cheque No.", "Debit", "Credit", "Balance"],
+        "row": lambda t, i: [t["date"].strftime("%d %b %Y"), t["description"], t["ref"],
+                             _fmt(t["debit"]), _fmt(t["credit"]), _fmt(t["balance"])],
+        "grid": True,
+    },
+    "icici": {
+        "bank": "ICICI",
+        "header": ["S No.", "Transaction Date", "Cheque Number", "Transaction Remarks",
+                   "Withdrawal Amount (INR )", "Deposit Amount (INR )", "Balance (INR )"],
+        "row": lambda t, i: [str(i + 1), t["date"].strftime("%d/%m/%Y"), "", t["description"],
+                             _fmt(t["debit"]), _fmt(t["credit"]), _fmt(t["balance"])],
+        "grid": True,
+    },
+    "borderless": {
+        "bank": "KOTAK",
+        "header": ["Date", "Particulars", "Ref No", "Amount", "Balance"],
+        "row": lambda t, i: [t["date"].strftime("%d/%m/%y"), t["description"], t["ref"],
+                             f"{t['debit'] or t['credit']:,.2f} {'Dr' if t['debit'] else 'Cr'}",
+                             _fmt(t["balance"])],
+        "grid": False,
+    },
+}
+
+
+def build_statement(path: str, pages: int, password: str | None = None, seed: int = 7,
+                    layout: str = "hdfc") -> list[dict]:
+    """Write a `pages`-page statement in `layout` to `path`; returns the ground-truth transactions."""
+    spec = LAYOUTS[layout]
+    txns = generate_txns(pages * ROWS_PER_PAGE, seed)
+    encrypt = StandardEncryption(password, canPrint=1) if password else None
+    doc = SimpleDocTemplate(path, pagesize=A4, encrypt=encrypt, leftMargin=20, rightMargin=20)
+    commands = [("FONTSIZE", (0, 0), (-1, -1), 6)]
+    if spec["grid"]:
+        commands.append(("GRID", (0, 0), (-1, -1), 0.5, colors.black))
+    style = TableStyle(commands)
+    story = []
+    for p in range(pages):
+        chunk = txns[p * ROWS_PER_PAGE:(p + 1) * ROWS_PER_PAGE]
+        rows = [spec["row"](t, p * ROWS_PER_PAGE + n) for n, t in enumerate(chunk)]
+        story.append(Table([spec["header"]] + rows, style=style))
+        if p < pages - 1:
+            story.append(PageBreak())
+    doc.build(story)
+    return txns
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("out")
+    ap.add_argument("--pages", type=int, default=1)
+    ap.add_argument("--layout", choices=sorted(LAYOUTS), default="hdfc")
+    ap.add_argument("--password")
+    args = ap.parse_args()
+    build_statement(args.out, args.pages, args.password, layout=args.layout)
@@ -0,0 +1,64 @@
+"""
+Shared fixtures. Database tests run on mongomock-motor (requirements-dev.txt)
+with Beanie initialised on a fresh in-memory database per test:
+
+    def test_something(run):
+        async def scenario(db):
+            ...
+        run(scenario)
+"""
+import io
+import asyncio
+
+import pytest
+import pikepdf
+import mongomock.collection
+from mongomock_motor import AsyncMongoMockClient
+from beanie import init_beanie
+
+from app.models.transaction import Transaction
+from app.models.job import JobStatus
+from app.models.statement_fingerprint import StatementFingerprint
+from app.models.llm_cache import LLMCacheEntry
+
+# pymongo 4.9+ passes `sort` to bulk update builders; mongomock predates it
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+
+def _add_update_compat(self, *args, sort=None, **kwargs):
+    return _add_update(self, *args, **kwargs)
+
+
+mongomock.collection.BulkOperationBuilder.add_update = _add_update_compat
+
+DOCUMENT_MODELS = [Transaction, JobStatus, StatementFingerprint, LLMCacheEntry]
+
+
+@pytest.fixture
+def run():
+    def _run(scenario):
+        async def main():
+            db = AsyncMongoMockClient()["tests"]
+            await init_beanie(database=db, document_models=DOCUMENT_MODELS)
+            return await scenario(db)
+        return asyncio.run(main())
+    return _run
+
+
+@pytest.fixture
+def scanned_pdf():
+    """Builds an in-memory PDF with one image-only page per entry of raw 10x10 gray pixels."""
+    def _build(images: list[bytes]) -> io.BytesIO:
+        pdf = pikepdf.new()
+        for data in images:
+            image = pikepdf.Stream(pdf, data, Type=pikepdf.Name.XObject, Subtype=pikepdf.Name.Image, Width=10,
+                                   Height=10, ColorSpace=pikepdf.Name.DeviceGray, BitsPerComponent=8)
+            pdf.pages.append(pikepdf.Page(pikepdf.Dictionary(
+                Type=pikepdf.Name.Page, MediaBox=[0, 0, 200, 200],
+                Contents=pdf.make_stream(b"q 200 0 0 200 0 0 cm /Im0 Do Q"),
+                Resources=pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=image)))))
+        buf = io.BytesIO()
+        pdf.save(buf)
+        buf.seek(0)
+        return buf
+    return _build
@@ -0,0 +1,95 @@
+import pytest
+
+from app.models.transaction import Transaction
+from app.services import bank_dimension
+from app.services.bank_dimension import ledger_match, ensure_backfilled, SOURCE_KINDS
+
+USER = "user-1"
+LEGACY_ROWS = [
+    {"hash": "a", "bank": "HDFC", "account_id": f"{USER}_HDFC"},
+    {"hash": "b", "bank": "Hdfc", "account_id": f"{USER}_HDFC"},
+    {"hash": "c", "bank": "Manually Added", "account_id": f"{USER}_MANUAL"},
+    {"hash": "d", "bank": "GPAY", "account_id": "realtime_acc"},
+    {"hash": "e", "bank": "SBI", "account_id": f"{USER}_SBI"},
+]
+
+
+@pytest.fixture(autouse=True)
+def pending(monkeypatch):
+    monkeypatch.setattr(bank_dimension, "_backfill_pending", True)
+
+
+async def _hashes(flt: dict) -> list[str]:
+    return sorted([d["hash"] async for d in Transaction.get_pymongo_collection().find(flt, {"hash": 1})])
+
+
+async def _seed():
+    await Transaction.get_pymongo_collection().insert_many([{**row, "user_id": USER} for row in LEGACY_ROWS])
+
+
+def _filters():
+    return {
+        "ledger": ledger_match(USER),
+        "ledger_hdfc": ledger_match(USER, "HDFC"),
+        "all_sources": ledger_match(USER, "All Banks", SOURCE_KINDS),
+    }
+
+
+EXPECTED = {"ledger": ["a", "b", "d", "e"], "ledger_hdfc": ["a", "b"], "all_sources": ["a", "b", "c", "d", "e"]}
+
+
+def test_rows_stay_visible_before_and_after_backfill(run):
+    async def scenario(db):
+        await _seed()
+        before = {name: await _hashes(f) for name, f in _filters().items()}
+        await ensure_backfilled()
+        after = {name: await _hashes(f) for name, f in _filters().items()}
+        return before, after
+
+    before, after = run(scenario)
+    assert before == EXPECTED
+    assert after == EXPECTED
+    assert not bank_dimension._backfill_pending
+    # Settled filters are plain index equality prefixes again
+    assert ledger_match(USER, "HDFC") == {"user_id": USER, "source_kind": {"$in": ["statement", "realtime"]},
+                                           "bank_key": "HDFC"}
+
+
+def test_backfill_classifies_rows_and_runs_once(run, monkeypatch):
+    async def scenario(db):
+        await _seed()
+        await ensure_backfilled()
+        stored = {d["hash"]: (d["source_kind"], d["bank_key"])
+                  async for d in Transaction.get_pymongo_collection().find({})}
+
+        async def fail():
+            raise AssertionError("backfill ran twice")
+
+        monkeypatch.setattr(bank_dimension, "backfill", fail)
+        monkeypatch.setattr(bank_dimension, "_backfill_pending", True)
+        await ensure_backfilled()  # marker found → no backfill
+        return stored
+
+    stored = run(scenario)
+    assert stored == {"a": ("statement", "HDFC"), "b": ("statement", "HDFC"), "c": ("manual", "MANUALLYADDED"),
+                      "d": ("realtime", "GPAY"), "e": ("statement", "SBI")}
+    assert not bank_dimension._backfill_pending
+
+
+def test_editing_the_bank_recomputes_both_fields(run):
+    from app.api.v1.endpoints.transactions import update_transaction
+
+    async def scenario(db):
+        statement = Transaction(user_id=USER, account_id=f"{USER}_HDFC", hash="x", bank="HDFC",
+                                bank_key="HDFC", source_kind="statement")
+        realtime = Transaction(user_id=USER, account_id="realtime_acc", hash="y", bank="GPAY",
+                               bank_key="GPAY", source_kind="realtime")
+        await statement.insert()
+        await realtime.insert()
+        await update_transaction(str(statement.id), {"bank": "Cash/Manual"}, user={"user_id": USER})
+        await update_transaction(str(realtime.id), {"bank": "Phone Pe"}, user={"user_id": USER})
+        return await Transaction.get(statement.id), await Transaction.get(realtime.id)
+
+    statement, realtime = run(scenario)
+    assert (statement.source_kind, statement.bank_key) == ("manual", "CASHMANUAL")
+    assert (realtime.source_kind, realtime.bank_key) == ("realtime", "PHONEPE")
@@ -0,0 +1,70 @@
+import re
+from datetime import datetime
+
+import pytest
+
+from app.parsers.column_decoder import DATE_FORMATS, AmountDecoder, ColumnDecoders, DateDecoder
+from app.parsers.smart_universal import _extract_txn_from_row
+
+
+def _legacy_date(cell: str):
+    """The strptime loop DateDecoder replaced."""
+    cell = re.split(r"\s+\d{2}:\d{2}", cell.strip())[0].strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(cell, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _legacy_num(val: str) -> float:
+    """The findall / float() cleaner AmountDecoder replaced."""
+    nums = "".join(re.findall(r"[-\d.]", val.replace(",", "").strip()))
+    try:
+        return float(nums) if nums else 0.0
+    except ValueError:
+        return 0.0
+
+
+DATE_CELLS = [
+    "05-06-2025", "5-6-2025", "05/06/2025", "05-Jun-2025", "05 jun 2025", "05 JUN  2025", "05/06/25", "05-06-25",
+    "05 Jun 25", "2025-06-05", "05.06.2025", "05.06.25", "05/06/2025 10:32", "05-06-2025 10:32:11",
+    "29/02/2024", "29/02/2023", "31/04/2025", "00/01/2025", "13/13/2025", "05/06/69", "05/06/68",
+    "05 June 2025", "2025/06/05", "05-06", "", "  ", "Opening balance", "05-06-2025x", "5.6.25",
+]
+
+AMOUNT_CELLS = [
+    "1,234.50", "12,34,567.89", "-1,234.50", "1234", "0.50", ".50", "1,234.50 Dr", "1,234.50Cr", "₹ 1,234.50",
+    "INR 99.00", "", "-", "--", "1.2.3", "12-34", "abc", "1,234.50 (Dr)", "0", "0.00", "- 45.00",
+]
+
+
+# Column samples: none (default order) and one that moves a late format to the front
+@pytest.mark.parametrize("sample", [[], ["05.06.25", "06.06.25 10:01"]])
+@pytest.mark.parametrize("cell", DATE_CELLS)
+def test_date_decoder_matches_strptime_loop(cell, sample):
+    decoder = DateDecoder()
+    decoder.infer(sample)
+    assert decoder.decode(cell) == _legacy_date(cell)
+
+
+@pytest.mark.parametrize("signed", [True, False])
+@pytest.mark.parametrize("cell", AMOUNT_CELLS)
+def test_amount_decoder_matches_float_cleaner(cell, signed):
+    decoder = AmountDecoder(signed=signed)
+    decoder.infer(AMOUNT_CELLS[:8])
+    expected = _legacy_num(cell) if signed else _legacy_num(cell.replace("-", ""))
+    assert decoder.decode(cell) == expected
+
+
+def test_trailing_minus_in_a_debit_column_stays_a_debit():
+    mapping = {"date": 0, "desc": 1, "debit": 2, "credit": 3, "balance": 4}
+    rows = [["05/06/2025", "ATM WDL", "1,234.00-", "", "10,000.00-"],
+            ["06/06/2025", "NEFT IN", "", "500.00", "9,500.00-"]]
+    decoders = ColumnDecoders()
+    decoders.infer(rows, mapping)
+    debit_row, credit_row = (_extract_txn_from_row(r, mapping, "HDFC", decoders) for r in rows)
+    assert (debit_row["debit"], debit_row["credit"], debit_row["type"]) == (1234.0, 0.0, "DEBIT")
+    assert debit_row["balance"] == -10000.0
+    assert (credit_row["credit"], credit_row["type"]) == (500.0, "CREDIT")
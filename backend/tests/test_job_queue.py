@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from app.models.job import JobStatus
+from app.parsers.base import StatementFileError
+from app.services import job_queue
+from app.services.job_queue import claim_next, enqueue_statement, release, requeue_or_fail
+
+USER = "user-1"
+
+
+async def _enqueue(job_id: str = "job-1") -> None:
+    await enqueue_statement(job_id, USER, "HDFC", file_id=None, filename="statement.pdf")
+
+
+async def _job(job_id: str = "job-1") -> JobStatus:
+    return await JobStatus.find_one(JobStatus.job_id == job_id)
+
+
+def test_claim_takes_a_lease_and_expired_leases_are_reclaimed(run):
+    async def scenario(db):
+        await _enqueue()
+        first = await claim_next("worker-a")
+        while_leased = await claim_next("worker-b")
+        await JobStatus.get_pymongo_collection().update_one(
+            {"job_id": "job-1"}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+        reclaimed = await claim_next("worker-b")
+        return first, while_leased, reclaimed
+
+    first, while_leased, reclaimed = run(scenario)
+    assert (first["worker_id"], first["attempts"]) == ("worker-a", 1)
+    assert while_leased is None
+    assert (reclaimed["worker_id"], reclaimed["attempts"]) == ("worker-b", 2)
+
+
+def test_release_is_not_an_attempt_but_is_bounded(run, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_MAX_RELEASES", 3)
+
+    async def scenario(db):
+        await _enqueue()
+        seen = []
+        while (job := await claim_next("worker-a")) is not None:
+            seen.append((job["attempts"], job["releases"]))
+            await release(job)
+        return seen, await _job()
+
+    seen, job = run(scenario)
+    assert seen == [(1, 0), (1, 1), (1, 2)]
+    assert job.status == "failed"
+
+
+def test_transient_errors_retry_and_broken_files_fail_at_once(run):
+    async def scenario(db):
+        for job_id in ("job-1", "job-2", "job-3"):
+            await _enqueue(job_id)
+        await requeue_or_fail(await claim_next("worker-a"), ConnectionError("mongo hiccup"))
+        await requeue_or_fail(await claim_next("worker-a"), ValueError("could not convert string to float: ''"))
+        await requeue_or_fail(await claim_next("worker-a"), StatementFileError("PDF is password protected"))
+        return await _job("job-1"), await _job("job-2"), await _job("job-3")
+
+    transient, parser_bug, broken = run(scenario)
+    assert transient.status == "queued" and transient.available_at > datetime.utcnow()
+    assert parser_bug.status == "queued"
+    assert broken.status == "failed" and broken.message == "PDF is password protected"
+
+
+def test_jobs_out_of_attempts_fail_and_drop_their_upload(run, monkeypatch):
+    discarded = []
+
+    async def discard_upload(job):
+        discarded.append(job["file_id"])
+
+    monkeypatch.setattr(job_queue, "discard_upload", discard_upload)
+
+    async def scenario(db):
+        await enqueue_statement("job-1", USER, "HDFC", file_id="upload-1", filename="statement.pdf")
+        await JobStatus.get_pymongo_collection().update_one(
+            {"job_id": "job-1"},
+            {"$set": {"status": "processing", "attempts": job_queue.JOB_MAX_ATTEMPTS,
+                      "lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+        return await claim_next("worker-a"), await _job()
+
+    claimed, job = run(scenario)
+    assert claimed is None
+    assert job.status == "failed" and job.finished_at is not None
+    assert discarded == ["upload-1"]
+
+
+def test_batch_parent_settles_when_its_last_child_finishes(run):
+    async def scenario(db):
+        for job_id in ("child-1", "child-2"):
+            await enqueue_statement(job_id, USER, "HDFC", file_id=None, filename=f"{job_id}.pdf",
+                                    parent_job_id="batch-1")
+        await job_queue.create_batch("batch-1", USER, "HDFC", ["child-1", "child-2"], "2 files")
+        await JobStatus.get_pymongo_collection().update_one({"job_id": "child-1"}, {"$set": {"status": "completed"}})
+        job = await claim_next("worker-a")
+        await job_queue.settle_batch("batch-1")
+        while_running = await _job("batch-1")
+        await requeue_or_fail(job, StatementFileError("PDF is password protected"))
+        return while_running, await _job("batch-1")
+
+    while_running, batch = run(scenario)
+    assert while_running.status == "processing" and while_running.finished_at is None
+    assert batch.status == "completed" and batch.finished_at is not None
+    assert batch.message == "1/2 files done, 1 failed"
@@ -0,0 +1,94 @@
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from app.api.v1.endpoints import ocr
+from app.parsers.gemini_parser import GeminiParser
+from app.services import content_cache as cache_module, llm_stage
+from app.services.content_cache import ContentCache, content_key
+from app.services.llm_stage import LLMFallbackStage
+
+PAGE_WITH_ROWS = "01/01/2025 UPI/SHOP 10.00 990.00"
+PAGE_WITHOUT_ROWS = "Terms and conditions apply"
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fresh = ContentCache()
+    monkeypatch.setattr(cache_module, "content_cache", fresh)
+    monkeypatch.setattr(llm_stage, "content_cache", fresh)
+    monkeypatch.setattr(ocr, "content_cache", fresh)
+    return fresh
+
+
+def _reply(rows_by_page: dict[int, list]):
+    async def parse_pages_text_async(self, texts, bank="UNKNOWN"):
+        return [{**row, "page": page} for page, rows in rows_by_page.items() for row in rows]
+    return parse_pages_text_async
+
+
+def test_empty_page_results_are_not_cached(run, cache, monkeypatch):
+    row = {"date": "2025-01-01", "description": "UPI/SHOP", "debit": 10.0}
+    monkeypatch.setattr(GeminiParser, "parse_pages_text_async", _reply({1: [row]}))
+
+    async def scenario(db):
+        stage = LLMFallbackStage("HDFC")
+        await stage.submit(0, PAGE_WITH_ROWS)
+        await stage.submit(1, PAGE_WITHOUT_ROWS)
+        await stage.drain()
+        # Same pages again: only the one with rows is a hit
+        again = LLMFallbackStage("HDFC")
+        await again.submit(0, PAGE_WITH_ROWS)
+        await again.submit(1, PAGE_WITHOUT_ROWS)
+        return again.cache_stats.as_dict(), [i for i, _ in again._pending]
+
+    stats, still_queued = run(scenario)
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert still_queued == [1]
+
+
+def test_single_page_empty_reply_is_not_cached(run, cache, monkeypatch):
+    monkeypatch.setattr(GeminiParser, "parse_pages_text_async", _reply({}))
+
+    async def scenario(db):
+        stage = LLMFallbackStage("HDFC")
+        await stage.submit(0, PAGE_WITH_ROWS)
+        await stage.drain()
+        return await cache.get(stage._page_key(PAGE_WITH_ROWS))
+
+    assert run(scenario) is None
+
+
+def test_receipt_cache_hit_skips_the_blob_upload(run, cache, monkeypatch):
+    def no_upload(*args, **kwargs):
+        raise AssertionError("uploaded a cached receipt")
+
+    monkeypatch.setattr(ocr.requests, "put", no_upload)
+    monkeypatch.delenv("BLOB_READ_WRITE_TOKEN", raising=False)
+    receipt = {"merchant": "Corner Shop", "amount": 12.5, "date": "2025-01-01"}
+
+    async def scenario(db):
+        cache.set_local(content_key("receipt", "gemini-2.0-flash", b"image-bytes"), receipt)
+        upload = UploadFile(file=io.BytesIO(b"image-bytes"), filename="receipt.png")
+        return await ocr.scan_receipt(file=upload, model="gemini-2.0-flash", user={"user_id": "user-1"})
+
+    assert run(scenario) == receipt
+
+
+def test_sync_page_parse_does_not_cache_an_empty_reply(cache, monkeypatch):
+    replies = iter(["[]", '[{"date": "01/01/2025", "description": "UPI/SHOP", "debit": 10, "credit": 0, '
+                          '"balance": 990}]'])
+    calls = []
+
+    class _Models:
+        def generate_content(self, model, contents):
+            calls.append(contents)
+            return type("Response", (), {"text": next(replies)})()
+
+    parser = GeminiParser()
+    monkeypatch.setattr(parser, "_get_client", lambda: type("Client", (), {"models": _Models()})())
+    assert parser.parse_page_text(PAGE_WITH_ROWS, "HDFC") == []
+    assert len(parser.parse_page_text(PAGE_WITH_ROWS, "HDFC")) == 1
+    assert len(parser.parse_page_text(PAGE_WITH_ROWS, "HDFC")) == 1
+    assert len(calls) == 2
@@ -0,0 +1,33 @@
+import pytest
+
+from app.utils.normalize import extract_payee_name, normalize_description_for_grouping
+
+
+@pytest.fixture(autouse=True)
+def empty_memos():
+    for helper in (extract_payee_name, normalize_description_for_grouping):
+        helper.memo._lru.clear()
+    yield
+
+
+def _uncached(fn, text):
+    fn.memo._lru.clear()
+    return fn(text)
+
+
+def test_ifsc_prefixed_narrations_do_not_share_an_answer():
+    first = extract_payee_name("NEFT HDFC0 ACME CORP")
+    second = extract_payee_name("NEFT HDFC5 ACME CORP")
+    assert first == _uncached(extract_payee_name, "NEFT HDFC0 ACME CORP")
+    assert second == _uncached(extract_payee_name, "NEFT HDFC5 ACME CORP")
+    assert first != second
+
+
+@pytest.mark.parametrize("fn", [extract_payee_name, normalize_description_for_grouping])
+def test_narrations_differing_only_in_reference_numbers_share_a_key(fn):
+    expected = _uncached(fn, "UPI/498765432109/SWIGGY LTD/swiggy@icici/Payment")
+    fn.memo._lru.clear()
+    fn("UPI/412345678901/SWIGGY LTD/swiggy@icici/Payment")
+    hits = fn.memo.hits
+    assert fn("UPI/498765432109/SWIGGY LTD/swiggy@icici/Payment") == expected
+    assert fn.memo.hits == hits + 1
@@ -0,0 +1,25 @@
+import builtins
+
+from app.services import memory
+
+
+def _no_proc(monkeypatch):
+    real_open = builtins.open
+
+    def fake_open(path, *args, **kwargs):
+        if str(path).startswith("/proc/"):
+            raise OSError("no /proc")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", fake_open)
+
+
+def test_rss_from_proc_or_rusage_is_positive():
+    assert memory.rss_mb() > 0
+
+
+def test_without_proc_or_resource_rss_is_zero_and_ceiling_never_trips(monkeypatch):
+    _no_proc(monkeypatch)
+    monkeypatch.setattr(memory, "resource", None)
+    assert memory.rss_mb() == 0.0
+    assert not memory.over_limit(1)
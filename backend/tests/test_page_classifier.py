@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from app.models.job import JobStatus
+from app.parsers.page_classifier import classify_page
+from app.services.job_store import ProgressReporter, create_job
+
+
+def _page(text: str):
+    return SimpleNamespace(width=600, height=800, chars=[{"text": c} for c in text],
+                           images=[], lines=[], rects=[])
+
+
+def test_dates_with_and_without_year_are_parsed():
+    for row in ("05/06/2025 UPI PAYMENT 120.00", "2025-06-05 NEFT 120.00", "05 Jun 2025 ATM 120.00",
+                "05/06 UPI PAYMENT 120.00", "05-06 NEFT 120.00", "05Jun ATM 120.00", "5 June POS 120.00"):
+        assert classify_page(_page(row))["route"] == "tables", row
+
+
+def test_pages_without_dates_are_skipped():
+    for text in ("Opening balance 10.50 Closing balance 99.25", "Terms and conditions apply", ""):
+        assert classify_page(_page(text))["route"] == "skip", text
+
+
+def test_page_decisions_keep_only_the_latest(run):
+    async def scenario(db):
+        await create_job("job-1")
+        progress = ProgressReporter("job-1", flush_ms=0)
+        for page in range(1, 8):
+            await progress.push("page_decisions", {"page": page, "route": "tables"}, keep=3)
+        await progress.flush()
+        return (await JobStatus.find_one(JobStatus.job_id == "job-1")).page_decisions
+
+    assert [d["page"] for d in run(scenario)] == [5, 6, 7]
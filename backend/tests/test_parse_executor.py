@@ -0,0 +1,57 @@
+import time
+import asyncio
+import threading
+
+from app.services import parse_executor
+from app.services.parse_executor import iter_parsed_pages, same_state, ShardStats
+
+
+class _Source:
+    page_count = 6
+    pdf = object()
+    path = "statement.pdf"
+
+
+def test_same_state_tolerates_float_drift_and_list_tuple():
+    state = {"header_mapping": {"date": 0, "desc": 1}, "columns": [(-1e9, 80.25), (80.25, 1e9)], "desc_edge": 300.0}
+    drifted = {"header_mapping": {"date": 0, "desc": 1}, "columns": [[-1e9, 80.5], [80.5, 1e9]], "desc_edge": 300.3}
+    assert same_state(state, drifted)
+    assert not same_state(state, {**drifted, "desc_edge": 320.0})
+    assert not same_state(state, {**drifted, "header_mapping": {"date": 0, "desc": 2}})
+    assert not same_state(state, {**drifted, "columns": drifted["columns"][:1]})
+    assert same_state(None, None) and not same_state(None, state)
+
+
+def test_no_pool_reparse_waits_for_the_discarded_thread(monkeypatch):
+    active, peak, calls = [0], [0], []
+    lock = threading.Lock()
+
+    def fake_parse_pages(pdf, bank, start, end, state=None, skip=frozenset()):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            calls.append((start, end, state))
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        # The layout changes after page 2: ranges past it end in state "B"
+        return [(i, [{"page": i}], None, 0.0, {"route": "tables", "reason": ""}) for i in range(start, end)], \
+            "A" if end <= 2 else "B"
+
+    monkeypatch.setattr(parse_executor, "PARSE_WORKERS", 0)
+    monkeypatch.setattr(parse_executor, "PARSE_PAGES_PER_TASK", 2)
+    monkeypatch.setattr(parse_executor, "_parse_pages", fake_parse_pages)
+
+    async def consume():
+        stats = ShardStats()
+        pages = []
+        async for page, *_ in iter_parsed_pages(_Source(), "HDFC", stats=stats):
+            pages.append(page)
+            await asyncio.sleep(0.01)  # writes: the speculative range's thread gets going meanwhile
+        return pages, stats
+
+    pages, stats = asyncio.run(consume())
+    assert pages == [0, 1, 2, 3, 4, 5]
+    assert stats.reparsed == 1
+    assert (4, 6, "B") in calls  # re-parsed with the real state
+    assert peak[0] == 1  # never two threads on the same document
@@ -0,0 +1,55 @@
+import pdfplumber
+
+from app.parsers import smart_universal
+from app.parsers.gemini_parser import GeminiParser
+from app.parsers.smart_universal import SmartUniversalParser
+from app.services.content_cache import ContentCache
+from app.services import llm_stage
+from app.services.llm_stage import LLMFallbackStage
+
+ROW = {"date": None, "description": "ATM WDL", "debit": 500.0, "credit": 0.0, "balance": 100.0, "bank": "HDFC"}
+
+
+def _parse_first_page(scanned_pdf):
+    parser = SmartUniversalParser("HDFC")
+    parser.defer_llm = True
+    with pdfplumber.open(scanned_pdf([b"\x80" * 100])) as pdf:
+        txns = parser.parse_page(pdf.pages[0])
+    return parser, txns
+
+
+def test_scanned_page_is_deferred_as_an_image(scanned_pdf):
+    parser, txns = _parse_first_page(scanned_pdf)
+    assert txns == []
+    assert parser.last_route["route"] == "llm"
+    assert parser.deferred_text.startswith(b"\x89PNG")
+
+
+def test_unrenderable_scanned_page_is_reported_unparsed(scanned_pdf, monkeypatch):
+    monkeypatch.setattr(smart_universal, "_page_png", lambda page: None)
+    parser, _ = _parse_first_page(scanned_pdf)
+    assert parser.deferred_text is None
+    assert parser.last_route["route"] == "unparsed"
+
+
+def test_llm_stage_sends_page_images_and_caches_the_rows(run, monkeypatch):
+    calls = []
+
+    async def parse_page_image_async(self, image, bank="UNKNOWN"):
+        calls.append(image)
+        return [dict(ROW)]
+
+    monkeypatch.setattr(GeminiParser, "parse_page_image_async", parse_page_image_async)
+    monkeypatch.setattr(llm_stage, "content_cache", ContentCache())
+
+    async def scenario(db):
+        results = []
+        for _ in range(2):
+            stage = LLMFallbackStage("HDFC")
+            await stage.submit(3, b"\x89PNG fake image")
+            results += await stage.drain()
+        return results
+
+    results = run(scenario)
+    assert [(pages, len(txns)) for pages, txns in results] == [([3], 1), ([3], 1)]
+    assert len(calls) == 1
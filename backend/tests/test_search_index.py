@@ -0,0 +1,29 @@
+from app.models.transaction import Transaction
+from app.services.search_index import search_filter, search_grams
+
+LONG_NARRATION = "NEFT/" + "X1Y2Z3 " * 40 + "BOOKMYSHOW ENTERTAINMENT"
+
+
+def _row(n: int, description: str, payee: str, indexed: bool = True) -> dict:
+    row = {"user_id": "user-1", "hash": f"h{n}", "description": description, "payee": payee, "bank": "HDFC"}
+    if indexed:
+        row["search_grams"] = search_grams(description, payee, "HDFC")
+    return row
+
+
+def _matches(run, rows: list[dict], search: str) -> list[str]:
+    async def scenario(db):
+        collection = Transaction.get_pymongo_collection()
+        await collection.insert_many(rows)
+        return sorted([d["hash"] async for d in collection.find(search_filter(search), {"hash": 1})])
+    return run(scenario)
+
+
+def test_term_at_the_end_of_a_long_narration_matches(run):
+    assert _matches(run, [_row(1, LONG_NARRATION, "Unknown")], "book my show") == ["h1"]
+
+
+def test_unindexed_rows_still_need_to_match_the_term(run):
+    rows = [_row(1, "UPI/SWIGGY/food", "Swiggy", indexed=False), _row(2, "UPI/ZOMATO/food", "Zomato", indexed=False),
+            _row(3, "UPI/SWIGGY/instamart", "Swiggy"), _row(4, "ATM WITHDRAWAL", "Cash")]
+    assert _matches(run, rows, "swiggy") == ["h1", "h3"]
@@ -0,0 +1,38 @@
+import pdfplumber
+
+from app.models.statement_fingerprint import StatementFingerprint
+from app.models.transaction import Transaction
+from app.services.statement_fingerprint import known_page_hashes, page_hashes
+
+USER, ACCOUNT = "user-1", "user-1_HDFC"
+
+
+def _hashes(scanned_pdf, images: list[bytes]) -> list[str]:
+    with pdfplumber.open(scanned_pdf(images)) as pdf:
+        return page_hashes(pdf)
+
+
+def test_scanned_pages_are_told_apart_by_their_images(scanned_pdf):
+    first, second, third = _hashes(scanned_pdf, [b"\x01" * 100, b"\x02" * 100, b"\x01" * 100])
+    assert first != second
+    assert first == third
+
+
+def test_same_page_in_another_file_hashes_the_same(scanned_pdf):
+    assert _hashes(scanned_pdf, [b"\x05" * 100, b"\x01" * 100])[1] == _hashes(scanned_pdf, [b"\x01" * 100])[0]
+
+
+def test_pages_of_a_statement_with_deleted_rows_are_not_known(run):
+    async def scenario(db):
+        await StatementFingerprint(user_id=USER, account_id=ACCOUNT, page_hashes=["p1", "p2"], page_rows=[2, 1],
+                                   txn_hashes=["t1", "t2", "t3"]).insert()
+        await Transaction.get_pymongo_collection().insert_many(
+            [{"user_id": USER, "hash": h} for h in ("t1", "t2", "t3")])
+        complete = await known_page_hashes(USER, ACCOUNT, ["p1", "p9"])
+        await Transaction.get_pymongo_collection().delete_one({"hash": "t3"})
+        after_delete = await known_page_hashes(USER, ACCOUNT, ["p1", "p9"])
+        return complete, after_delete
+
+    complete, after_delete = run(scenario)
+    assert complete == {"p1": 2}
+    assert after_delete == {}
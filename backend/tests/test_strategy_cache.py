@@ -0,0 +1,69 @@
+import os
+import json
+import threading
+
+from app.parsers import smart_universal, strategy_cache as strategy_cache_module
+from app.parsers.smart_universal import SmartUniversalParser
+from app.parsers.strategy_cache import StrategyCache
+
+TABLE = [["Date", "Narration", "Withdrawal", "Deposit", "Balance"],
+         ["05/06/2025", "UPI/SHOP", "120.00", "", "880.00"]]
+
+
+class _Page:
+    def extract_tables(self, settings):
+        return [TABLE]
+
+
+def test_default_path_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(strategy_cache_module.STRATEGY_CACHE_PATH)
+
+
+def test_concurrent_writers_leave_a_valid_file(tmp_path):
+    path = str(tmp_path / "strategy_cache.json")
+
+    def writer(n: int):
+        cache = StrategyCache(path)  # one per "process": no shared lock
+        for i in range(50):
+            cache.record("HDFC", f"fp{n}-{i}", i % 4, {"date": 0}, hit=False)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)
+    assert os.listdir(tmp_path) == ["strategy_cache.json"]
+
+
+def test_unchanged_winner_is_not_rewritten(tmp_path):
+    path = str(tmp_path / "strategy_cache.json")
+    cache = StrategyCache(path)
+    cache.record("HDFC", "fp", 1, {"date": 0}, hit=False)
+    os.remove(path)
+    cache.record("HDFC", "fp", 1, {"date": 0}, hit=False)
+    assert not os.path.exists(path)
+
+
+def test_dropped_cached_winner_is_not_counted_as_a_hit(tmp_path, monkeypatch):
+    cache = StrategyCache(str(tmp_path / "strategy_cache.json"))
+    cache.record("HDFC", "fp", 0, None, hit=False)  # lines+lines won before
+    monkeypatch.setattr(smart_universal, "strategy_cache", cache)
+    monkeypatch.setattr(smart_universal, "layout_fingerprint", lambda page: "fp")
+
+    txns = SmartUniversalParser("HDFC")._try_strategies(_Page(), ruled=False)
+    assert len(txns) == 1
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_write_keeps_other_processes_newer_winners(tmp_path):
+    path = str(tmp_path / "strategy_cache.json")
+    ours, theirs = StrategyCache(path), StrategyCache(path)
+    ours.record("HDFC", "fp-a", 0, None, hit=False)
+    theirs.record("HDFC", "fp-a", 2, None, hit=False)  # newer winner, written after our load
+    ours.record("HDFC", "fp-b", 1, None, hit=False)
+    with open(path, encoding="utf-8") as f:
+        stored = json.load(f)
+    assert stored["HDFC::fp-a"]["strategy"] == 2
+    assert stored["HDFC::fp-b"]["strategy"] == 1
@@ -0,0 +1,25 @@
+import pytest
+
+from app.parsers.tabular import iter_ofx_transactions
+
+# (DTPOSTED, TRNAMT, NAME), oldest first; closing (ledger) balance 1000.00
+TXNS = [("20250101", "-100.00", "RENT"), ("20250102", "500.00", "SALARY"),
+        ("20250102", "-50.00", "GROCERIES"), ("20250105120000[+5:30:IST]", "-25.50", "COFFEE")]
+EXPECTED = {"RENT": 575.50, "SALARY": 1075.50, "GROCERIES": 1025.50, "COFFEE": 1000.00}
+
+
+def _ofx(tmp_path, txns) -> str:
+    blocks = "".join(f"<STMTTRN><TRNTYPE>OTHER<DTPOSTED>{d}<TRNAMT>{a}<NAME>{n}</STMTTRN>\n" for d, a, n in txns)
+    path = tmp_path / "statement.ofx"
+    path.write_text("OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n" + blocks +
+                    "</BANKTRANLIST><LEDGERBAL><BALAMT>1000.00<DTASOF>20250105</LEDGERBAL>"
+                    "</STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("order", ["oldest first", "newest first"])
+def test_ofx_running_balance_follows_posting_date(tmp_path, order):
+    txns = TXNS if order == "oldest first" else TXNS[::-1]
+    rows = list(iter_ofx_transactions(_ofx(tmp_path, txns), "HDFC"))
+    assert [r["description"] for r in rows] == [n for _, _, n in txns]  # file order kept
+    assert {r["description"]: r["balance"] for r in rows} == EXPECTED
@@ -0,0 +1,37 @@
+import io
+import asyncio
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from app.services.transaction_export import EXPORT_HEADER, export_stream
+
+ROWS = [
+    {"date": datetime(2025, 6, 5), "bank": "HDFC", "description": "UPI/PAY\x02MENT\x1b/SHOP", "payee": "Sh\x00op",
+     "category": "Shopping", "debit": 120.0, "credit": 0.0, "balance": 880.0},
+    {"date": datetime(2025, 6, 6), "bank": "HDFC", "description": "NEFT\tSALARY\n", "payee": "Employer",
+     "category": "Income", "debit": 0.0, "credit": 5000.0, "balance": 5880.0},
+]
+
+
+async def _batches():
+    yield [dict(r) for r in ROWS]
+
+
+def _export(fmt: str) -> bytes:
+    async def collect():
+        return b"".join([chunk async for chunk in export_stream(_batches(), fmt)])
+    return asyncio.run(collect())
+
+
+def test_xlsx_drops_control_characters_instead_of_failing():
+    sheet = load_workbook(io.BytesIO(_export("xlsx"))).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == EXPORT_HEADER
+    assert rows[1][2:4] == ("UPI/PAYMENT/SHOP", "Shop")
+    assert rows[2][2] == "NEFT\tSALARY\n"  # tab / newline are legal
+    assert rows[2][6] == 5000.0
+
+
+def test_csv_keeps_narrations_as_stored():
+    assert b"UPI/PAY\x02MENT\x1b/SHOP" in _export("csv")
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo.errors import ExecutionTimeout
+
+from app.api.v1.endpoints.transactions import get_transactions
+from app.models.transaction import Transaction
+from app.services.transaction_query import run_list_query
+
+USER = {"user_id": "user-1"}
+DATES = [datetime(2025, 1, 5), datetime(2025, 1, 5), datetime(2025, 1, 4), None, datetime(2025, 1, 3),
+         datetime(2025, 1, 5), None, datetime(2025, 1, 1), datetime(2025, 1, 2), datetime(2025, 1, 4)]
+
+
+async def _seed() -> list[str]:
+    """Inserts the rows; returns their ids in (date, _id) descending order, null dates last."""
+    docs = [{"_id": ObjectId(), "user_id": USER["user_id"], "account_id": "a", "hash": str(i), "date": d,
+             "bank": "HDFC", "bank_key": "HDFC", "source_kind": "statement", "debit": float(i), "credit": 0.0}
+            for i, d in enumerate(DATES)]
+    await Transaction.get_pymongo_collection().insert_many(docs)
+    dated = sorted((d for d in docs if d["date"]), key=lambda d: (d["date"], d["_id"]), reverse=True)
+    undated = sorted((d for d in docs if not d["date"]), key=lambda d: d["_id"], reverse=True)
+    return [str(d["_id"]) for d in dated + undated]
+
+
+async def _list(**params):
+    query = {"page": 1, "limit": 3, "cursor": None, "mode": "page", "search": None, "type": "all", "sort": "desc",
+             "bank": None, "start_date": None, "end_date": None, "amount": None}
+    return await get_transactions(**{**query, **params}, user=USER)
+
+
+def test_keyset_pages_walk_the_full_order_both_ways(run):
+    async def scenario(db):
+        order = await _seed()
+        forward, pages, cursor = [], [], None
+        page = await _list(mode="cursor")
+        while True:
+            ids = [row["id"] for row in page["data"]]
+            forward += ids
+            pages.append((ids, page))
+            if not page["next_cursor"]:
+                break
+            page = await _list(cursor=page["next_cursor"])
+        backward = []
+        page = pages[-1][1]
+        while page["prev_cursor"]:
+            page = await _list(cursor=page["prev_cursor"])
+            backward.append([row["id"] for row in page["data"]])
+        return order, forward, [ids for ids, _ in pages], backward, pages[0][1]
+
+    order, forward, pages, backward, first = run(scenario)
+    assert forward == order
+    assert backward == pages[-2::-1]
+    assert first["total"] == 10 and first["summary"]["total_debit"] == 45.0
+    assert first["prev_cursor"] is None
+
+
+def test_page_mode_matches_skip_limit(run):
+    async def scenario(db):
+        order = await _seed()
+        return order, await _list(page=2)
+
+    order, page = run(scenario)
+    assert [row["id"] for row in page["data"]] == order[3:6]
+    assert (page["total"], page["totalPages"], page["totalEstimated"]) == (10, 4, False)
+
+
+class _SlowCollection:
+    """Every aggregation times out; count_documents optionally too."""
+
+    def __init__(self, count_times_out: bool):
+        self.count_times_out = count_times_out
+        self.counted_filter = None
+
+    def aggregate(self, pipeline, **kwargs):
+        collection = self
+
+        class _Cursor:
+            async def to_list(self, length):
+                if "maxTimeMS" in kwargs:
+                    raise ExecutionTimeout("operation exceeded time limit")
+                return [{"_id": i} for i in range(3)]
+        return _Cursor()
+
+    async def count_documents(self, flt, **kwargs):
+        self.counted_filter = flt
+        if self.count_times_out:
+            raise ExecutionTimeout("operation exceeded time limit")
+        return 42
+
+
+def test_timeout_counts_with_the_same_filter_or_reports_a_lower_bound():
+    flt = {"user_id": "user-1", "bank_key": "HDFC"}
+    counted = _SlowCollection(count_times_out=False)
+    result = asyncio.run(run_list_query(counted, flt, -1, skip=20, limit=3))
+    assert (result["total"], result["estimated"], result["total_debit"]) == (42, True, None)
+    assert counted.counted_filter == flt
+
+    lower_bound = asyncio.run(run_list_query(_SlowCollection(count_times_out=True), flt, -1, skip=20, limit=3))
+    assert (lower_bound["total"], lower_bound["estimated"]) == (26, True)
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+from app.models.transaction import Transaction
+from app.services.pipeline import _transaction_doc
+from app.services.write_planner import write_transactions
+from app.utils.hash import make_hash
+
+USER = "user-1"
+ACCOUNT = f"{USER}_HDFC"
+
+
+def _statement(n: int = 5) -> list[dict]:
+    docs = []
+    for i in range(n):
+        clean = {"date": datetime(2025, 1, i + 1), "description": f"UPI/{i}/SHOP {i}", "payee": f"Shop {i}",
+                 "category": "Shopping", "debit": 10.0 * (i + 1), "credit": 0.0, "balance": 1000.0 - i,
+                 "type": "DEBIT"}
+        docs.append(_transaction_doc(clean, USER, ACCOUNT, make_hash(ACCOUNT, clean), "HDFC"))
+    return docs
+
+
+def test_same_statement_twice_writes_nothing_new(run):
+    async def scenario(db):
+        collection = Transaction.get_pymongo_collection()
+        first = await write_transactions(collection, USER, _statement())
+        stamps = {d["hash"]: d["updated_at"] async for d in collection.find({}, {"hash": 1, "updated_at": 1})}
+        second = await write_transactions(collection, USER, _statement())
+        after = {d["hash"]: d["updated_at"] async for d in collection.find({}, {"hash": 1, "updated_at": 1})}
+        return first, second, stamps, after
+
+    first, second, stamps, after = run(scenario)
+    assert (first.inserted, first.updated, first.unchanged) == (5, 0, 0)
+    assert (second.inserted, second.updated, second.unchanged) == (0, 0, 5)
+    assert after == stamps
+
+
+def test_reingest_sets_only_changed_fields(run):
+    async def scenario(db):
+        collection = Transaction.get_pymongo_collection()
+        docs = _statement()
+        await write_transactions(collection, USER, docs)
+        edited = [dict(d) for d in docs]
+        edited[2]["payee"] = "Corner Shop"
+        result = await write_transactions(collection, USER, edited)
+        stored = await collection.find_one({"hash": docs[2]["hash"]})
+        return result, stored
+
+    result, stored = run(scenario)
+    assert (result.inserted, result.updated, result.unchanged) == (0, 1, 4)
+    assert stored["payee"] == "Corner Shop"
+    assert stored["description"] == "UPI/2/SHOP 2"
+
+
+def test_hash_inserted_concurrently_counts_as_unchanged(run):
+    async def scenario(db):
+        collection = Transaction.get_pymongo_collection()
+        docs = _statement(3)
+        # Same hash stored meanwhile (not visible to this user's lookup) → duplicate key on insert
+        await collection.insert_one({**docs[0], "user_id": "someone-else"})
+        result = await write_transactions(collection, USER, docs)
+        return result, await collection.count_documents({})
+
+    result, total = run(scenario)
+    assert (result.inserted, result.unchanged) == (2, 1)
+    assert total == 3